@@ -3,6 +3,10 @@ ASGI config for Platzi_Store_APP project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Serving the site through it (e.g. ``uvicorn Platzi_Store_APP.asgi:application``)
+keeps the product change feed (/catalog/events/) open as a push stream;
+under WSGI browsers poll it instead.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
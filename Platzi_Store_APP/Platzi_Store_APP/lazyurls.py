@@ -0,0 +1,55 @@
+"""
+URL patterns whose view module is imported on the first request to them.
+
+`lazy_path('api/products/', 'Products.api.products_api', name=...)` works
+like `path()` but takes the dotted path of the view. Resolving other URLs,
+reversing and `manage.py check` do not import it, so the API modules (and
+REST Framework behind them) stay out of workers until an API URL is hit.
+
+Only for synchronous views: Django checks whether a view is a coroutine
+function before calling it, and that check would see this wrapper.
+"""
+from django.urls import URLPattern
+from django.urls.resolvers import RoutePattern
+from django.utils.functional import cached_property
+from django.utils.module_loading import import_string
+
+
+class LazyView:
+    """
+    Callable standing in for the view at `dotted_path` until it is needed.
+    Attributes set by decorators (csrf_exempt, view_class...) are read from
+    the real view, which imports it.
+    """
+
+    def __init__(self, dotted_path):
+        self.dotted_path = dotted_path
+        self.__module__, self.__name__ = dotted_path.rsplit('.', 1)
+        self.__qualname__ = self.__name__
+
+    @cached_property
+    def view(self):
+        return import_string(self.dotted_path)
+
+    def __call__(self, request, *args, **kwargs):
+        return self.view(request, *args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self.view, name)
+
+    def __repr__(self):
+        return f"<LazyView {self.dotted_path}>"
+
+
+class LazyURLPattern(URLPattern):
+    @cached_property
+    def lookup_str(self):
+        # URLPattern.lookup_str inspects the view; the dotted path is the same string.
+        return self.callback.dotted_path
+
+
+def lazy_path(route, view, kwargs=None, name=None):
+    """
+    `path()` for a view given as a dotted path, imported on first use.
+    """
+    return LazyURLPattern(RoutePattern(route, name=name, is_endpoint=True), LazyView(view), kwargs, name)
@@ -0,0 +1,244 @@
+import cProfile
+import functools
+import mimetypes
+import os
+import random
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.http import FileResponse
+from django.utils._os import safe_join
+from django.utils.cache import cc_delim_re, patch_cache_control, patch_vary_headers
+from django.utils.text import compress_string
+
+from . import profiling
+from .staticfiles import ENCODING_SUFFIXES, brotli, minify_html
+
+IMMUTABLE_MAX_AGE = 60 * 60 * 24 * 365
+
+# Content types ResponseCompressionMiddleware compresses (text/html is also minified).
+COMPRESSIBLE_TYPES = ('text/html', 'application/json', 'text/javascript', 'application/javascript')
+
+# Per-response compression trades ratio for speed; static files are
+# precompressed at the maximum levels instead.
+BROTLI_QUALITY = 5
+# Compressed bodies of cacheable responses kept per process (see ResponseCompressionMiddleware).
+COMPRESSED_BODIES_CACHED = 128
+# Random gzip header padding for responses compressed per request, like
+# GZipMiddleware, against BREACH.
+GZIP_MAX_RANDOM_BYTES = 100
+
+
+def accepted_encodings(header):
+    """
+    Returns the set of content codings accepted by an Accept-Encoding header
+    (codings with q=0 are excluded).
+    """
+    encodings = set()
+    for part in header.split(','):
+        coding, _, params = part.strip().partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = params.strip()
+        if q.startswith('q='):
+            try:
+                if float(q[2:]) == 0:
+                    continue
+            except ValueError:
+                continue
+        encodings.add(coding)
+    return encodings
+
+
+class PrecompressedStaticMiddleware:
+    """
+    Serves files from STATIC_ROOT, choosing the `.br` or `.gz` variant
+    written by `build_static` according to Accept-Encoding. Fingerprinted
+    names (those listed in the manifest) are sent with immutable cache
+    headers; anything else must be revalidated.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.prefix = '/' + settings.STATIC_URL.lstrip('/')
+        self.root = settings.STATIC_ROOT
+        self._hashed_names = None
+
+    def __call__(self, request):
+        if self.root and request.method in ('GET', 'HEAD') and request.path.startswith(self.prefix):
+            response = self.serve(request, request.path[len(self.prefix):])
+            if response is not None:
+                return response
+        return self.get_response(request)
+
+    def serve(self, request, name):
+        try:
+            path = safe_join(self.root, name)
+        except ValueError:
+            return None
+        if not os.path.isfile(path):
+            return None
+
+        content_type, _ = mimetypes.guess_type(path)
+        served_path, encoding = path, None
+        accepted = accepted_encodings(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        for coding in ('br', 'gzip'):
+            candidate = path + ENCODING_SUFFIXES[coding]
+            if coding in accepted and os.path.isfile(candidate):
+                served_path, encoding = candidate, coding
+                break
+
+        response = FileResponse(open(served_path, 'rb'), content_type=content_type or 'application/octet-stream')
+        if encoding:
+            response['Content-Encoding'] = encoding
+        patch_vary_headers(response, ('Accept-Encoding',))
+        if name in self.hashed_names():
+            patch_cache_control(response, public=True, max_age=IMMUTABLE_MAX_AGE, immutable=True)
+        else:
+            patch_cache_control(response, public=True, no_cache=True)
+        return response
+
+    def hashed_names(self):
+        if self._hashed_names is None:
+            self._hashed_names = set(getattr(staticfiles_storage, 'hashed_files', {}).values())
+        return self._hashed_names
+
+
+def _compress(content, coding, max_random_bytes=None):
+    if coding == 'br':
+        return brotli.compress(content, quality=BROTLI_QUALITY)
+    return compress_string(content, max_random_bytes=max_random_bytes)
+
+
+@functools.lru_cache(maxsize=COMPRESSED_BODIES_CACHED)
+def _compress_cached(content, coding):
+    return _compress(content, coding)
+
+
+def _cacheable(request, response):
+    """
+    Whether other requests are likely to get the same body. Responses that
+    set cookies (a new CSRF token, a session), vary on the cookie (they read
+    the session), were rendered for a logged-in user or must not be stored
+    may hold secrets, so they are compressed on their own with random
+    padding (BREACH) and never shared.
+    """
+    vary = {v.strip().lower() for v in cc_delim_re.split(response.get('Vary', ''))}
+    if response.cookies or 'cookie' in vary:
+        return False
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        return False
+    directives = {d.split('=')[0].strip().lower() for d in cc_delim_re.split(response.get('Cache-Control', ''))}
+    return not directives & {'no-store', 'private'}
+
+
+class ResponseCompressionMiddleware:
+    """
+    Minifies HTML responses (see staticfiles.minify_html) and compresses
+    HTML, JSON and JavaScript bodies of at least
+    RESPONSE_COMPRESSION_MIN_BYTES with brotli or gzip, as Accept-Encoding
+    allows. Streaming responses (the streamed catalog, the event feed,
+    static files) and bodies that already have a Content-Encoding are left
+    alone.
+
+    Compressed bodies of cacheable responses (see _cacheable) are kept in a
+    per-process LRU of COMPRESSED_BODIES_CACHED entries keyed by the body
+    itself, so anonymous responses served again unchanged (API pages and
+    other views that do not read the session) are compressed once.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if response.streaming or response.has_header('Content-Encoding') or not response.content:
+            return response
+        content_type = response.get('Content-Type', '').split(';')[0].strip().lower()
+        if content_type not in COMPRESSIBLE_TYPES:
+            return response
+
+        if content_type == 'text/html' and settings.RESPONSE_MINIFY_HTML:
+            charset = response.charset
+            self.set_content(response, minify_html(response.content.decode(charset)).encode(charset))
+        patch_vary_headers(response, ('Accept-Encoding',))
+        if len(response.content) < settings.RESPONSE_COMPRESSION_MIN_BYTES:
+            return response
+
+        accepted = accepted_encodings(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        coding = next((c for c in ('br', 'gzip') if c in accepted and (c != 'br' or brotli is not None)), None)
+        if coding is None:
+            return response
+        if _cacheable(request, response):
+            compressed = _compress_cached(response.content, coding)
+        else:
+            compressed = _compress(response.content, coding, GZIP_MAX_RANDOM_BYTES)
+        if len(compressed) >= len(response.content):
+            return response
+
+        self.set_content(response, compressed)
+        response['Content-Encoding'] = coding
+        # A strong ETag would claim the compressed body is byte-identical to the original.
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        return response
+
+    def set_content(self, response, content):
+        response.content = content
+        if response.has_header('Content-Length'):
+            response['Content-Length'] = str(len(content))
+
+
+class SamplingProfilerMiddleware:
+    """
+    Runs a sample of requests under cProfile and stores the stats with
+    the view name and duration (see profiling.py).
+
+    Only active with PROFILING_ENABLED. A request is profiled one time in
+    PROFILING_SAMPLE_RATE, or when it carries the X-Profile header and
+    comes from a staff user or the header value equals PROFILING_TOKEN.
+    Only one request per process is profiled at a time; requests arriving
+    meanwhile run unprofiled. For streaming responses only the work done
+    before the response is returned is profiled.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self._lock = threading.Lock()
+
+    def should_profile(self, request):
+        header = request.META.get('HTTP_X_PROFILE')
+        if header:
+            user = getattr(request, 'user', None)
+            token = settings.PROFILING_TOKEN
+            if (user is not None and user.is_staff) or (token and header == token):
+                return True
+        rate = settings.PROFILING_SAMPLE_RATE
+        return rate > 0 and random.random() < 1 / rate
+
+    def __call__(self, request):
+        if not settings.PROFILING_ENABLED or not self.should_profile(request):
+            return self.get_response(request)
+        if not self._lock.acquire(blocking=False):
+            return self.get_response(request)
+        try:
+            profiler = cProfile.Profile()
+            started = time.perf_counter()
+            profiler.enable()
+            try:
+                response = self.get_response(request)
+            finally:
+                profiler.disable()
+            duration = time.perf_counter() - started
+        finally:
+            self._lock.release()
+
+        match = request.resolver_match
+        name = profiling.save(profiler, match.view_name if match else None, duration)
+        response['X-Profile-Id'] = name
+        return response
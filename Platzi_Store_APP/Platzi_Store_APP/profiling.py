@@ -0,0 +1,125 @@
+"""
+Request profiles recorded by SamplingProfilerMiddleware.
+
+Each profile is a pstats dump in PROFILING_DIR named
+`<timestamp>-<view name>-<duration ms>.prof`, so listing them needs no
+parsing. The directory keeps at most PROFILING_MAX_FILES profiles; older
+ones are deleted as new ones are written. Staff users browse them at
+/admin/profiles/, and the .prof files open in snakeviz or `python -m pstats`.
+"""
+import io
+import os
+import re
+import time
+from datetime import datetime
+
+from django.conf import settings
+from django.contrib import admin
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import FileResponse, Http404
+from django.shortcuts import render
+
+_FILENAME = re.compile(r'^(?P<timestamp>\d+\.\d+)-(?P<view>[\w.-]+)-(?P<ms>\d+)ms\.prof$')
+
+
+def save(profiler, view_name, duration):
+    """
+    Writes the stats of `profiler` and trims the directory.
+    """
+    directory = settings.PROFILING_DIR
+    os.makedirs(directory, exist_ok=True)
+    # 'Products:catalog' is stored as 'Products.catalog' (':' is not valid in Windows file names).
+    view = re.sub(r'[^\w.-]', '_', (view_name or 'unresolved').replace(':', '.'))
+    name = f"{time.time():.6f}-{view}-{int(duration * 1000)}ms.prof"
+    profiler.dump_stats(os.path.join(directory, name))
+    rotate()
+    return name
+
+
+def rotate():
+    """
+    Deletes the oldest profiles beyond PROFILING_MAX_FILES.
+    """
+    profiles = sorted(recent(), key=lambda p: p['created'])
+    for profile in profiles[:max(0, len(profiles) - settings.PROFILING_MAX_FILES)]:
+        try:
+            os.remove(os.path.join(settings.PROFILING_DIR, profile['name']))
+        except FileNotFoundError:
+            pass
+
+
+def recent():
+    """
+    Returns the stored profiles as dicts (name, view, duration_ms, created).
+    """
+    try:
+        names = os.listdir(settings.PROFILING_DIR)
+    except FileNotFoundError:
+        return []
+    profiles = []
+    for name in names:
+        match = _FILENAME.match(name)
+        if match:
+            profiles.append({
+                'name': name,
+                'view': match['view'],
+                'duration_ms': int(match['ms']),
+                'created': datetime.fromtimestamp(float(match['timestamp'])),
+            })
+    return profiles
+
+
+def _path(name):
+    if not _FILENAME.match(name):
+        raise Http404('Unknown profile')
+    path = os.path.join(settings.PROFILING_DIR, name)
+    if not os.path.isfile(path):
+        raise Http404('Unknown profile')
+    return path
+
+
+@staff_member_required
+def profile_list(request):
+    """
+    Lists recent profiles, newest first, optionally filtered by view name
+    (?view=) and ordered by duration (?sort=duration).
+    """
+    profiles = recent()
+    views = sorted({p['view'] for p in profiles})
+    view = request.GET.get('view')
+    if view:
+        profiles = [p for p in profiles if p['view'] == view]
+    if request.GET.get('sort') == 'duration':
+        profiles.sort(key=lambda p: -p['duration_ms'])
+    else:
+        profiles.sort(key=lambda p: p['created'], reverse=True)
+    return render(request, 'admin/profiles.html', {
+        **admin.site.each_context(request),
+        'title': 'Request profiles',
+        'profiles': profiles,
+        'views': views,
+        'selected_view': view or '',
+        'sort': request.GET.get('sort', ''),
+    })
+
+
+@staff_member_required
+def profile_detail(request, name):
+    """
+    Shows the top functions of a profile by cumulative time, or downloads
+    the .prof file with ?download=1.
+    """
+    # pstats is only needed here; importing it at startup costs every worker.
+    import pstats
+
+    path = _path(name)
+    if request.GET.get('download'):
+        return FileResponse(open(path, 'rb'), as_attachment=True, filename=name)
+    report = io.StringIO()
+    pstats.Stats(path, stream=report).sort_stats('cumulative').print_stats(40)
+    return render(request, 'admin/profile_detail.html', {
+        **admin.site.each_context(request),
+        'title': name,
+        'name': name,
+        'report': report.getvalue(),
+    })
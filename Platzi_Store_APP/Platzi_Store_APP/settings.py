@@ -46,12 +46,15 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'Platzi_Store_APP.middleware.ResponseCompressionMiddleware',
+    'Platzi_Store_APP.middleware.PrecompressedStaticMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'Platzi_Store_APP.middleware.SamplingProfilerMiddleware',
 ]
 
 ROOT_URLCONF = 'Platzi_Store_APP.urls'
@@ -59,7 +62,7 @@ ROOT_URLCONF = 'Platzi_Store_APP.urls'
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
-        'DIRS': [ BASE_DIR / 'products' / 'templates' ],
+        'DIRS': [BASE_DIR / 'Products' / 'Templates', BASE_DIR / 'accounts' / 'Templates'],
         'APP_DIRS': True,
         'OPTIONS': {
             'context_processors': [
@@ -72,6 +75,12 @@ TEMPLATES = [
     },
 ]
 
+# Compila al arrancar todas las plantillas de TEMPLATES['DIRS'] en el loader
+# con caché (Platzi_Store_APP/template_cache.py). Solo tiene efecto si el
+# motor usa django.template.loaders.cached.Loader; lo activa
+# settings_production. Comparativa: `python manage.py bench_templates`.
+TEMPLATES_PRECOMPILE = False
+
 WSGI_APPLICATION = 'Platzi_Store_APP.wsgi.application'
 
 
@@ -121,9 +130,29 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/4.2/howto/static-files/
 
 STATIC_URL = 'static/'
-STATICFILES_DIRS = [
-    BASE_DIR / 'products' / 'static',
-]
+# Los estáticos de Products y accounts se encuentran en sus carpetas static/
+# de cada app, así que no hacen falta directorios adicionales.
+STATICFILES_DIRS = []
+
+# `python manage.py build_static` deja aquí los archivos con hash, minificados
+# y precomprimidos (.gz/.br) junto a staticfiles.json.
+STATIC_ROOT = BASE_DIR / 'staticfiles'
+
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'Platzi_Store_APP.staticfiles.CompressedManifestStaticFilesStorage',
+    },
+}
+
+# Respuestas HTML, JSON y JS (Platzi_Store_APP.middleware.ResponseCompressionMiddleware):
+# el HTML se envía sin sangría ni líneas en blanco y los cuerpos de al menos
+# RESPONSE_COMPRESSION_MIN_BYTES se comprimen con brotli o gzip según
+# Accept-Encoding. Bytes por página: `python manage.py wire_report`.
+RESPONSE_MINIFY_HTML = True
+RESPONSE_COMPRESSION_MIN_BYTES = 1024
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
@@ -131,8 +160,80 @@ STATICFILES_DIRS = [
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 # API Configuration
+# Raíz de la API de Platzi; Products.upstream construye a partir de ella las
+# URLs de productos y categorías.
 PLATZI_API_BASE_URL = 'https://api.escuelajs.co/api/v1/'
 
+# Límite de peticiones salientes a la API de Platzi (token bucket por endpoint).
+# 'rate' son peticiones por segundo, 'burst' la capacidad del bucket y
+# 'deadline' los segundos que una petición espera turno antes de usar la
+# caché o fallar. El estado se comparte entre workers en UPSTREAM_RATELIMIT_DB.
+UPSTREAM_RATE_LIMITS = {
+    'default': {'rate': 5, 'burst': 10, 'deadline': 2.0},
+    'images': {'rate': 10, 'burst': 20, 'deadline': 5.0},
+    'products': {'rate': 5, 'burst': 10, 'deadline': 2.0},
+    'categories': {'rate': 1, 'burst': 3, 'deadline': 1.0},
+    # Precarga y refresco periódico de la caché (Products/warmup.py).
+    'warmup': {'rate': 2, 'burst': 5, 'deadline': 10.0},
+    # Importaciones masivas: esperan turno más tiempo en vez de fallar.
+    'bulk': {'rate': 20, 'burst': 20, 'deadline': 30.0},
+}
+UPSTREAM_RATELIMIT_DB = BASE_DIR / 'upstream_ratelimit.sqlite3'
+UPSTREAM_TIMEOUT = 10  # segundos por petición
+
+# Caché compartida por todos los workers del servidor (un archivo SQLite en
+# modo WAL), para no repetir las llamadas a la API ni guardar una copia por
+# proceso. Comparativa con otros backends: `python manage.py bench_cache`.
+CACHES = {
+    'default': {
+        'BACKEND': 'Platzi_Store_APP.sqlite_cache.SQLiteCache',
+        'LOCATION': BASE_DIR / 'cache.sqlite3',
+        'TIMEOUT': 300,
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+            'MAX_BYTES': 64 * 1024 * 1024,
+        },
+    },
+}
+
+# Segundos que una respuesta GET se sirve desde caché sin consultar la API,
+# y cuánto tiempo se conserva la última copia para usarla si se agota el límite.
+UPSTREAM_CACHE_TTL = 30
+UPSTREAM_STALE_TTL = 60 * 60
+
+# Precarga de la caché al arrancar y refresco periódico antes de que expire:
+# categorías, catálogo completo, catálogo de las primeras categorías y los
+# detalles de producto más vistos. También: `python manage.py warm_cache`.
+PRODUCTS_WARMUP_ON_STARTUP = False
+PRODUCTS_REFRESH_INTERVAL = UPSTREAM_CACHE_TTL * 0.8
+PRODUCTS_WARMUP_CATEGORIES = 10
+PRODUCTS_WARMUP_DETAILS = 20
+
+# Catálogo en streaming: envía la cabecera de la página de inmediato y las
+# tarjetas de productos por bloques a medida que llega la respuesta de la API.
+# También se puede activar por petición con ?stream=1.
+CATALOG_STREAMING = False
+CATALOG_STREAM_CHUNK_SIZE = 24
+
+# Proxy de imágenes de productos: anchos permitidos (los que usan las
+# plantillas), caché en disco con límite de tamaño y cabeceras de caché.
+PRODUCT_IMAGE_WIDTHS = (320, 640, 1000)
+PRODUCT_IMAGE_CACHE_DIR = BASE_DIR / 'image_cache'
+PRODUCT_IMAGE_CACHE_MAX_BYTES = 256 * 1024 * 1024
+PRODUCT_IMAGE_MAX_SOURCE_BYTES = 10 * 1024 * 1024
+PRODUCT_IMAGE_MAX_AGE = 60 * 60 * 24 * 365
+
+# Verificación opcional de las URLs de imágenes al validar ProductForm: cada
+# URL debe responder 2xx con un Content-Type image/*, sin seguir redirecciones,
+# y solo se contactan hosts con direcciones públicas. Se comprueban todas a la
+# vez con un timeout corto y el resultado se guarda en la caché (las válidas
+# PRODUCT_IMAGE_VERIFY_TTL segundos, las rotas PRODUCT_IMAGE_VERIFY_FAILURE_TTL).
+PRODUCT_IMAGE_VERIFY = False
+PRODUCT_IMAGE_VERIFY_TIMEOUT = 2.0
+PRODUCT_IMAGE_VERIFY_CONCURRENCY = 10
+PRODUCT_IMAGE_VERIFY_TTL = 60 * 60 * 24
+PRODUCT_IMAGE_VERIFY_FAILURE_TTL = 60 * 5
+
 # Configuración de Django REST Framework
 REST_FRAMEWORK = {
     # Configuración de autenticación por defecto
@@ -174,6 +275,55 @@ REST_FRAMEWORK = {
     }
 }
 
+# Importación masiva de productos: escrituras simultáneas a la API y
+# reintentos por fila ante errores de conexión, 429 o 5xx.
+PRODUCTS_IMPORT_CONCURRENCY = 8
+PRODUCTS_IMPORT_RETRIES = 3
+
+# Modo write-behind: crear/editar/eliminar productos se guarda en la tabla
+# PendingWrite y responde al instante; un worker lo aplica después en la API.
+# PRODUCTS_WRITE_BEHIND_WORKER: 'thread' (hilo dentro del proceso web) o
+# 'command' (proceso aparte con `python manage.py process_write_queue`).
+PRODUCTS_WRITE_BEHIND = False
+PRODUCTS_WRITE_BEHIND_WORKER = 'thread'
+PRODUCTS_WRITE_BEHIND_POLL_INTERVAL = 2.0
+PRODUCTS_WRITE_BEHIND_MAX_ATTEMPTS = 8
+PRODUCTS_WRITE_BEHIND_BACKOFF = 1.0  # segundos, se duplica en cada reintento
+PRODUCTS_WRITE_BEHIND_CLAIM_TIMEOUT = 300
+
+# Feed de cambios de productos (/catalog/events/, server-sent events). Con
+# ASGI cada proceso consulta la tabla ProductEvent cada
+# PRODUCT_EVENTS_POLL_INTERVAL segundos para todas sus conexiones; con WSGI se
+# envían los eventos pendientes y el navegador vuelve a conectar pasados
+# PRODUCT_EVENTS_RETRY_MS. Se conservan los últimos PRODUCT_EVENTS_KEEP
+# eventos; un cliente con más de PRODUCT_EVENTS_REPLAY_LIMIT pendientes recarga.
+PRODUCT_EVENTS_POLL_INTERVAL = 1.0
+PRODUCT_EVENTS_HEARTBEAT = 15
+PRODUCT_EVENTS_RETRY_MS = 5000
+PRODUCT_EVENTS_REPLAY_LIMIT = 500
+PRODUCT_EVENTS_QUEUE_SIZE = 1000
+PRODUCT_EVENTS_KEEP = 10000
+
+# Tamaño máximo de página (?limit=) de la API de productos.
+PRODUCTS_API_MAX_PAGE_SIZE = 100
+
+# Consulta de varios productos a la vez (/api/products/multi/?ids=...):
+# máximo de ids, peticiones simultáneas a la API y plazo total en segundos.
+PRODUCTS_MULTI_GET_MAX_IDS = 50
+PRODUCTS_MULTI_GET_CONCURRENCY = 10
+PRODUCTS_MULTI_GET_DEADLINE = 3.0
+
+# Perfilado de peticiones en producción (cProfile). Con PROFILING_ENABLED se
+# perfila 1 de cada PROFILING_SAMPLE_RATE peticiones (0 = ninguna al azar) y
+# las que traen la cabecera X-Profile de un usuario staff o con el valor de
+# PROFILING_TOKEN. Se guardan como máximo PROFILING_MAX_FILES perfiles en
+# PROFILING_DIR; se consultan en /admin/profiles/.
+PROFILING_ENABLED = False
+PROFILING_SAMPLE_RATE = 1000
+PROFILING_TOKEN = ''
+PROFILING_DIR = BASE_DIR / 'profiles'
+PROFILING_MAX_FILES = 200
+
 # Configuración de CORS (Cross-Origin Resource Sharing)
 # Importante para permitir peticiones desde frontend en diferentes dominios
 CORS_ALLOWED_ORIGINS = [
@@ -0,0 +1,59 @@
+"""
+Configuración de producción.
+
+Parte de settings.py y lee de variables de entorno (o de un archivo .env,
+con python-decouple) lo que cambia en cada despliegue. Se activa con
+DJANGO_SETTINGS_MODULE=Platzi_Store_APP.settings_production. Obligatorias:
+SECRET_KEY y ALLOWED_HOSTS (separados por comas).
+"""
+
+from decouple import Csv, config
+
+from .settings import *  # noqa: F401,F403
+from .settings import BASE_DIR, TEMPLATES
+
+SECRET_KEY = config('SECRET_KEY')
+
+DEBUG = config('DEBUG', default=False, cast=bool)
+
+ALLOWED_HOSTS = config('ALLOWED_HOSTS', cast=Csv())
+CSRF_TRUSTED_ORIGINS = config('CSRF_TRUSTED_ORIGINS', default='', cast=Csv())
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': config('DATABASE_PATH', default=str(BASE_DIR / 'db.sqlite3')),
+    }
+}
+
+# Cookies solo por HTTPS; SECURE_COOKIES=False si el sitio se sirve por HTTP.
+SESSION_COOKIE_SECURE = config('SECURE_COOKIES', default=True, cast=bool)
+CSRF_COOKIE_SECURE = SESSION_COOKIE_SECURE
+
+PLATZI_API_BASE_URL = config('PLATZI_API_BASE_URL', default='https://api.escuelajs.co/api/v1/')
+
+PRODUCTS_WARMUP_ON_STARTUP = config('PRODUCTS_WARMUP_ON_STARTUP', default=False, cast=bool)
+
+PROFILING_ENABLED = config('PROFILING_ENABLED', default=False, cast=bool)
+PROFILING_TOKEN = config('PROFILING_TOKEN', default='')
+
+# Plantillas: cada worker las lee y compila una sola vez (cached.Loader), y
+# como TEMPLATES_PRECOMPILE está activo lo hace al arrancar, antes de la
+# primera petición. Con loaders explícitos APP_DIRS debe ser False; el
+# loader app_directories sigue buscando en las carpetas templates/ de las apps.
+TEMPLATES = [
+    {
+        **TEMPLATES[0],
+        'APP_DIRS': False,
+        'OPTIONS': {
+            **TEMPLATES[0]['OPTIONS'],
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
+            ],
+        },
+    },
+]
+TEMPLATES_PRECOMPILE = True
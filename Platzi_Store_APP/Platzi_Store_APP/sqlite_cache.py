@@ -0,0 +1,272 @@
+"""
+Cache backend shared by every worker process on a host.
+
+Entries live in a single SQLite file in WAL mode, so readers never block
+each other or the writer and a value cached by one worker is served by all
+of them. Values are pickled and zlib-compressed above
+COMPRESS_MIN_BYTES. The table is kept under MAX_ENTRIES rows and
+MAX_BYTES of values: expired rows go first, then the ones that expire
+soonest. Reads never write, so this is not least-recently-used culling: a
+hot entry close to its expiry goes before a cold one set later.
+get_or_set() lets only one process compute a missing value while the
+others wait for it.
+
+    CACHES = {
+        'default': {
+            'BACKEND': 'Platzi_Store_APP.sqlite_cache.SQLiteCache',
+            'LOCATION': BASE_DIR / 'cache.sqlite3',
+            'OPTIONS': {'MAX_ENTRIES': 10000, 'MAX_BYTES': 64 * 1024 * 1024},
+        },
+    }
+"""
+import os
+import pickle
+import sqlite3
+import threading
+import time
+import zlib
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+# Expiry stored for entries without timeout, so ordering by expiry works.
+_NEVER = 2.0 ** 62
+
+_RAW, _ZLIB = 0, 1
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache_entry (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    flags INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    expires REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS cache_entry_expires ON cache_entry (expires);
+CREATE TABLE IF NOT EXISTS cache_stats (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    entries INTEGER NOT NULL,
+    bytes INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO cache_stats (id, entries, bytes) VALUES (1, 0, 0);
+CREATE TRIGGER IF NOT EXISTS cache_entry_insert AFTER INSERT ON cache_entry BEGIN
+    UPDATE cache_stats SET entries = entries + 1, bytes = bytes + NEW.size WHERE id = 1;
+END;
+CREATE TRIGGER IF NOT EXISTS cache_entry_update AFTER UPDATE OF size ON cache_entry BEGIN
+    UPDATE cache_stats SET bytes = bytes - OLD.size + NEW.size WHERE id = 1;
+END;
+CREATE TRIGGER IF NOT EXISTS cache_entry_delete AFTER DELETE ON cache_entry BEGIN
+    UPDATE cache_stats SET entries = entries - 1, bytes = bytes - OLD.size WHERE id = 1;
+END;
+"""
+
+
+class SQLiteCache(BaseCache):
+    """
+    Django cache backend stored in a SQLite file shared between processes.
+
+    OPTIONS, besides the BaseCache ones (MAX_ENTRIES, CULL_FREQUENCY):
+    MAX_BYTES bounds the total size of the stored values,
+    COMPRESS_MIN_BYTES is the pickled size from which values are
+    compressed and LOCK_TIMEOUT is how long get_or_set() waits for another
+    process computing the same key.
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._path = str(location)
+        self._max_bytes = int(options.get('MAX_BYTES', 64 * 1024 * 1024))
+        self._compress_min = int(options.get('COMPRESS_MIN_BYTES', 1024))
+        self._lock_timeout = float(options.get('LOCK_TIMEOUT', 10))
+        self._local = threading.local()
+
+    def _connection(self):
+        # One connection per thread, reopened after a fork.
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self._path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.executescript(_SCHEMA)
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def _encode(self, value):
+        data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        if len(data) >= self._compress_min:
+            compressed = zlib.compress(data, 6)
+            if len(compressed) < len(data):
+                return compressed, _ZLIB
+        return data, _RAW
+
+    @staticmethod
+    def _decode(data, flags):
+        if flags == _ZLIB:
+            data = zlib.decompress(data)
+        return pickle.loads(data)
+
+    def _expiry(self, timeout):
+        expires = self.get_backend_timeout(timeout)
+        return _NEVER if expires is None else expires
+
+    def _write(self, sql, params):
+        conn = self._connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            cursor = conn.execute(sql, params)
+            self._cull(conn)
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        return cursor.rowcount
+
+    def _cull(self, conn):
+        # Deletes expired rows, then 1/CULL_FREQUENCY of the rows at a time
+        # in expiry order (soonest first) until both bounds hold.
+        entries, size = conn.execute('SELECT entries, bytes FROM cache_stats WHERE id = 1').fetchone()
+        if entries <= self._max_entries and size <= self._max_bytes:
+            return
+        conn.execute('DELETE FROM cache_entry WHERE expires <= ?', (time.time(),))
+        while True:
+            entries, size = conn.execute('SELECT entries, bytes FROM cache_stats WHERE id = 1').fetchone()
+            if not entries or (entries <= self._max_entries and size <= self._max_bytes):
+                return
+            if self._cull_frequency == 0:
+                conn.execute('DELETE FROM cache_entry')
+                return
+            conn.execute(
+                'DELETE FROM cache_entry WHERE key IN '
+                '(SELECT key FROM cache_entry ORDER BY expires LIMIT ?)',
+                (max(1, entries // self._cull_frequency),),
+            )
+
+    def get(self, key, default=None, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        row = self._connection().execute(
+            'SELECT value, flags FROM cache_entry WHERE key = ? AND expires > ?', (key, time.time())
+        ).fetchone()
+        return default if row is None else self._decode(*row)
+
+    def get_many(self, keys, version=None):
+        keys = {self.make_and_validate_key(key, version=version): key for key in keys}
+        if not keys:
+            return {}
+        placeholders = ','.join('?' * len(keys))
+        rows = self._connection().execute(
+            f'SELECT key, value, flags FROM cache_entry WHERE key IN ({placeholders}) AND expires > ?',
+            (*keys, time.time()),
+        )
+        return {keys[key]: self._decode(value, flags) for key, value, flags in rows}
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        data, flags = self._encode(value)
+        self._write(
+            'INSERT INTO cache_entry (key, value, flags, size, expires) VALUES (?, ?, ?, ?, ?) '
+            'ON CONFLICT (key) DO UPDATE SET value = excluded.value, flags = excluded.flags, '
+            'size = excluded.size, expires = excluded.expires',
+            (key, data, flags, len(data), self._expiry(timeout)),
+        )
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        data, flags = self._encode(value)
+        # Only replaces a row that has already expired, in one statement.
+        return bool(self._write(
+            'INSERT INTO cache_entry (key, value, flags, size, expires) VALUES (?, ?, ?, ?, ?) '
+            'ON CONFLICT (key) DO UPDATE SET value = excluded.value, flags = excluded.flags, '
+            'size = excluded.size, expires = excluded.expires WHERE cache_entry.expires <= ?',
+            (key, data, flags, len(data), self._expiry(timeout), time.time()),
+        ))
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        return bool(self._write(
+            'UPDATE cache_entry SET expires = ? WHERE key = ? AND expires > ?',
+            (self._expiry(timeout), key, time.time()),
+        ))
+
+    def delete(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        return bool(self._write('DELETE FROM cache_entry WHERE key = ?', (key,)))
+
+    def delete_many(self, keys, version=None):
+        keys = [self.make_and_validate_key(key, version=version) for key in keys]
+        if keys:
+            self._write(f"DELETE FROM cache_entry WHERE key IN ({','.join('?' * len(keys))})", keys)
+
+    def has_key(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        return self._connection().execute(
+            'SELECT 1 FROM cache_entry WHERE key = ? AND expires > ?', (key, time.time())
+        ).fetchone() is not None
+
+    def incr(self, key, delta=1, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        conn = self._connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute(
+                'SELECT value, flags FROM cache_entry WHERE key = ? AND expires > ?', (key, time.time())
+            ).fetchone()
+            if row is None:
+                raise ValueError(f"Key '{key}' not found")
+            value = self._decode(*row) + delta
+            data, flags = self._encode(value)
+            conn.execute(
+                'UPDATE cache_entry SET value = ?, flags = ?, size = ? WHERE key = ?',
+                (data, flags, len(data), key),
+            )
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        return value
+
+    def get_or_set(self, key, default, timeout=DEFAULT_TIMEOUT, version=None):
+        """
+        Returns the cached value, or stores and returns `default` (called
+        if callable). Across processes, a callable default runs once: the
+        process that takes the key's lock computes it and the others wait
+        up to LOCK_TIMEOUT for the result before computing it themselves.
+        """
+        value = self.get(key, self._missing_key, version=version)
+        if value is not self._missing_key:
+            return value
+        if not callable(default):
+            self.add(key, default, timeout=timeout, version=version)
+            return self.get(key, default, version=version)
+
+        lock_key = f'{key}:get_or_set-lock'
+        owner = f'{os.getpid()}:{threading.get_ident()}'
+        deadline = time.monotonic() + self._lock_timeout
+        delay = 0.005
+        while not self.add(lock_key, owner, timeout=self._lock_timeout, version=version):
+            value = self.get(key, self._missing_key, version=version)
+            if value is not self._missing_key:
+                return value
+            if time.monotonic() >= deadline:
+                return super().get_or_set(key, default, timeout=timeout, version=version)
+            time.sleep(delay)
+            delay = min(delay * 2, 0.1)
+        try:
+            value = self.get(key, self._missing_key, version=version)
+            if value is self._missing_key:
+                value = default()
+                self.set(key, value, timeout=timeout, version=version)
+            return value
+        finally:
+            # If default() outlived LOCK_TIMEOUT the lock may have passed to
+            # another process; only release it while it is still ours.
+            self._write(
+                'DELETE FROM cache_entry WHERE key = ? AND value = ?',
+                (self.make_and_validate_key(lock_key, version=version), self._encode(owner)[0]),
+            )
+
+    def clear(self):
+        self._write('DELETE FROM cache_entry', ())
+
+    def close(self, **kwargs):
+        # Connections are kept per thread for the life of the process.
+        pass
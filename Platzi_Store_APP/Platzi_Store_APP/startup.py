@@ -0,0 +1,97 @@
+"""
+Cold start measurements for worker boot and `manage.py check`.
+
+Each target runs in a fresh interpreter, as a new worker would. `measure`
+returns the best wall time of several runs and, from one extra run under
+`python -X importtime`, the import time of every module. Used by
+`manage.py bench_startup` (whose --check-budget fails when a target is
+over BUDGETS) and by the startup tests, which always check that the
+modules in DEFERRED_MODULES are not imported on boot.
+"""
+import os
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+from django.conf import settings
+
+TARGETS = {
+    # What a WSGI server does when it starts a worker.
+    'wsgi': ['-c', 'import Platzi_Store_APP.wsgi'],
+    'check': ['manage.py', 'check'],
+}
+
+# Seconds, best of a few runs. Generous enough for a loaded machine.
+BUDGETS = {
+    'wsgi': 1.0,
+    'check': 2.0,
+}
+
+# Heavy modules that must load on first use, not when a worker boots.
+# requests is not one: Products.views and accounts.views use it on most pages.
+DEFERRED_MODULES = (
+    'rest_framework.views',
+    'rest_framework.serializers',
+    'numpy',
+    'PIL.Image',
+    'pstats',
+)
+
+# Resolving the URLconf imports the view modules, as the first request would.
+_LOAD_URLCONF = 'from django.urls import get_resolver; get_resolver().url_patterns'
+_PRINT_MODULES = 'import sys; print("\\n".join(sorted(sys.modules)))'
+
+
+def _run(args, importtime=False):
+    command = [sys.executable] + (['-X', 'importtime'] if importtime else []) + args
+    env = dict(os.environ)
+    env.setdefault('DJANGO_SETTINGS_MODULE', 'Platzi_Store_APP.settings')
+    started = time.perf_counter()
+    result = subprocess.run(command, cwd=settings.BASE_DIR, env=env, capture_output=True, text=True)
+    elapsed = time.perf_counter() - started
+    if result.returncode:
+        raise RuntimeError(f"{' '.join(command)} failed:\n{result.stderr}")
+    return elapsed, result
+
+
+def parse_importtime(output):
+    """
+    Returns {module: (self µs, cumulative µs)} from -X importtime output.
+    """
+    modules = {}
+    for line in output.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        own, cumulative, name = line[len('import time:'):].split('|')
+        if own.strip().isdigit():
+            modules[name.strip()] = (int(own), int(cumulative))
+    return modules
+
+
+def by_package(modules):
+    """
+    Sums the self import time of `modules` per top-level package.
+    """
+    totals = defaultdict(int)
+    for name, (own, _) in modules.items():
+        totals[name.split('.')[0]] += own
+    return dict(totals)
+
+
+def measure(target, runs=3):
+    """
+    Returns (best wall seconds, {module: (self µs, cumulative µs)}).
+    """
+    args = TARGETS[target]
+    best = min(_run(args)[0] for _ in range(runs))
+    return best, parse_importtime(_run(args, importtime=True)[1].stderr)
+
+
+def boot_modules():
+    """
+    Returns the names of the modules loaded after importing the WSGI
+    application and resolving ROOT_URLCONF.
+    """
+    code = '; '.join([TARGETS['wsgi'][1], _LOAD_URLCONF, _PRINT_MODULES])
+    return set(_run(['-c', code])[1].stdout.split())
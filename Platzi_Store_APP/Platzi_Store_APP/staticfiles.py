@@ -0,0 +1,165 @@
+"""
+Static files storage for production builds.
+
+`collectstatic` with this storage minifies CSS and JS, fingerprints every
+file name with its content hash, writes `staticfiles.json` (used by
+`{% static %}`) and stores `.gz` and `.br` variants of text assets next to
+the hashed files so they can be served without compressing per request
+(see PrecompressedStaticMiddleware).
+"""
+import gzip
+import re
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+
+try:
+    import brotli
+except ImportError:  # brotli es opcional; sin él solo se generan .gz
+    brotli = None
+
+COMPRESSIBLE_EXTENSIONS = ('.css', '.js', '.json', '.svg', '.txt', '.html', '.map')
+
+
+# Comments, and the literals minify_css must not touch: strings and unquoted url()s.
+_CSS_TOKENS = re.compile(r'''/\*.*?\*/|("(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*'|url\([^)'"]*\))''', re.S)
+
+
+def _minify_declarations(match):
+    # Only inside a declaration block is the space around ':' insignificant;
+    # in a selector, `.card :hover` and `.card:hover` differ.
+    return re.sub(r'\s*:\s*', ':', match.group())
+
+
+def minify_css(source):
+    """
+    Removes comments and insignificant whitespace from a stylesheet. Strings
+    and url() values are kept verbatim.
+    """
+    literals = []
+
+    def hold(match):
+        if match.group(1) is None:
+            return ''
+        literals.append(match.group(1))
+        return f'\0{len(literals) - 1}\0'
+
+    # Literals are swapped for NUL-delimited placeholders, which no rule below matches.
+    source = _CSS_TOKENS.sub(hold, source)
+    source = re.sub(r'\s+', ' ', source)
+    source = re.sub(r'\s*([{};,>])\s*', r'\1', source)
+    # Innermost blocks hold declarations (an @media block holds rules).
+    source = re.sub(r'\{[^{}]*\}', _minify_declarations, source)
+    source = source.replace(';}', '}').strip()
+    return re.sub(r'\0(\d+)\0', lambda match: literals[int(match.group(1))], source)
+
+
+def minify_js(source):
+    """
+    Conservative JS minifier: drops indentation, blank lines, `//` comments
+    that occupy whole lines and `/* */` comments at the start of a line.
+    Code inside lines is left untouched so string and regex literals can
+    never be corrupted.
+    """
+    lines = []
+    in_comment = False
+    for line in source.splitlines():
+        stripped = line.strip()
+        if in_comment:
+            if '*/' not in stripped:
+                continue
+            stripped = stripped.split('*/', 1)[1].lstrip()
+            in_comment = False
+        while stripped.startswith('/*'):
+            end = stripped.find('*/', 2)
+            if end == -1:
+                in_comment = True
+                stripped = ''
+                break
+            stripped = stripped[end + 2:].lstrip()
+        if not stripped or stripped.startswith('//'):
+            continue
+        lines.append(stripped)
+    return '\n'.join(lines) + '\n'
+
+
+# Elements whose contents are whitespace-sensitive and kept verbatim by minify_html.
+_VERBATIM_ELEMENTS = re.compile(r'(<(pre|textarea)\b.*?</\2\s*>)', re.S | re.I)
+
+
+def _strip_lines(text):
+    # str.split and str.strip run in C; the equivalent regex is about four times slower.
+    return '\n'.join(filter(None, [line.strip(' \t\r\f\v') for line in text.split('\n')]))
+
+
+def minify_html(source):
+    """
+    Removes indentation, trailing spaces and blank lines from rendered HTML.
+    Lines are never joined, so whitespace between inline elements still
+    renders as one space and inline scripts keep their line breaks; <pre>
+    and <textarea> contents are left untouched.
+    """
+    parts = _VERBATIM_ELEMENTS.split(source)
+    # split() returns text, element, tag name, text, element, tag name, ...
+    del parts[2::3]
+    for i in range(0, len(parts), 2):
+        text = parts[i]
+        # Whitespace touching a verbatim element shrinks to one line break but stays.
+        before = '\n' if i > 0 and text[:1].isspace() else ''
+        after = '\n' if i + 1 < len(parts) and text[-1:].isspace() else ''
+        stripped = _strip_lines(text)
+        parts[i] = before + stripped + after if stripped else before or after
+    return ''.join(parts) + '\n'
+
+
+MINIFIERS = {'.css': minify_css, '.js': minify_js}
+
+# Solo se minifican los estáticos propios; los de Django y DRF se copian tal cual.
+MINIFY_PREFIXES = ('products/', 'accounts/')
+
+
+def compress(data):
+    """
+    Returns {encoding: body} for the precompressed variants worth keeping.
+    """
+    variants = {'gzip': gzip.compress(data, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants['br'] = brotli.compress(data, quality=11)
+    return {encoding: body for encoding, body in variants.items() if len(body) < len(data)}
+
+
+ENCODING_SUFFIXES = {'br': '.br', 'gzip': '.gz'}
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """
+    ManifestStaticFilesStorage that also minifies and precompresses.
+    """
+
+    def _save(self, name, content):
+        minifier = next((m for ext, m in MINIFIERS.items() if name.endswith(ext)), None)
+        if minifier is not None and name.startswith(MINIFY_PREFIXES):
+            content.seek(0)
+            content = ContentFile(minifier(content.read().decode('utf-8')).encode('utf-8'))
+        return super()._save(name, content)
+
+    def stored_name(self, name):
+        # Sin manifest (no se ha ejecutado build_static) se sirven los nombres originales.
+        if not self.hashed_files:
+            return name
+        return super().stored_name(name)
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        for hashed_name in set(self.hashed_files.values()):
+            if not hashed_name.endswith(COMPRESSIBLE_EXTENSIONS):
+                continue
+            with self.open(hashed_name) as f:
+                data = f.read()
+            for encoding, body in compress(data).items():
+                compressed_name = hashed_name + ENCODING_SUFFIXES[encoding]
+                if self.exists(compressed_name):
+                    self.delete(compressed_name)
+                self._save(compressed_name, ContentFile(body))
@@ -0,0 +1,49 @@
+"""
+Template precompilation for the cached template loader.
+
+With django.template.loaders.cached.Loader a worker reads and parses each
+template the first time it renders it and reuses the compiled Template
+afterwards. `precompile` loads every template in the engines' DIRS up
+front; ProductsConfig.ready calls it when TEMPLATES_PRECOMPILE is set, so
+no request pays for parsing and a template that does not compile stops the
+worker at boot instead of failing requests.
+"""
+from pathlib import Path
+
+from django.template import engines
+from django.template.backends.django import DjangoTemplates
+from django.template.loaders.cached import Loader as CachedLoader
+
+# Files in the template directories that are templates (sw.js is rendered too).
+TEMPLATE_SUFFIXES = ('.html', '.js')
+
+
+def uses_cached_loader(engine):
+    return any(isinstance(loader, CachedLoader) for loader in engine.engine.template_loaders)
+
+
+def template_names(engine):
+    """
+    Returns the names of the templates in the DIRS of `engine`.
+    """
+    names = set()
+    for directory in map(Path, engine.engine.dirs):
+        for path in directory.rglob('*'):
+            if path.suffix in TEMPLATE_SUFFIXES and path.is_file():
+                names.add(path.relative_to(directory).as_posix())
+    return sorted(names)
+
+
+def precompile():
+    """
+    Compiles the templates of every Django engine that caches them and
+    returns how many were loaded. Engines without the cached loader would
+    discard the result, so they are skipped.
+    """
+    compiled = 0
+    for engine in engines.all():
+        if isinstance(engine, DjangoTemplates) and uses_cached_loader(engine):
+            for name in template_names(engine):
+                engine.get_template(name)
+                compiled += 1
+    return compiled
@@ -0,0 +1,222 @@
+"""
+Helpers for the performance-budget tests of Products and accounts.
+
+`FakeUpstream` replaces every outgoing HTTP call made through `requests`
+(the Platzi API client in Products.upstream and the auth API calls in
+accounts.views) with canned responses and records them.
+`PerformanceBudgetTestCase.assertWithinBudget` requests a URL and fails
+if it ran more DB queries, more upstream calls or took longer than its
+budget, listing the queries and calls that were made.
+"""
+import io
+import ipaddress
+import json
+import re
+import shutil
+import socket
+import tempfile
+import time
+from unittest import mock
+
+import requests
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import get_resolver
+from PIL import Image
+
+# Wide on purpose: the time budget catches a blocking call or a loop of API
+# calls, not machine-to-machine jitter, which the query and call counts cover.
+DEFAULT_SECONDS = 1.0
+
+CATEGORIES = [
+    {'id': 1, 'name': 'Clothes', 'image': 'https://i.imgur.com/QkIa5tT.jpeg'},
+    {'id': 2, 'name': 'Electronics', 'image': 'https://i.imgur.com/ZANVnHE.jpeg'},
+]
+
+PRODUCTS = [
+    {
+        'id': i,
+        'title': f"Product {i}",
+        'price': 10 * i,
+        'description': f"Description of product {i}",
+        'category': CATEGORIES[i % 2],
+        'images': [f"https://i.imgur.com/product{i}.jpeg"],
+    }
+    for i in range(1, 13)
+]
+
+
+def _png():
+    buffer = io.BytesIO()
+    Image.new('RGB', (1200, 900), (200, 80, 40)).save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+def fake_getaddrinfo(host, port, *args, **kwargs):
+    """
+    Stands in for socket.getaddrinfo: IP literals resolve to themselves,
+    localhost and intranet.example to local addresses and every other name
+    to a public one.
+    """
+    names = {'localhost': '127.0.0.1', 'intranet.example': '10.0.0.5'}
+    try:
+        address = str(ipaddress.ip_address(host))
+    except ValueError:
+        address = names.get(host, '93.184.215.14')
+    return [(socket.AF_INET, socket.SOCK_STREAM, socket.IPPROTO_TCP, '', (address, port))]
+
+
+class FakeUpstream:
+    """
+    Patches requests.Session.request, answering like the Platzi API and the
+    accounts auth API, and DNS lookups (see fake_getaddrinfo). `calls` lists
+    (method, url, params) in order.
+    """
+    _image = None
+
+    def __init__(self):
+        self.calls = []
+        self._patchers = [
+            mock.patch.object(requests.Session, 'request', autospec=True, side_effect=self.request),
+            mock.patch('socket.getaddrinfo', side_effect=fake_getaddrinfo),
+        ]
+
+    def __enter__(self):
+        for patcher in self._patchers:
+            patcher.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        for patcher in self._patchers:
+            patcher.stop()
+
+    @classmethod
+    def image_bytes(cls):
+        if cls._image is None:
+            cls._image = _png()
+        return cls._image
+
+    def request(self, session, method, url, params=None, json=None, **kwargs):
+        self.calls.append((method, url, params))
+        status, body = self.route(method, url, params or {}, json)
+        response = requests.Response()
+        response.status_code = status
+        response.url = url
+        response.request = requests.Request(method, url).prepare()
+        if isinstance(body, bytes):
+            response._content = body
+            response.headers['Content-Type'] = 'image/png'
+        else:
+            response._content = _dumps(body)
+            response.headers['Content-Type'] = 'application/json'
+        response._content_consumed = True
+        return response
+
+    def route(self, method, url, params, payload):
+        if 'imgur.com' in url:
+            return 200, self.image_bytes()
+        if url.endswith('/register/'):
+            return 201, {'user': payload or {}}
+        if url.endswith(('/login/', '/logout/')):
+            return 200, {'user': {'email': 'fake@example.com'}}
+        if url.endswith('/categories'):
+            return 200, CATEGORIES
+        match = re.search(r'/products(?:/(\d+))?$', url)
+        if match is None:
+            return 404, {'message': 'Not found'}
+        product_id = int(match[1]) if match[1] else None
+        if method == 'GET' and product_id is None:
+            category = params.get('categoryId')
+            return 200, [p for p in PRODUCTS if category is None or str(p['category']['id']) == str(category)]
+        product = next((p for p in PRODUCTS if p['id'] == product_id), None)
+        if method == 'POST':
+            return 201, dict(PRODUCTS[0], **(payload or {}), id=100)
+        if product is None:
+            return 400, {'message': 'Could not find any entity'}
+        if method == 'DELETE':
+            return 200, True
+        return 200, dict(product, **(payload or {}))
+
+
+def _dumps(body):
+    return json.dumps(body).encode()
+
+
+class PerformanceBudgetTestCase(TestCase):
+    """
+    Base class for the per-URL budget tests. Each test runs with a fresh
+    cache, rate-limit store and image cache in a temporary directory, and
+    with a fast password hasher so logins do not dominate the timings.
+
+    Subclasses set `urlconf` (e.g. 'Products.urls'); `test_every_url_has_a_budget`
+    then requires a `test_<url name>` method for every URL in it.
+    """
+    urlconf = None
+
+    @classmethod
+    def setUpClass(cls):
+        cls._tmp = tempfile.mkdtemp(prefix='budget-tests-')
+        cls._settings = override_settings(
+            CACHES={'default': {
+                'BACKEND': 'Platzi_Store_APP.sqlite_cache.SQLiteCache',
+                'LOCATION': f"{cls._tmp}/cache.sqlite3",
+            }},
+            UPSTREAM_RATELIMIT_DB=f"{cls._tmp}/ratelimit.sqlite3",
+            UPSTREAM_RATE_LIMITS={'default': {'rate': 1000, 'burst': 1000, 'deadline': 1.0}},
+            PRODUCT_IMAGE_CACHE_DIR=f"{cls._tmp}/images",
+            PROFILING_DIR=f"{cls._tmp}/profiles",
+            PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'],
+            PRODUCTS_WARMUP_ON_STARTUP=False,
+        )
+        cls._settings.enable()
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls._settings.disable()
+        shutil.rmtree(cls._tmp, ignore_errors=True)
+
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        self.upstream = FakeUpstream()
+        self.upstream.__enter__()
+        self.addCleanup(self.upstream.__exit__, None, None, None)
+
+    def assertWithinBudget(self, method, path, queries, upstream_calls, seconds=DEFAULT_SECONDS, **kwargs):
+        """
+        Requests `path` with the test client and checks the budgets. Streaming
+        bodies are consumed inside the measurement (read them afterwards with
+        `response.getvalue()`). Returns the response.
+        """
+        del self.upstream.calls[:]
+        with CaptureQueriesContext(connection) as captured:
+            started = time.perf_counter()
+            response = getattr(self.client, method)(path, **kwargs)
+            if response.streaming:
+                response.streaming_content = [b''.join(response.streaming_content)]
+            elapsed = time.perf_counter() - started
+
+        problems = []
+        if len(captured) > queries:
+            problems.append(f"{len(captured)} queries, budget {queries}")
+        if len(self.upstream.calls) > upstream_calls:
+            problems.append(f"{len(self.upstream.calls)} upstream calls, budget {upstream_calls}")
+        if elapsed > seconds:
+            problems.append(f"{elapsed:.3f}s, budget {seconds}s")
+        if problems:
+            lines = [f"{method.upper()} {path} over budget: {'; '.join(problems)}", 'Queries:']
+            lines += [f"  {q['sql']}" for q in captured.captured_queries] or ['  (none)']
+            lines.append('Upstream calls:')
+            lines += [f"  {m} {u} {p or ''}" for m, u, p in self.upstream.calls] or ['  (none)']
+            self.fail('\n'.join(lines))
+        return response
+
+    def test_every_url_has_a_budget(self):
+        if self.urlconf is None:
+            return
+        names = [p.name for p in get_resolver(self.urlconf).url_patterns if p.name]
+        missing = [name for name in names if not hasattr(self, f"test_{name}")]
+        self.assertEqual(missing, [], f"URLs without a budget test in {type(self).__name__}")
@@ -0,0 +1,299 @@
+import gzip
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+from django.conf import settings
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.template import engines
+from django.template.loaders.filesystem import Loader as FilesystemLoader
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from . import middleware, sqlite_cache, startup, staticfiles, template_cache
+from .middleware import ResponseCompressionMiddleware
+
+
+# Wall-clock timings depend on the machine and its load, so the default test
+# run skips them and only checks, deterministically, which modules a boot
+# imports. Time the targets with `manage.py bench_startup --check-budget`.
+TIME_STARTUP = bool(os.environ.get('STARTUP_BUDGET_TESTS'))
+
+
+class StartupBudgetTests(SimpleTestCase):
+    """
+    Cold start budgets from startup.py. `manage.py bench_startup` shows
+    where the time goes. Set STARTUP_BUDGET_TESTS=1 to time the targets too.
+    """
+
+    def assertWithinStartupBudget(self, target):
+        seconds, modules = startup.measure(target, runs=2)
+        budget = startup.BUDGETS[target]
+        slowest = sorted(modules.items(), key=lambda m: -m[1][1])[:15]
+        self.assertLessEqual(seconds, budget, '\n'.join(
+            [f"{target} took {seconds:.3f}s, budget {budget}s. Slowest imports (cumulative):"]
+            + [f"  {name} {cumulative / 1000:.1f} ms" for name, (_, cumulative) in slowest]
+        ))
+
+    def test_boot_defers_heavy_modules(self):
+        loaded = set(startup.DEFERRED_MODULES) & startup.boot_modules()
+        self.assertEqual(loaded, set(), 'Imported when a worker boots instead of on first use')
+
+    @unittest.skipUnless(TIME_STARTUP, 'STARTUP_BUDGET_TESTS is not set')
+    def test_wsgi(self):
+        self.assertWithinStartupBudget('wsgi')
+
+    @unittest.skipUnless(TIME_STARTUP, 'STARTUP_BUDGET_TESTS is not set')
+    def test_check(self):
+        self.assertWithinStartupBudget('check')
+
+
+PRODUCTION_TEMPLATES = [{
+    **settings.TEMPLATES[0],
+    'APP_DIRS': False,
+    'OPTIONS': {
+        **settings.TEMPLATES[0]['OPTIONS'],
+        'loaders': [('django.template.loaders.cached.Loader', [
+            'django.template.loaders.filesystem.Loader',
+            'django.template.loaders.app_directories.Loader',
+        ])],
+    },
+}]
+
+
+class TemplatePrecompileTests(SimpleTestCase):
+    """
+    template_cache.precompile and the production settings that enable it.
+    """
+
+    @override_settings(TEMPLATES=PRODUCTION_TEMPLATES)
+    def test_precompiled_templates_are_not_read_again(self):
+        engine = engines['django']
+        names = template_cache.template_names(engine)
+        self.assertIn('catalog.html', names)
+        self.assertIn('register.html', names)
+        self.assertEqual(template_cache.precompile(), len(names))
+        with mock.patch.object(FilesystemLoader, 'get_contents', side_effect=AssertionError('template read')):
+            for name in names:
+                engine.get_template(name)
+
+    @override_settings(TEMPLATES=[{
+        **PRODUCTION_TEMPLATES[0],
+        'OPTIONS': {**PRODUCTION_TEMPLATES[0]['OPTIONS'], 'loaders': PRODUCTION_TEMPLATES[0]['OPTIONS']['loaders'][0][1]},
+    }])
+    def test_uncached_engines_are_skipped(self):
+        self.assertEqual(template_cache.precompile(), 0)
+
+    def test_production_settings(self):
+        env = dict(
+            os.environ,
+            DJANGO_SETTINGS_MODULE='Platzi_Store_APP.settings_production',
+            SECRET_KEY='test-secret-key',
+            ALLOWED_HOSTS='shop.example.com,www.shop.example.com',
+        )
+        code = (
+            'import django; django.setup(); '
+            'from django.conf import settings; from django.template import engines; '
+            'print(settings.DEBUG, settings.ALLOWED_HOSTS); '
+            'print(sorted(engines["django"].engine.template_loaders[0].get_template_cache))'
+        )
+        result = subprocess.run([sys.executable, '-c', code], cwd=settings.BASE_DIR, env=env,
+                                capture_output=True, text=True)
+        self.assertEqual(result.returncode, 0, result.stderr)
+        debug, compiled = result.stdout.splitlines()
+        self.assertEqual(debug, "False ['shop.example.com', 'www.shop.example.com']")
+        # Compiled when the apps were loaded, before any request.
+        self.assertIn("'catalog.html'", compiled)
+        self.assertIn("'login.html'", compiled)
+
+
+class ResponseCompressionTests(SimpleTestCase):
+    """
+    ResponseCompressionMiddleware on responses built here, without views.
+    """
+    page = '<html>\n    <body>\n\n        <p>Producto</p>\n' * 200 + '<textarea>\n    tal cual\n</textarea>\n'
+
+    def respond(self, response, **headers):
+        request = RequestFactory().get('/', **headers)
+        return ResponseCompressionMiddleware(lambda request: response)(request)
+
+    def test_minifies_and_compresses_html(self):
+        response = self.respond(HttpResponse(self.page), HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        html = gzip.decompress(response.content).decode()
+        self.assertTrue(html.startswith('<html>\n<body>\n<p>Producto</p>\n'))
+        self.assertIn('<textarea>\n    tal cual\n</textarea>', html)
+
+    def test_without_accept_encoding(self):
+        response = self.respond(JsonResponse({'results': ['x' * 10] * 200}))
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(json.loads(response.content)['results'][0], 'x' * 10)
+
+    def test_skips_small_streaming_and_encoded_responses(self):
+        small = self.respond(JsonResponse({'ok': True}), HTTP_ACCEPT_ENCODING='gzip')
+        streaming = self.respond(StreamingHttpResponse([self.page]), HTTP_ACCEPT_ENCODING='gzip')
+        encoded = HttpResponse(b'x' * 2000)
+        encoded['Content-Encoding'] = 'identity'
+        for response in (small, streaming, self.respond(encoded, HTTP_ACCEPT_ENCODING='gzip')):
+            self.assertNotEqual(response.get('Content-Encoding'), 'gzip')
+
+    def test_reuses_compressed_cacheable_bodies(self):
+        middleware._compress_cached.cache_clear()
+        first = self.respond(HttpResponse(self.page), HTTP_ACCEPT_ENCODING='gzip')
+        second = self.respond(HttpResponse(self.page), HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(first.content, second.content)
+        self.assertEqual(middleware._compress_cached.cache_info().hits, 1)
+
+        # Per-visitor responses are compressed on their own, with random padding.
+        with_cookie = HttpResponse(self.page + 'cookie')
+        with_cookie.set_cookie('csrftoken', 'x')
+        session = HttpResponse(self.page + 'session')
+        session['Vary'] = 'Cookie'
+        for response in (with_cookie, session):
+            self.respond(response, HTTP_ACCEPT_ENCODING='gzip')
+        request = RequestFactory().get('/', HTTP_ACCEPT_ENCODING='gzip')
+        request.user = mock.Mock(is_authenticated=True)
+        ResponseCompressionMiddleware(lambda request: HttpResponse(self.page))(request)
+        self.assertEqual(middleware._compress_cached.cache_info().currsize, 1)
+        self.assertEqual(middleware._compress_cached.cache_info().hits, 1)
+
+
+class MinifierTests(SimpleTestCase):
+    """
+    The CSS and JS minifiers and compress() used by build_static.
+    """
+
+    def test_css(self):
+        source = '/* card */\n.card :hover , .a > b {\n  color : red ;\n  margin: 0  auto;\n}\n'
+        self.assertEqual(staticfiles.minify_css(source), '.card :hover,.a>b{color:red;margin:0 auto}')
+
+    def test_css_keeps_media_query_spacing(self):
+        source = '@media (min-width: 600px) {\n  .x:first-child { top : 0; }\n}'
+        self.assertEqual(staticfiles.minify_css(source), '@media (min-width: 600px){.x:first-child{top:0}}')
+
+    def test_css_keeps_strings_and_urls(self):
+        source = '.a::before { content : "x ; y /* z */" ; }\n.b { background: url(data:image/png;base64,AA==) , url(\'c ,d.png\'); }'
+        self.assertEqual(
+            staticfiles.minify_css(source),
+            '.a::before{content:"x ; y /* z */"}.b{background:url(data:image/png;base64,AA==),url(\'c ,d.png\')}',
+        )
+
+    def test_js_keeps_code_after_a_comment(self):
+        source = '/* a */ foo();\n/* b\n   c */ bar();\n/* d */ /* e */\nbaz();\n'
+        self.assertEqual(staticfiles.minify_js(source), 'foo();\nbar();\nbaz();\n')
+
+    def test_js_drops_only_whole_line_comments_and_indentation(self):
+        source = (
+            '/* header\n   comment */\n'
+            'function f() {\n'
+            '    // note\n'
+            '\n'
+            "    return 'a // b /* c */';  // trailing\n"
+            '}\n'
+        )
+        self.assertEqual(
+            staticfiles.minify_js(source),
+            "function f() {\nreturn 'a // b /* c */';  // trailing\n}\n",
+        )
+
+    def test_compress_keeps_only_smaller_variants(self):
+        variants = staticfiles.compress(b'body { color: red; }\n' * 100)
+        self.assertEqual(gzip.decompress(variants['gzip']), b'body { color: red; }\n' * 100)
+        self.assertEqual(staticfiles.compress(b'x'), {})
+
+
+class SQLiteCacheTests(SimpleTestCase):
+    """
+    SQLiteCache on a temporary file.
+    """
+
+    def make_cache(self, **options):
+        tmp = tempfile.mkdtemp(prefix='sqlite-cache-tests-')
+        self.addCleanup(shutil.rmtree, tmp, ignore_errors=True)
+        return sqlite_cache.SQLiteCache(f"{tmp}/cache.sqlite3", {'TIMEOUT': 300, 'OPTIONS': options})
+
+    def test_set_get_many(self):
+        cache = self.make_cache(COMPRESS_MIN_BYTES=100)
+        values = {'a': 1, 'b': 'x' * 1000, 'c': {'nested': [1, 2]}}
+        cache.set_many(values)
+        self.assertEqual(cache.get_many(['a', 'b', 'c', 'missing']), values)
+        self.assertEqual(cache.get('missing', 'default'), 'default')
+        # The large value was compressed.
+        flags = cache._connection().execute("SELECT flags FROM cache_entry WHERE key LIKE '%b'").fetchone()[0]
+        self.assertEqual(flags, sqlite_cache._ZLIB)
+
+    def test_add_only_replaces_expired_entries(self):
+        cache = self.make_cache()
+        self.assertTrue(cache.add('k', 1))
+        self.assertFalse(cache.add('k', 2))
+        self.assertEqual(cache.get('k'), 1)
+        cache.set('k', 3, timeout=1)
+        with mock.patch('time.time', return_value=time.time() + 10):
+            self.assertTrue(cache.add('k', 4))
+        self.assertEqual(cache.get('k'), 4)
+
+    def test_get_or_set_releases_only_its_own_lock(self):
+        cache = self.make_cache()
+        self.assertEqual(cache.get_or_set('a', lambda: 1), 1)
+        self.assertFalse(cache.has_key('a:get_or_set-lock'))
+
+        def slow():
+            # The lock expired meanwhile and another process took it.
+            cache.set('b:get_or_set-lock', 'other')
+            return 2
+
+        self.assertEqual(cache.get_or_set('b', slow), 2)
+        self.assertEqual(cache.get('b:get_or_set-lock'), 'other')
+
+    def test_incr(self):
+        cache = self.make_cache()
+        cache.set('n', 1)
+        self.assertEqual(cache.incr('n'), 2)
+        self.assertEqual(cache.incr('n', 10), 12)
+        self.assertEqual(cache.decr('n', 2), 10)
+        with self.assertRaises(ValueError):
+            cache.incr('missing')
+
+    def test_expiry(self):
+        cache = self.make_cache()
+        cache.set('short', 1, timeout=5)
+        cache.set('forever', 2, timeout=None)
+        later = time.time() + 60
+        with mock.patch('time.time', return_value=later):
+            self.assertIsNone(cache.get('short'))
+            self.assertFalse(cache.has_key('short'))
+            self.assertEqual(cache.get_many(['short', 'forever']), {'forever': 2})
+            self.assertFalse(cache.touch('short'))
+            self.assertTrue(cache.touch('forever', 5))
+        with mock.patch('time.time', return_value=later + 60):
+            self.assertIsNone(cache.get('forever'))
+
+    def test_cull_removes_expired_then_soonest_to_expire(self):
+        cache = self.make_cache(MAX_ENTRIES=3, CULL_FREQUENCY=3)
+        cache.set('expired', 0, timeout=1)
+        cache.set('soon', 1, timeout=100)
+        cache.set('later', 2, timeout=200)
+        with mock.patch('time.time', return_value=time.time() + 10):
+            cache.set('new', 3, timeout=50)
+            # Only the expired row had to go.
+            self.assertEqual(set(cache.get_many(['soon', 'later', 'new'])), {'soon', 'later', 'new'})
+            # Reading 'new' does not protect it: it expires first.
+            cache.get('new')
+            cache.set('newest', 4, timeout=300)
+            self.assertEqual(set(cache.get_many(['soon', 'later', 'new', 'newest'])), {'soon', 'later', 'newest'})
+
+    def test_cull_by_size(self):
+        cache = self.make_cache(MAX_BYTES=3000, COMPRESS_MIN_BYTES=10 ** 6)
+        for i in range(5):
+            cache.set(f"k{i}", b'x' * 1000, timeout=100 + i)
+        entries, size = cache._connection().execute('SELECT entries, bytes FROM cache_stats').fetchone()
+        self.assertLessEqual(size, 3000)
+        self.assertTrue(cache.has_key('k4'))
+        self.assertFalse(cache.has_key('k0'))
+        self.assertEqual(entries, len(cache.get_many([f"k{i}" for i in range(5)])))
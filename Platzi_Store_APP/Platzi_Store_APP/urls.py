@@ -17,7 +17,11 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 
+from . import profiling
+
 urlpatterns = [
+    path('admin/profiles/', profiling.profile_list, name='profile_list'),
+    path('admin/profiles/<str:name>/', profiling.profile_detail, name='profile_detail'),
     path('admin/', admin.site.urls),
     path('', include('Products.urls')),
     path('', include('accounts.urls')),
@@ -0,0 +1,133 @@
+/**
+ * Service worker for Platzi Store (served by Products.views.service_worker).
+ *
+ * - The static shell is precached on install.
+ * - Catalog and product detail pages are stale-while-revalidate: the cached
+ *   copy is shown at once and refreshed in the background. Pages marked
+ *   Cache-Control private or no-store (rendered for a logged-in user, with
+ *   messages or a CSRF form) are never stored.
+ * - Product images from the /images/ proxy are cache-first.
+ *
+ * Cache names carry the static manifest version, so a deploy with new static
+ * files installs a new worker and the old caches are dropped on activate.
+ */
+const VERSION = {{ version_json|safe }};
+const SHELL_CACHE = 'platzi-store-shell-' + VERSION;
+const PAGES_CACHE = 'platzi-store-pages-' + VERSION;
+const IMAGES_CACHE = 'platzi-store-images-' + VERSION;
+const CACHES = [SHELL_CACHE, PAGES_CACHE, IMAGES_CACHE];
+
+const SHELL_URLS = {{ shell_json|safe }};
+const SHELL_EXTERNAL_URLS = {{ shell_external_json|safe }};
+const PAGE_PATTERNS = [/^\/catalog\/$/, /^\/catalog\/\d+\/$/, /^\/catalog\/fragment\/$/];
+const IMAGES_PREFIX = {{ images_prefix_json|safe }};
+const AUTH_PATHS = {{ auth_paths_json|safe }};
+const MAX_IMAGES = 300;
+
+self.addEventListener('install', function(event) {
+    event.waitUntil(
+        caches.open(SHELL_CACHE).then(function(cache) {
+            const external = SHELL_EXTERNAL_URLS.map(function(url) {
+                // CDN assets are best effort; they must not block the install.
+                return cache.add(new Request(url, { mode: 'cors' })).catch(function() {});
+            });
+            return Promise.all([cache.addAll(SHELL_URLS)].concat(external));
+        }).then(function() {
+            return self.skipWaiting();
+        })
+    );
+});
+
+self.addEventListener('activate', function(event) {
+    event.waitUntil(
+        caches.keys().then(function(names) {
+            return Promise.all(names.filter(function(name) {
+                return name.startsWith('platzi-store-') && CACHES.indexOf(name) === -1;
+            }).map(function(name) {
+                return caches.delete(name);
+            }));
+        }).then(function() {
+            return self.clients.claim();
+        })
+    );
+});
+
+function trimCache(name, maxEntries) {
+    return caches.open(name).then(function(cache) {
+        return cache.keys().then(function(keys) {
+            return Promise.all(keys.slice(0, Math.max(0, keys.length - maxEntries)).map(function(key) {
+                return cache.delete(key);
+            }));
+        });
+    });
+}
+
+function isShareable(response) {
+    return response.ok && !/(^|[\s,])(private|no-store)\b/i.test(response.headers.get('Cache-Control') || '');
+}
+
+function staleWhileRevalidate(event) {
+    return caches.open(PAGES_CACHE).then(function(cache) {
+        // catalog.js asks for a fresh grid ('no-cache') after a product change.
+        const lookup = event.request.cache === 'no-cache' ? Promise.resolve(undefined) : cache.match(event.request);
+        return lookup.then(function(cached) {
+            const network = fetch(event.request).then(function(response) {
+                if (isShareable(response)) {
+                    cache.put(event.request, response.clone());
+                } else if (cached) {
+                    cache.delete(event.request);
+                }
+                return response;
+            });
+            if (cached) {
+                event.waitUntil(network.catch(function() {}));
+                return cached;
+            }
+            return network;
+        });
+    });
+}
+
+function cacheFirst(request, cacheName) {
+    return caches.open(cacheName).then(function(cache) {
+        return cache.match(request).then(function(cached) {
+            if (cached) {
+                return cached;
+            }
+            return fetch(request).then(function(response) {
+                // Opaque (no-cors) responses may be errors in disguise; they are not kept.
+                if (response.ok) {
+                    cache.put(request, response.clone()).then(function() {
+                        return trimCache(cacheName, MAX_IMAGES);
+                    });
+                }
+                return response;
+            });
+        });
+    });
+}
+
+self.addEventListener('fetch', function(event) {
+    const request = event.request;
+    const url = new URL(request.url);
+    const sameOrigin = url.origin === self.location.origin;
+
+    // Writes (product changes, login, logout) make the cached pages outdated.
+    if (request.method !== 'GET' || (sameOrigin && AUTH_PATHS.indexOf(url.pathname) !== -1)) {
+        if (sameOrigin) {
+            event.waitUntil(caches.delete(PAGES_CACHE));
+        }
+        return;
+    }
+    if (sameOrigin && PAGE_PATTERNS.some(function(pattern) { return pattern.test(url.pathname); })) {
+        event.respondWith(staleWhileRevalidate(event));
+        return;
+    }
+    if (sameOrigin && url.pathname === IMAGES_PREFIX) {
+        event.respondWith(cacheFirst(request, IMAGES_CACHE));
+        return;
+    }
+    if (SHELL_URLS.indexOf(url.pathname) !== -1 || SHELL_EXTERNAL_URLS.indexOf(request.url) !== -1) {
+        event.respondWith(cacheFirst(request, SHELL_CACHE));
+    }
+});
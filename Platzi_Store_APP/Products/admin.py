@@ -1,3 +1,19 @@
 from django.contrib import admin
 
-# Register your models here.
+from .models import PendingWrite, ProductEvent
+
+
+@admin.register(PendingWrite)
+class PendingWriteAdmin(admin.ModelAdmin):
+    list_display = ('id', 'operation', 'product_id', 'status', 'attempts', 'next_attempt_at', 'updated_at')
+    list_filter = ('status', 'operation')
+    search_fields = ('product_id',)
+    readonly_fields = ('created_at', 'updated_at')
+
+
+@admin.register(ProductEvent)
+class ProductEventAdmin(admin.ModelAdmin):
+    list_display = ('id', 'kind', 'product_id', 'created_at')
+    list_filter = ('kind',)
+    search_fields = ('product_id',)
+    readonly_fields = ('created_at',)
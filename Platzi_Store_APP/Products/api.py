@@ -0,0 +1,233 @@
+"""
+JSON API views of Products, built on Django REST Framework.
+
+They live apart from views.py so that REST Framework is imported only when
+an API URL is first requested (see Platzi_Store_APP.lazyurls).
+"""
+import base64
+import bisect
+import hashlib
+import json
+from concurrent.futures import ThreadPoolExecutor, wait
+from dataclasses import asdict
+
+import requests
+from django.conf import settings
+from django.utils.http import parse_etags
+from rest_framework import serializers, status
+from rest_framework.decorators import api_view, parser_classes, permission_classes, renderer_classes
+from rest_framework.parsers import MultiPartParser
+from rest_framework.permissions import AllowAny, IsAdminUser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+from . import bulk, index, ratelimit, upstream
+from .serializers import CompactProductSerializer
+from .upstream import BASE_API_URL
+
+
+def _encode_cursor(last_id):
+    return base64.urlsafe_b64encode(str(last_id).encode()).decode().rstrip('=')
+
+
+def _decode_cursor(cursor):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        return int(base64.urlsafe_b64decode(padded.encode()).decode())
+    except (ValueError, UnicodeDecodeError):
+        raise serializers.ValidationError({'cursor': 'Invalid cursor.'})
+
+
+def _page_size(request):
+    try:
+        limit = int(request.query_params.get('limit', settings.REST_FRAMEWORK['PAGE_SIZE']))
+    except ValueError:
+        raise serializers.ValidationError({'limit': 'Must be an integer.'})
+    return max(1, min(limit, settings.PRODUCTS_API_MAX_PAGE_SIZE))
+
+
+def _etag_matches(etag, if_none_match):
+    # If-None-Match uses the weak comparison: W/"x" matches "x" (RFC 9110 13.1.2).
+    tags = parse_etags(if_none_match)
+    return '*' in tags or any(tag.removeprefix('W/') == etag for tag in tags)
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+@renderer_classes([JSONRenderer])
+def products_api(request):
+    """
+    Read-only, compact product list for API clients.
+
+    Endpoint: GET /api/products/
+
+    Query parameters:
+    - category: category id to filter by
+    - fields: comma-separated subset of CompactProductSerializer.FIELDS
+    - limit: page size (default PAGE_SIZE, at most PRODUCTS_API_MAX_PAGE_SIZE)
+    - cursor: opaque value taken from the previous page's `next`
+
+    Pages are keyed on product id, so they stay stable while products are
+    added; they are cut from the local product index of the cached catalog.
+    Responses carry an ETag and honour If-None-Match.
+    """
+    fields = CompactProductSerializer.parse_fields(request.query_params.get('fields'))
+    limit = _page_size(request)
+    cursor = request.query_params.get('cursor')
+    after_id = _decode_cursor(cursor) if cursor else None
+    category_id = request.query_params.get('category')
+    try:
+        category_id = int(category_id) if category_id else None
+    except ValueError:
+        raise serializers.ValidationError({'category': 'Must be an integer.'})
+
+    try:
+        # The index sorts its id column without copying the product dicts.
+        products = index.get_index().query(category_id=category_id, sort='id')
+    except requests.exceptions.RequestException as e:
+        return Response({'detail': f"Error fetching data from API: {e}"}, status=status.HTTP_502_BAD_GATEWAY)
+
+    start = 0
+    if after_id is not None:
+        start = bisect.bisect_right(products, after_id, key=lambda p: p['id'])
+    page = products[start:start + limit]
+    has_more = start + limit < len(products)
+
+    payload = {
+        'results': CompactProductSerializer(fields).many(page),
+        'next': replace_query_param(
+            request.build_absolute_uri(), 'cursor', _encode_cursor(page[-1]['id'])
+        ) if has_more else None,
+    }
+
+    etag = '"%s"' % hashlib.md5(
+        json.dumps(payload, separators=(',', ':'), sort_keys=True).encode()
+    ).hexdigest()
+    headers = {'ETag': etag, 'Cache-Control': f'max-age={settings.UPSTREAM_CACHE_TTL}'}
+    if _etag_matches(etag, request.headers.get('If-None-Match', '')):
+        return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(payload, headers=headers)
+
+
+@api_view(['POST'])
+@permission_classes([IsAdminUser])
+@parser_classes([MultiPartParser])
+@renderer_classes([JSONRenderer])
+def products_import_api(request):
+    """
+    Bulk creates or updates products from an uploaded file.
+
+    Endpoint: POST /api/products/import/ (staff only)
+
+    Parameters (multipart):
+    - file: CSV with a header row, or JSON lines. Columns/keys are the
+      ProductForm fields (title, price, description, category_id, images);
+      rows with an `id` update that product.
+    - format: 'csv' or 'jsonl' (guessed from the file name by default)
+
+    Returns a summary with throughput and one result per row.
+    """
+    upload = request.FILES.get('file')
+    if upload is None:
+        return Response({'detail': "A 'file' upload is required."}, status=status.HTTP_400_BAD_REQUEST)
+    fmt = request.data.get('format') or bulk.detect_format(upload.name)
+    if fmt not in bulk.FORMATS:
+        return Response({'detail': f"Unsupported format '{fmt}'."}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        results, summary = bulk.BulkImporter().run(bulk.iter_rows(upload.file, fmt))
+    except requests.exceptions.RequestException as e:
+        return Response({'detail': f"Error fetching data from API: {e}"}, status=status.HTTP_502_BAD_GATEWAY)
+    return Response({'summary': summary, 'results': [asdict(r) for r in results]})
+
+
+# Shared by every multi-get request, so threads are not started per request
+# and at most PRODUCTS_MULTI_GET_CONCURRENCY fetches run per worker.
+_multi_get_pool = ThreadPoolExecutor(
+    max_workers=settings.PRODUCTS_MULTI_GET_CONCURRENCY, thread_name_prefix='multi-get'
+)
+
+
+def _product_error(exc):
+    response = getattr(exc, 'response', None)
+    if response is not None and response.status_code in (400, 404):
+        return 'not_found'
+    return str(exc)
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+@renderer_classes([JSONRenderer])
+def products_multi_get_api(request):
+    """
+    Returns several products at once, in the order requested.
+
+    Endpoint: GET /api/products/multi/?ids=1,2,3
+
+    Query parameters:
+    - ids: comma-separated product ids (at most PRODUCTS_MULTI_GET_MAX_IDS)
+    - fields: comma-separated subset of CompactProductSerializer.FIELDS
+
+    Products already cached (individually or in the cached catalog) are
+    served from there; the rest are fetched concurrently and must arrive
+    within PRODUCTS_MULTI_GET_DEADLINE seconds. When more are missing than
+    can be fetched at once (the 'products' burst or the concurrency), the
+    whole catalog is fetched once instead. Each result has either a
+    `product` or an `error` ('not_found', 'timeout' or the API error).
+    """
+    fields = CompactProductSerializer.parse_fields(request.query_params.get('fields'))
+    try:
+        ids = [int(i) for i in request.query_params.get('ids', '').split(',') if i.strip()]
+    except ValueError:
+        raise serializers.ValidationError({'ids': 'Must be a comma-separated list of integers.'})
+    if not ids:
+        raise serializers.ValidationError({'ids': 'This parameter is required.'})
+    if len(ids) > settings.PRODUCTS_MULTI_GET_MAX_IDS:
+        raise serializers.ValidationError({'ids': f"At most {settings.PRODUCTS_MULTI_GET_MAX_IDS} ids."})
+
+    found = {}
+    catalog = upstream.peek(BASE_API_URL) or []
+    wanted = set(ids)
+    for product in catalog:
+        if product.get('id') in wanted:
+            found[product['id']] = product
+    for product_id in wanted - found.keys():
+        product = upstream.peek(f"{BASE_API_URL}/{product_id}")
+        if product is not None:
+            found[product_id] = product
+
+    errors = {}
+    misses = [i for i in dict.fromkeys(ids) if i not in found]
+    bucket, _ = ratelimit.get_bucket('products')
+    if len(misses) > min(bucket.burst, settings.PRODUCTS_MULTI_GET_CONCURRENCY):
+        try:
+            catalog = upstream.get_json(BASE_API_URL, 'products')
+        except requests.exceptions.RequestException as e:
+            return Response({'detail': f"Error fetching data from API: {e}"}, status=status.HTTP_502_BAD_GATEWAY)
+        for product in catalog:
+            if product.get('id') in wanted:
+                found[product['id']] = product
+        errors = dict.fromkeys(misses, 'not_found')
+    elif misses:
+        futures = {
+            _multi_get_pool.submit(upstream.get_json, f"{BASE_API_URL}/{product_id}", 'products'): product_id
+            for product_id in misses
+        }
+        done, not_done = wait(futures, timeout=settings.PRODUCTS_MULTI_GET_DEADLINE)
+        for future in done:
+            try:
+                found[futures[future]] = future.result()
+            except requests.exceptions.RequestException as e:
+                errors[futures[future]] = _product_error(e)
+        for future in not_done:
+            future.cancel()
+            errors[futures[future]] = 'timeout'
+
+    serializer = CompactProductSerializer(fields)
+    results = [
+        {'id': product_id, 'product': serializer.to_representation(found[product_id])}
+        if product_id in found else {'id': product_id, 'error': errors[product_id]}
+        for product_id in ids
+    ]
+    return Response({'results': results})
@@ -1,6 +1,15 @@
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class ProductsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'Products'
+
+    def ready(self):
+        if settings.TEMPLATES_PRECOMPILE:
+            from Platzi_Store_APP import template_cache
+            template_cache.precompile()
+        if settings.PRODUCTS_WARMUP_ON_STARTUP:
+            from . import warmup
+            warmup.start_refresher()
@@ -0,0 +1,199 @@
+"""
+Bulk product import.
+
+Rows are read one at a time from CSV or JSON lines, validated with
+ProductForm and sent to the API by a bounded pool of threads: at most
+`concurrency` writes are in flight and at most twice that many rows are
+buffered, so memory stays flat for large files. Rows with an `id` update
+that product (PUT); rows without one create a new product (POST). The
+written rows are published on the product change feed in one batch.
+"""
+import csv
+import io
+import json
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+
+import requests
+from django.conf import settings
+
+from . import events, upstream
+from .forms import ProductForm
+from .upstream import BASE_API_URL, CATEGORY_API_URL
+
+FORMATS = ('csv', 'jsonl')
+
+
+@dataclass
+class RowResult:
+    row: int
+    status: str  # created, updated, invalid or failed
+    product_id: int = None
+    errors: dict = field(default_factory=dict)
+    attempts: int = 0
+
+
+def detect_format(filename, default='csv'):
+    """
+    Guesses the input format from a file name.
+    """
+    name = (filename or '').lower()
+    if name.endswith(('.jsonl', '.ndjson', '.json')):
+        return 'jsonl'
+    if name.endswith('.csv'):
+        return 'csv'
+    return default
+
+
+def iter_rows(binary, fmt):
+    """
+    Yields (row_number, dict) from a binary file object, reading lazily.
+    Undecodable JSON lines are yielded as their parse error string.
+    """
+    text = io.TextIOWrapper(binary, encoding='utf-8-sig', newline='')
+    if fmt == 'csv':
+        for number, row in enumerate(csv.DictReader(text), start=1):
+            yield number, row
+        return
+    for number, line in enumerate(text, start=1):
+        if not line.strip():
+            continue
+        try:
+            yield number, json.loads(line)
+        except json.JSONDecodeError as e:
+            yield number, f"Invalid JSON: {e}"
+
+
+def _form_data(row):
+    data = dict(row)
+    images = data.get('images')
+    if isinstance(images, list):
+        data['images'] = ', '.join(images)
+    if 'category_id' not in data and 'categoryId' in data:
+        data['category_id'] = data['categoryId']
+    return data
+
+
+def _product_id(row):
+    """
+    The row's `id` as a positive int, or None when it has none. Raises
+    ValueError for anything else: the id ends up in the PUT path.
+    """
+    value = row.get('id')
+    if value is None or value == '':
+        return None
+    text = str(value).strip()
+    if not (text.isascii() and text.isdigit()) or int(text) == 0:
+        raise ValueError(value)
+    return int(text)
+
+
+def _retryable(exc, idempotent):
+    """
+    Whether a failed write may be sent again. A POST is only repeated when
+    the API cannot have created the product: the request never went out
+    (throttled, connection refused) or the API answered 429 or 5xx. A read
+    timeout may come after the product was created, so it is final.
+    """
+    if isinstance(exc, upstream.UpstreamThrottled):
+        return True
+    response = getattr(exc, 'response', None)
+    if response is not None:
+        return response.status_code == 429 or response.status_code >= 500
+    if idempotent:
+        return True
+    return isinstance(exc, requests.exceptions.ConnectionError)
+
+
+class BulkImporter:
+    """
+    Imports rows into the API and collects a per-row report.
+    """
+
+    def __init__(self, concurrency=None, retries=None, backoff=0.5):
+        self.concurrency = concurrency or settings.PRODUCTS_IMPORT_CONCURRENCY
+        self.retries = settings.PRODUCTS_IMPORT_RETRIES if retries is None else retries
+        self.backoff = backoff
+
+    def _write(self, number, product_id, payload):
+        if product_id:
+            method, url, ok_status = 'PUT', f"{BASE_API_URL}/{product_id}", 'updated'
+        else:
+            method, url, ok_status = 'POST', BASE_API_URL, 'created'
+
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                response = upstream.send(method, url, 'bulk', json=payload, invalidate_cache=False)
+                break
+            except requests.exceptions.RequestException as e:
+                if attempt > self.retries or not _retryable(e, idempotent=method == 'PUT'):
+                    return RowResult(number, 'failed', product_id, {'__all__': [str(e)]}, attempt)
+                time.sleep(self.backoff * 2 ** (attempt - 1))
+
+        # The write went through; an unreadable body must not turn it into a retry.
+        try:
+            body = response.json()
+        except ValueError:
+            body = None
+        if isinstance(body, dict):
+            product_id = body.get('id', product_id)
+        result = RowResult(number, ok_status, product_id, attempts=attempt)
+        # The row statuses double as event kinds.
+        self._written.append((ok_status, result.product_id, payload))
+        return result
+
+    def run(self, rows):
+        """
+        Imports `rows` (an iterable of (row_number, dict)) and returns
+        (results ordered by row, summary dict).
+        """
+        started = time.monotonic()
+        self._written = []
+        categories = upstream.get_json(CATEGORY_API_URL, 'categories')
+        results = []
+        pending = set()
+
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            for number, row in rows:
+                if not isinstance(row, dict):
+                    results.append(RowResult(number, 'invalid', errors={'__all__': [str(row)]}))
+                    continue
+                form = ProductForm(_form_data(row), categories=categories)
+                errors = {} if form.is_valid() else form.errors.get_json_data()
+                try:
+                    product_id = _product_id(row)
+                except ValueError:
+                    product_id = None
+                    errors['id'] = [{'message': 'Must be a positive integer.', 'code': 'invalid'}]
+                if errors:
+                    results.append(RowResult(number, 'invalid', product_id, errors))
+                    continue
+
+                pending.add(pool.submit(self._write, number, product_id, form.to_payload()))
+                if len(pending) >= self.concurrency * 2:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    results.extend(f.result() for f in done)
+
+            results.extend(f.result() for f in wait(pending).done)
+
+        upstream.invalidate()
+        events.record_many(self._written)
+        results.sort(key=lambda r: r.row)
+        return results, self.summarize(results, time.monotonic() - started)
+
+    @staticmethod
+    def summarize(results, seconds):
+        counts = {status: 0 for status in ('created', 'updated', 'invalid', 'failed')}
+        for result in results:
+            counts[result.status] += 1
+        written = counts['created'] + counts['updated']
+        return {
+            'total': len(results),
+            **counts,
+            'seconds': round(seconds, 3),
+            'rows_per_second': round(len(results) / seconds, 2) if seconds else None,
+            'writes_per_second': round(written / seconds, 2) if seconds else None,
+        }
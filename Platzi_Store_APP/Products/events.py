@@ -0,0 +1,272 @@
+"""
+Product change feed.
+
+Product changes made through this site (product_add, product_edit and
+product_delete, the write-behind worker and bulk imports) are stored as
+ProductEvent rows, whose id is the feed cursor. `views.product_events`
+streams them to browsers as server-sent events.
+
+Each event loop runs one Broadcaster task that polls the table for rows
+newer than the last one it saw and puts them on its subscribers' queues.
+An idle connection costs one queue, and the process one query per
+PRODUCT_EVENTS_POLL_INTERVAL however many clients are connected. Events
+recorded by the same process wake the broadcasters at once; those written
+by other processes (`process_write_queue`, `import_products`) are picked
+up by the next poll.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import weakref
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+
+from .models import PendingWrite, ProductEvent
+
+logger = logging.getLogger(__name__)
+
+# Event kind for each write-behind operation.
+OPERATION_KINDS = {
+    PendingWrite.CREATE: ProductEvent.CREATED,
+    PendingWrite.UPDATE: ProductEvent.UPDATED,
+    PendingWrite.DELETE: ProductEvent.DELETED,
+}
+
+# Payload keys and how to read the current value from an API product.
+_PRODUCT_VALUES = {
+    'title': lambda p: p.get('title'),
+    'price': lambda p: p.get('price'),
+    'description': lambda p: p.get('description'),
+    'categoryId': lambda p: str((p.get('category') or {}).get('id')),
+    'images': lambda p: p.get('images'),
+}
+
+# One broadcaster per running event loop.
+_broadcasters = weakref.WeakKeyDictionary()
+
+# Old events are pruned every this many polls (about ten minutes).
+_PRUNE_EVERY = 600
+
+
+def changed_fields(product, payload):
+    """
+    Returns the entries of an API payload that differ from `product`.
+    """
+    changed = {}
+    for key, value in payload.items():
+        current = _PRODUCT_VALUES.get(key)
+        if current is None or (str(value) if key == 'categoryId' else value) != current(product):
+            changed[key] = value
+    return changed
+
+
+def product_version(product):
+    """
+    Returns a short hash of the editable values of an API product. Edit
+    forms carry it to detect changes made since the product was fetched.
+    """
+    values = {key: current(product) for key, current in _PRODUCT_VALUES.items()}
+    return hashlib.sha256(json.dumps(values, sort_keys=True).encode()).hexdigest()[:16]
+
+
+def record(kind, product_id, fields=None):
+    """
+    Stores a product change and wakes this process' broadcasters once it
+    is committed.
+    """
+    event = ProductEvent.objects.create(kind=kind, product_id=product_id, fields=fields or {})
+    transaction.on_commit(notify)
+    return event
+
+
+def record_many(changes):
+    """
+    Stores several (kind, product_id, fields) changes with one query.
+    """
+    if not changes:
+        return []
+    created = ProductEvent.objects.bulk_create([
+        ProductEvent(kind=kind, product_id=product_id, fields=fields or {}) for kind, product_id, fields in changes
+    ])
+    transaction.on_commit(notify)
+    return created
+
+
+def notify():
+    for loop, broadcaster in list(_broadcasters.items()):
+        if not loop.is_closed():
+            loop.call_soon_threadsafe(broadcaster.wakeup.set)
+
+
+def latest_id():
+    last = ProductEvent.objects.order_by('-id').values_list('id', flat=True).first()
+    return last or 0
+
+
+def since(cursor, until=None, limit=None):
+    """
+    Returns the events after `cursor` (up to `until`), oldest first.
+    """
+    events = ProductEvent.objects.filter(id__gt=cursor)
+    if until is not None:
+        events = events.filter(id__lte=until)
+    events = events.order_by('id')
+    return list(events[:limit] if limit else events)
+
+
+def replay(cursor, until):
+    """
+    Returns the events a client resuming from `cursor` missed, or None if
+    it must reload instead: the cursor is from before the oldest event kept,
+    from another database, or more than PRODUCT_EVENTS_REPLAY_LIMIT behind.
+    """
+    if cursor >= until:
+        # It may have seen newer events through another process.
+        return [] if cursor <= latest_id() else None
+    limit = settings.PRODUCT_EVENTS_REPLAY_LIMIT
+    events = since(cursor, until, limit + 1)
+    if len(events) > limit:
+        return None
+    oldest = ProductEvent.objects.order_by('id').values_list('id', flat=True).first()
+    if oldest is not None and cursor < oldest - 1:
+        return None
+    return events
+
+
+def prune():
+    """
+    Keeps only the newest PRODUCT_EVENTS_KEEP events.
+    """
+    cutoff = latest_id() - settings.PRODUCT_EVENTS_KEEP
+    if cutoff <= 0:
+        return 0
+    deleted, _ = ProductEvent.objects.filter(id__lte=cutoff).delete()
+    return deleted
+
+
+def format_event(event):
+    """
+    Serializes an event in the text/event-stream format.
+    """
+    data = json.dumps({'id': event.product_id, 'fields': event.fields}, separators=(',', ':'))
+    return f"id: {event.id}\nevent: {event.kind}\ndata: {data}\n\n"
+
+
+def missed(cursor, until):
+    """
+    Returns the text/event-stream chunks for a client connecting with
+    `cursor` (None for a first connection) while `until` is the newest
+    event: the events it missed, or a `reset` event if it must reload.
+    Always ends with the id to resume from.
+    """
+    if cursor is None:
+        # No data: only sets the browser's last event id.
+        return [f"id: {until}\n\n"]
+    events = replay(cursor, until)
+    if events is None:
+        return [f"id: {until}\nevent: reset\ndata: {{}}\n\n"]
+    return [format_event(event) for event in events] or [f"id: {max(cursor, until)}\n\n"]
+
+
+async def stream(cursor):
+    """
+    Yields the events after `cursor` as text/event-stream chunks until the
+    client disconnects, with a comment every PRODUCT_EVENTS_HEARTBEAT
+    seconds so proxies keep idle connections open. Ends early if the client
+    falls behind; the browser then reconnects and replays what it missed.
+    """
+    broadcaster = get_broadcaster()
+    subscription = await broadcaster.subscribe()
+    try:
+        yield f"retry: {settings.PRODUCT_EVENTS_RETRY_MS}\n\n"
+        for chunk in await sync_to_async(missed)(cursor, subscription.cursor):
+            yield chunk
+        last = max(cursor or 0, subscription.cursor)
+        while not (subscription.overflowed and subscription.queue.empty()):
+            try:
+                event = await asyncio.wait_for(subscription.queue.get(), settings.PRODUCT_EVENTS_HEARTBEAT)
+            except asyncio.TimeoutError:
+                yield ': keepalive\n\n'
+                continue
+            if event.id > last:
+                last = event.id
+                yield format_event(event)
+    finally:
+        broadcaster.unsubscribe(subscription)
+
+
+class Subscription:
+    def __init__(self, cursor):
+        # Events with a greater id arrive on the queue; older ones are replayed from the table.
+        self.cursor = cursor
+        self.queue = asyncio.Queue(maxsize=settings.PRODUCT_EVENTS_QUEUE_SIZE)
+        # Set when the client fell too far behind; it has to reconnect and replay.
+        self.overflowed = False
+
+
+class Broadcaster:
+    """
+    Polls for new events and fans them out to the subscriptions of one
+    event loop. The polling task runs only while someone is subscribed.
+    """
+
+    def __init__(self):
+        self.subscriptions = set()
+        self.wakeup = asyncio.Event()
+        self.last_id = None
+        self._task = None
+        self._polls = 0
+
+    async def subscribe(self):
+        if self._task is None:
+            self.last_id = max(self.last_id or 0, await sync_to_async(latest_id)())
+        subscription = Subscription(self.last_id)
+        self.subscriptions.add(subscription)
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+        return subscription
+
+    def unsubscribe(self, subscription):
+        self.subscriptions.discard(subscription)
+        if not self.subscriptions:
+            self.wakeup.set()
+
+    def publish(self, events):
+        for event in events:
+            self.last_id = event.id
+            for subscription in list(self.subscriptions):
+                try:
+                    subscription.queue.put_nowait(event)
+                except asyncio.QueueFull:
+                    subscription.overflowed = True
+                    self.subscriptions.discard(subscription)
+
+    async def _run(self):
+        while self.subscriptions:
+            try:
+                self.publish(await sync_to_async(since)(self.last_id, limit=settings.PRODUCT_EVENTS_QUEUE_SIZE))
+                self._polls += 1
+                if self._polls % _PRUNE_EVERY == 0:
+                    await sync_to_async(prune)()
+            except Exception:
+                logger.exception('Product event broadcaster failed to poll')
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), settings.PRODUCT_EVENTS_POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            self.wakeup.clear()
+        self._task = None
+
+
+def get_broadcaster():
+    """
+    Returns the broadcaster of the running event loop.
+    """
+    loop = asyncio.get_running_loop()
+    broadcaster = _broadcasters.get(loop)
+    if broadcaster is None:
+        broadcaster = _broadcasters[loop] = Broadcaster()
+    return broadcaster
@@ -1,6 +1,22 @@
 from django import forms
+from django.conf import settings
 import requests
 
+from . import images, upstream
+
+class CategoryField(forms.ChoiceField):
+    """
+    Category choice. With `accept_any` set (the choices were not loaded)
+    any numeric id is valid and the API has the last word.
+    """
+    accept_any = False
+
+    def valid_value(self, value):
+        if self.accept_any:
+            return str(value).isdigit()
+        return super().valid_value(value)
+
+
 class ProductForm(forms.Form):
     title = forms.CharField(label='Producto', max_length=200)
     price = forms.IntegerField(label='Precio', min_value=0)
@@ -8,21 +24,28 @@ class ProductForm(forms.Form):
     images = forms.CharField(label='Urls de las imágenes (separadas por comas)', widget=forms.Textarea)
     
     # Category field with dynamic choices
-    category_id = forms.ChoiceField(label='Categoria')
+    category_id = CategoryField(label='Categoria')
 
-    def __init__(self, *args, **kwargs):
+    def __init__(self, *args, categories=None, **kwargs):
         super().__init__(*args, **kwargs)
+        # Callers validating many rows pass the categories in to avoid refetching them
+        if categories is None:
+            self.load_categories()
+        else:
+            self.set_categories(categories)
+
+    def load_categories(self):
         try:
-            response = requests.get("https://api.escuelajs.co/api/v1/categories")
-            response.raise_for_status()
-            categories = response.json()
-            # Create a list of tuples for the choices: (value, label)
-            category_choices = [(cat['id'], cat['name']) for cat in categories]
-            self.fields['category_id'].choices = category_choices
+            self.set_categories(upstream.get_json(upstream.CATEGORY_API_URL, 'categories'))
         except requests.exceptions.RequestException:
             # Handle API call failure gracefully
             self.fields['category_id'].choices = [('', 'Failed to load categories')]
 
+    def set_categories(self, categories):
+        # Create a list of tuples for the choices: (value, label)
+        self.fields['category_id'].choices = [(cat['id'], cat['name']) for cat in categories]
+        self.fields['category_id'].accept_any = False
+
     def clean_images(self):
         # Validate that each part of the comma-separated string is a URL
         images_string = self.cleaned_data.get('images', '')
@@ -32,4 +55,50 @@ class ProductForm(forms.Form):
         for url in image_urls:
             if not (url.startswith('http://') or url.startswith('https://')):
                 raise forms.ValidationError("Each image URL must be a valid HTTP or HTTPS URL.")
-        return images_string
\ No newline at end of file
+
+        # Optionally check that every URL actually serves an image (one concurrent round trip)
+        if settings.PRODUCT_IMAGE_VERIFY:
+            errors = images.check_urls(image_urls)
+            if errors:
+                raise forms.ValidationError([f"{url} {errors[url]}." for url in image_urls if url in errors])
+        return images_string
+
+    def to_payload(self):
+        """
+        Builds the body the API expects from the cleaned data.
+        """
+        return {
+            'title': self.cleaned_data['title'],
+            'price': self.cleaned_data['price'],
+            'description': self.cleaned_data['description'],
+            'categoryId': self.cleaned_data['category_id'],
+            # The API expects a list of image URLs.
+            'images': [img.strip() for img in self.cleaned_data['images'].split(',')],
+        }
+
+
+class ProductEditForm(ProductForm):
+    """
+    ProductForm carrying the version of the product being edited (see
+    events.product_version). A submitted form is validated against the
+    cached categories instead of fetching them; if they are not cached any
+    category id is accepted and `ensure_categories` loads the choices only
+    when the form has to be shown again.
+    """
+    version = forms.CharField(widget=forms.HiddenInput, required=False)
+
+    def __init__(self, data=None, *args, categories=None, **kwargs):
+        accept_any = False
+        if data is not None and categories is None:
+            categories = upstream.peek(upstream.CATEGORY_API_URL, stale=True)
+            if categories is None:
+                categories, accept_any = [], True
+        super().__init__(data, *args, categories=categories, **kwargs)
+        self.fields['category_id'].accept_any = accept_any
+
+    def ensure_categories(self):
+        """
+        Loads the category choices skipped when the form was submitted.
+        """
+        if self.fields['category_id'].accept_any:
+            self.load_categories()
@@ -0,0 +1,271 @@
+"""
+Resized product image variants backed by an on-disk cache.
+
+Originals are fetched once per source URL. Originals and variants are
+content-addressed: file names derive from the hash of the original bytes
+(plus width and format for variants), so the same image published under
+several URLs is stored and resized only once. The cache is bounded
+by PRODUCT_IMAGE_CACHE_MAX_BYTES: the bytes written are added up in the
+Django cache, and only when that total passes the bound is the directory
+walked and trimmed, least recently used files first (by mtime, refreshed
+on every hit), down to EVICT_TO of the bound.
+
+`check_urls` verifies that product image URLs answer with an image,
+probing them concurrently and caching each verdict.
+"""
+import hashlib
+import io
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor, wait
+from pathlib import Path
+from urllib.parse import urlencode
+
+import requests
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+from django.urls import reverse
+from django.utils.crypto import constant_time_compare
+
+from . import upstream
+
+FORMATS = {
+    'webp': ('WEBP', 'image/webp', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', 'image/jpeg', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+_signer = signing.Signer(salt='Products.images')
+
+# Bytes written to the image cache directory since it was last measured.
+_SIZE_KEY = 'image-cache:bytes'
+
+# What check_urls reports for any URL that fails: the form is shown to
+# anonymous users, so it must not tell them what an address answered.
+CHECK_FAILED = 'did not answer with an image'
+
+# Shared by every check_urls call, so threads are not started per request.
+_check_pool = ThreadPoolExecutor(
+    max_workers=settings.PRODUCT_IMAGE_VERIFY_CONCURRENCY, thread_name_prefix='image-check'
+)
+
+# Eviction trims the cache to this fraction of its bound, so the directory
+# is walked again only after many more misses.
+EVICT_TO = 0.9
+
+
+class InvalidImageRequest(Exception):
+    """
+    Raised when a proxy URL was not produced by `proxy_url`.
+    """
+
+
+def _signature(src, width, fmt):
+    return _signer.signature(f"{src}|{width}|{fmt}")
+
+
+def proxy_url(src, width, fmt='jpeg'):
+    """
+    Returns the signed proxy URL for `src` resized to `width` pixels.
+    """
+    query = urlencode({'src': src, 'w': width, 'fmt': fmt, 'sig': _signature(src, width, fmt)})
+    return f"{reverse('Products:product_image')}?{query}"
+
+
+def verify(src, width, fmt, sig):
+    """
+    Checks a proxy request and returns (src, width, fmt) with width as int.
+    """
+    try:
+        width = int(width)
+    except (TypeError, ValueError):
+        raise InvalidImageRequest('Invalid width')
+    if not src or fmt not in FORMATS or width not in settings.PRODUCT_IMAGE_WIDTHS:
+        raise InvalidImageRequest('Unsupported image variant')
+    if not constant_time_compare(sig or '', _signature(src, width, fmt)):
+        raise InvalidImageRequest('Bad signature')
+    return src, width, fmt
+
+
+def _check_key(url):
+    return f"image-check:{hashlib.sha256(url.encode()).hexdigest()}"
+
+
+def _check(url):
+    """
+    Returns True if `url` answers 2xx (redirects are not followed) with an
+    image Content-Type.
+    """
+    status, content_type = upstream.probe(url, 'images', timeout=settings.PRODUCT_IMAGE_VERIFY_TIMEOUT)
+    return 200 <= status < 300 and content_type.lower().startswith('image/')
+
+
+def check_urls(urls):
+    """
+    Verifies image URLs and returns {url: error} for the broken ones.
+
+    Verdicts are shared through the cache: working URLs for
+    PRODUCT_IMAGE_VERIFY_TTL, broken ones for PRODUCT_IMAGE_VERIFY_FAILURE_TTL.
+    The others are probed concurrently, so the check takes about one
+    round trip (at most PRODUCT_IMAGE_VERIFY_TIMEOUT) however many there
+    are. Every broken URL gets the same CHECK_FAILED error. Connection
+    errors and timeouts count as broken but are not cached; URLs that could
+    not be probed because of our own rate limit pass. Hosts with private or
+    local addresses are never contacted (see upstream.probe).
+    """
+    urls = list(dict.fromkeys(urls))
+    keys = {_check_key(url): url for url in urls}
+    cached = cache.get_many(keys)
+    errors = {keys[key]: CHECK_FAILED for key, verdict in cached.items() if verdict}
+    misses = [url for url in urls if _check_key(url) not in cached]
+    if not misses:
+        return errors
+
+    futures = {_check_pool.submit(_check, url): url for url in misses}
+    done, not_done = wait(futures, timeout=settings.PRODUCT_IMAGE_VERIFY_TIMEOUT * 2)
+
+    verified, failed = {}, {}
+    for future in done:
+        url = futures[future]
+        try:
+            ok = future.result()
+        except upstream.UpstreamThrottled:
+            continue
+        except upstream.UnsafeURL:
+            ok = False
+        except requests.exceptions.RequestException:
+            errors[url] = CHECK_FAILED
+            continue
+        if ok:
+            verified[_check_key(url)] = ''
+        else:
+            errors[url] = failed[_check_key(url)] = CHECK_FAILED
+    for future in not_done:
+        future.cancel()
+        errors[futures[future]] = CHECK_FAILED
+    cache.set_many(verified, settings.PRODUCT_IMAGE_VERIFY_TTL)
+    cache.set_many(failed, settings.PRODUCT_IMAGE_VERIFY_FAILURE_TTL)
+    return errors
+
+
+def _cache_dir():
+    return Path(settings.PRODUCT_IMAGE_CACHE_DIR)
+
+
+def _write_atomic(path, data):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent)
+    with os.fdopen(fd, 'wb') as f:
+        f.write(data)
+    os.replace(tmp, path)
+    _account(len(data))
+
+
+def _account(size):
+    """
+    Adds `size` bytes to the running total and evicts once it passes the
+    bound. An untracked total (a cleared cache) is measured by evict().
+    """
+    try:
+        total = cache.incr(_SIZE_KEY, size)
+    except ValueError:
+        total = None
+    if total is None or total > settings.PRODUCT_IMAGE_CACHE_MAX_BYTES:
+        evict()
+
+
+def _touch(path):
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+
+
+def _source_digest(src):
+    """
+    Returns the content digest of `src`'s original, fetching and storing
+    the original the first time. `sources/` maps URL hashes to digests so
+    a cached variant can be served without re-reading the original.
+    """
+    pointer = _cache_dir() / 'sources' / hashlib.sha256(src.encode()).hexdigest()
+    try:
+        digest = pointer.read_text()
+    except OSError:
+        digest = None
+    if digest and (_cache_dir() / 'originals' / digest).exists():
+        _touch(pointer)
+        return digest
+    data = upstream.fetch_bytes(src, 'images', max_bytes=settings.PRODUCT_IMAGE_MAX_SOURCE_BYTES)
+    digest = hashlib.sha256(data).hexdigest()
+    _write_atomic(_cache_dir() / 'originals' / digest, data)
+    _write_atomic(pointer, digest.encode())
+    return digest
+
+
+def _resize(data, width, fmt):
+    # Pillow loads with the first resize, not with every user of this module.
+    from PIL import Image, ImageOps
+
+    pil_format, _, options = FORMATS[fmt]
+    try:
+        image = Image.open(io.BytesIO(data))
+    except Image.DecompressionBombError as e:
+        raise OSError(str(e))
+    with image:
+        image = ImageOps.exif_transpose(image)
+        if image.width > width:
+            height = max(1, round(image.height * width / image.width))
+            image = image.resize((width, height), Image.LANCZOS)
+        if image.mode not in ('RGB', 'RGBA') or (fmt == 'jpeg' and image.mode != 'RGB'):
+            image = image.convert('RGB')
+        out = io.BytesIO()
+        image.save(out, pil_format, **options)
+    return out.getvalue()
+
+
+def get_variant(src, width, fmt):
+    """
+    Returns (path, content_type) of the resized variant, building it if
+    needed. Raises requests exceptions if the original cannot be fetched
+    and OSError if it is not a decodable image.
+    """
+    digest = _source_digest(src)
+    path = _cache_dir() / 'variants' / digest[:2] / f"{digest}-{width}.{fmt}"
+    if path.exists():
+        _touch(path)
+    else:
+        original = _cache_dir() / 'originals' / digest
+        _write_atomic(path, _resize(original.read_bytes(), width, fmt))
+        _touch(original)
+    return path, FORMATS[fmt][1]
+
+
+def evict():
+    """
+    Measures the cache directory and, if it is over its size bound, removes
+    least recently used files until it is down to EVICT_TO of the bound.
+    Stores the resulting size as the running total.
+    """
+    files = []
+    total = 0
+    for root, _, names in os.walk(_cache_dir()):
+        for name in names:
+            path = os.path.join(root, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+
+    if total > settings.PRODUCT_IMAGE_CACHE_MAX_BYTES:
+        target = settings.PRODUCT_IMAGE_CACHE_MAX_BYTES * EVICT_TO
+        for _, size, path in sorted(files):
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            if total <= target:
+                break
+    cache.set(_SIZE_KEY, total, None)
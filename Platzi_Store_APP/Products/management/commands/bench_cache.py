@@ -0,0 +1,96 @@
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management.base import BaseCommand
+
+from Platzi_Store_APP.sqlite_cache import SQLiteCache
+
+
+def _payload(products):
+    # Same shape as a cached upstream catalog entry.
+    return {
+        'fetched_at': time.time(),
+        'data': [
+            {
+                'id': i,
+                'title': f"Product {i}",
+                'price': i % 500,
+                'description': "Lorem ipsum dolor sit amet, consectetur adipiscing elit. " * 3,
+                'category': {'id': i % 5 + 1, 'name': f"Category {i % 5 + 1}"},
+                'images': [f"https://i.imgur.com/{i:07d}.jpeg"],
+            }
+            for i in range(products)
+        ],
+    }
+
+
+def _timed(operation, count):
+    started = time.perf_counter()
+    for i in range(count):
+        operation(i)
+    return count / (time.perf_counter() - started)
+
+
+def _make_backend(name, directory, params):
+    if name == 'locmem':
+        return LocMemCache('bench', params)
+    if name == 'filebased':
+        return FileBasedCache(os.path.join(directory, 'files'), params)
+    return SQLiteCache(os.path.join(directory, 'cache.sqlite3'), params)
+
+
+def _shared_hits(args):
+    # Runs in a forked reader process, like another web worker would.
+    name, directory, params, keys = args
+    backend = _make_backend(name, directory, params)
+    return sum(backend.get(f"bench:{i}") is not None for i in range(keys))
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmarks the shared SQLite cache backend against LocMemCache and "
+        "FileBasedCache: operations per second and hits seen by other processes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--keys', type=int, default=500, help='Number of keys written and read.')
+        parser.add_argument('--products', type=int, default=50, help='Products in each cached value.')
+        parser.add_argument('--processes', type=int, default=4, help='Worker processes reading the keys.')
+
+    def handle(self, *args, **options):
+        keys, processes = options['keys'], options['processes']
+        value = _payload(options['products'])
+        directory = tempfile.mkdtemp(prefix='bench_cache-')
+        params = {'TIMEOUT': 300, 'OPTIONS': {'MAX_ENTRIES': keys * 2}}
+
+        self.stdout.write(
+            f"{keys} keys, values of {options['products']} products, {processes} reader processes\n"
+        )
+        self.stdout.write(
+            f"{'backend':<10} {'set/s':>9} {'get/s':>9} {'miss/s':>9} {'get_many/s':>11} {'shared hits':>12}"
+        )
+        context = multiprocessing.get_context('fork')
+        try:
+            for name in ('locmem', 'filebased', 'sqlite'):
+                backend = _make_backend(name, directory, params)
+                backend.clear()
+                # Readers are forked before any write, as long-running web workers are.
+                pool = context.Pool(processes)
+                sets = _timed(lambda i: backend.set(f"bench:{i}", value), keys)
+                gets = _timed(lambda i: backend.get(f"bench:{i}"), keys)
+                misses = _timed(lambda i: backend.get(f"missing:{i}"), keys)
+                batch = [f"bench:{i}" for i in range(min(keys, 20))]
+                many = _timed(lambda i: backend.get_many(batch), max(1, keys // 20))
+                with pool:
+                    hits = pool.map(_shared_hits, [(name, directory, params, keys)] * processes)
+                self.stdout.write(
+                    f"{name:<10} {sets:>9.0f} {gets:>9.0f} {misses:>9.0f} {many:>11.0f} "
+                    f"{sum(hits) / (keys * processes):>11.0%}"
+                )
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
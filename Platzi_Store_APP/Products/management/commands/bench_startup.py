@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from Platzi_Store_APP import startup
+
+
+class Command(BaseCommand):
+    help = (
+        "Measures cold start: importing the WSGI application and running `manage.py check` "
+        "in a fresh interpreter, with the slowest modules and packages to import."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=5, help='Runs per target; the best time is reported.')
+        parser.add_argument('--top', type=int, default=15, help='Modules and packages listed per target.')
+        parser.add_argument('--check-budget', action='store_true',
+                            help='Exit with an error if a target is over its budget.')
+
+    def handle(self, *args, **options):
+        top = options['top']
+        over = []
+        for target in startup.TARGETS:
+            seconds, modules = startup.measure(target, options['runs'])
+            budget = startup.BUDGETS[target]
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f"{target}: {seconds * 1000:.0f} ms (budget {budget * 1000:.0f} ms), {len(modules)} modules"
+            ))
+            if seconds > budget:
+                over.append(target)
+
+            self.stdout.write(f"  {'module':<48} {'self ms':>8} {'cumul. ms':>10}")
+            for name, (own, cumulative) in sorted(modules.items(), key=lambda m: -m[1][0])[:top]:
+                self.stdout.write(f"  {name:<48} {own / 1000:>8.1f} {cumulative / 1000:>10.1f}")
+            self.stdout.write(f"  {'package':<48} {'self ms':>8}")
+            for name, own in sorted(startup.by_package(modules).items(), key=lambda p: -p[1])[:top]:
+                self.stdout.write(f"  {name:<48} {own / 1000:>8.1f}")
+            self.stdout.write('')
+
+        loaded = sorted(set(startup.DEFERRED_MODULES) & startup.boot_modules())
+        if loaded:
+            self.stdout.write(self.style.WARNING(f"Imported on boot, should be deferred: {', '.join(loaded)}"))
+        if options['check_budget'] and (over or loaded):
+            raise CommandError(f"Startup budget exceeded: {', '.join(over + loaded)}")
@@ -0,0 +1,117 @@
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand
+from django.template.backends.django import DjangoTemplates
+from django.test import RequestFactory
+
+from accounts.forms import UserLoginForm, UserRegistrationForm
+from Platzi_Store_APP import template_cache
+from Products.forms import ProductForm
+
+LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+
+# What each mode puts in OPTIONS['loaders']: without the cached loader every
+# render reads and parses the template, its parent and its includes again.
+MODES = {
+    'uncached': LOADERS,
+    'cached': [('django.template.loaders.cached.Loader', LOADERS)],
+}
+
+
+def _catalog(products):
+    categories = [{'id': i, 'name': f"Category {i}"} for i in range(1, 6)]
+    return categories, [
+        {
+            'id': i,
+            'title': f"Product {i}",
+            'price': i % 500,
+            'description': "Lorem ipsum dolor sit amet, consectetur adipiscing elit. " * 3,
+            'category': categories[i % 5],
+            'images': [f"https://i.imgur.com/{i:07d}.jpeg"],
+        }
+        for i in range(1, products + 1)
+    ]
+
+
+def _pages(products):
+    # The templates the views render, with the context they pass.
+    categories, catalog = _catalog(products)
+    return {
+        'home.html': {},
+        'catalog.html': {'products': catalog, 'categories': categories, 'selected_category': None},
+        'product_detail.html': {'product': catalog[0]},
+        'product_form.html': {'form': ProductForm(categories=categories), 'page_title': 'Add New Product'},
+        'login.html': {'form': UserLoginForm()},
+        'register.html': {'form': UserRegistrationForm()},
+    }
+
+
+def _engine(loaders):
+    options = settings.TEMPLATES[0]
+    return DjangoTemplates({
+        'NAME': 'bench',
+        'DIRS': options['DIRS'],
+        'APP_DIRS': False,
+        'OPTIONS': {
+            'context_processors': options['OPTIONS']['context_processors'],
+            'loaders': loaders,
+            'debug': False,
+        },
+    })
+
+
+def _best_ms(render, renders, repeats):
+    best = float('inf')
+    for _ in range(repeats):
+        started = time.perf_counter()
+        for _ in range(renders):
+            render()
+        best = min(best, (time.perf_counter() - started) / renders)
+    return best * 1000
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmarks rendering each page template with and without the cached "
+        "template loader: milliseconds per render and the one-off cost of "
+        "precompiling them at startup."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--renders', type=int, default=200, help='Renders per page and mode in each repeat.')
+        parser.add_argument('--repeats', type=int, default=3, help='Repeats per page and mode; the best is reported.')
+        parser.add_argument('--products', type=int, default=24, help='Products on the catalog page.')
+
+    def handle(self, *args, **options):
+        request = RequestFactory().get('/')
+        request.user = AnonymousUser()
+        pages = _pages(options['products'])
+        engines = {mode: _engine(loaders) for mode, loaders in MODES.items()}
+
+        cached = engines['cached']
+        started = time.perf_counter()
+        names = template_cache.template_names(cached)
+        for name in names:
+            cached.get_template(name)
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f"Precompiling {len(names)} templates: {(time.perf_counter() - started) * 1000:.1f} ms per worker"
+        ))
+
+        self.stdout.write(f"  {'page':<22} {'uncached ms':>12} {'cached ms':>10} {'speedup':>8}")
+        for name, context in pages.items():
+            timings = {
+                mode: _best_ms(
+                    lambda: engine.get_template(name).render(context, request),
+                    options['renders'], options['repeats'],
+                )
+                for mode, engine in engines.items()
+            }
+            self.stdout.write(
+                f"  {name:<22} {timings['uncached']:>12.3f} {timings['cached']:>10.3f} "
+                f"{timings['uncached'] / timings['cached']:>7.1f}x"
+            )
@@ -0,0 +1,40 @@
+import os
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+
+from Platzi_Store_APP.staticfiles import ENCODING_SUFFIXES
+
+
+class Command(BaseCommand):
+    help = (
+        "Builds the production static files: minified, fingerprinted and "
+        "precompressed copies in STATIC_ROOT plus the staticfiles.json manifest."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clear', action='store_true', help='Remove STATIC_ROOT contents first.')
+
+    def handle(self, *args, **options):
+        call_command('collectstatic', interactive=False, clear=options['clear'], verbosity=0)
+        staticfiles_storage.load_manifest()
+
+        root = settings.STATIC_ROOT
+        rows = []
+        for name, hashed_name in sorted(staticfiles_storage.hashed_files.items()):
+            path = os.path.join(root, hashed_name)
+            sizes = [os.path.getsize(path)]
+            for suffix in ENCODING_SUFFIXES.values():
+                variant = path + suffix
+                sizes.append(os.path.getsize(variant) if os.path.exists(variant) else None)
+            rows.append((hashed_name, sizes))
+
+        for hashed_name, (size, br, gz) in rows:
+            self.stdout.write(
+                f"{hashed_name:<50} {size:>8} B"
+                f"  br {br if br is not None else '-':>7}"
+                f"  gz {gz if gz is not None else '-':>7}"
+            )
+        self.stdout.write(self.style.SUCCESS(f"{len(rows)} files built in {root}"))
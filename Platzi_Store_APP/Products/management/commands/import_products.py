@@ -0,0 +1,43 @@
+import json
+from dataclasses import asdict
+
+import requests
+from django.core.management.base import BaseCommand, CommandError
+
+from Products.bulk import FORMATS, BulkImporter, detect_format, iter_rows
+
+
+class Command(BaseCommand):
+    help = "Creates or updates products in the API from a CSV or JSON lines file."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV or JSON lines file. Rows with an id update that product.')
+        parser.add_argument('--format', choices=FORMATS, help='Input format (guessed from the extension by default).')
+        parser.add_argument('--concurrency', type=int, help='Maximum simultaneous writes to the API.')
+        parser.add_argument('--retries', type=int, help='Retries per row on connection errors, 429 and 5xx.')
+        parser.add_argument('--report', help='Write the per-row report as JSON lines to this file.')
+
+    def handle(self, *args, **options):
+        fmt = options['format'] or detect_format(options['path'])
+        importer = BulkImporter(concurrency=options['concurrency'], retries=options['retries'])
+        try:
+            with open(options['path'], 'rb') as f:
+                results, summary = importer.run(iter_rows(f, fmt))
+        except OSError as e:
+            raise CommandError(e)
+        except requests.exceptions.RequestException as e:
+            raise CommandError(f"Error fetching categories from API: {e}")
+
+        if options['report']:
+            with open(options['report'], 'w', encoding='utf-8') as out:
+                for result in results:
+                    out.write(json.dumps(asdict(result)) + '\n')
+        else:
+            for result in results:
+                if result.status in ('invalid', 'failed'):
+                    self.stderr.write(f"row {result.row}: {result.status} {json.dumps(result.errors)}")
+
+        self.stdout.write(self.style.SUCCESS(
+            "{total} rows in {seconds}s ({rows_per_second} rows/s): "
+            "{created} created, {updated} updated, {invalid} invalid, {failed} failed".format(**summary)
+        ))
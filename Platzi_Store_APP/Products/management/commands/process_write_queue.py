@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from Products import writebehind
+
+
+class Command(BaseCommand):
+    help = "Applies queued product mutations (write-behind mode) to the API."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Process the due mutations once and exit.')
+        parser.add_argument('--poll-interval', type=float, help='Seconds to wait when the queue is empty.')
+
+    def handle(self, *args, **options):
+        if options['once']:
+            writebehind.recover_stale()
+            total = 0
+            while True:
+                attempted = writebehind.process_batch()
+                if not attempted:
+                    break
+                total += attempted
+            self.stdout.write(self.style.SUCCESS(f"{total} mutations attempted"))
+            return
+        self.stdout.write("Processing the write-behind queue (Ctrl+C to stop)...")
+        try:
+            writebehind.run_worker(options['poll_interval'])
+        except KeyboardInterrupt:
+            pass
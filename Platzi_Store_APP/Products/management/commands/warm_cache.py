@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from Products import warmup
+
+
+class Command(BaseCommand):
+    help = (
+        "Prefetches categories, catalog pages and hot product details into the cache. "
+        "With --loop keeps refreshing them ahead of expiry."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help='Keep refreshing every PRODUCTS_REFRESH_INTERVAL.')
+        parser.add_argument('--interval', type=float, help='Seconds between refreshes with --loop.')
+
+    def handle(self, *args, **options):
+        if options['loop']:
+            self.stdout.write("Refreshing the cache (Ctrl+C to stop)...")
+            try:
+                warmup.refresh_forever(options['interval'])
+            except KeyboardInterrupt:
+                pass
+            return
+        refreshed, failed = warmup.warm()
+        self.stdout.write(self.style.SUCCESS(f"{refreshed} entries warmed, {failed} failed"))
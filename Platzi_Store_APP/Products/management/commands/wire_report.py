@@ -0,0 +1,71 @@
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from Platzi_Store_APP.staticfiles import brotli
+
+# The pages most visits go through; products come from the Platzi API (or the cache).
+PAGES = [
+    ('Products:home', ()),
+    ('Products:catalog', ()),
+    ('Products:product_detail', (1,)),
+    ('Products:product_add', ()),
+    ('accounts:login', ()),
+    ('accounts:register', ()),
+    ('Products:api_products', ()),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Reports the bytes sent for each major page: as rendered, after HTML "
+        "minification and compressed with gzip and brotli (ResponseCompressionMiddleware)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', action='append', default=[], help='Extra path to report (repeatable).')
+        parser.add_argument('--user', help='Username to log in as, for pages that require a login.')
+        parser.add_argument('--host', default='localhost', help='Host header; must be in ALLOWED_HOSTS.')
+
+    def handle(self, *args, **options):
+        client = Client(HTTP_HOST=options['host'])
+        if options['user']:
+            try:
+                client.force_login(User.objects.get(username=options['user']))
+            except User.DoesNotExist:
+                raise CommandError(f"No user named {options['user']!r}.")
+
+        paths = [reverse(name, args=args) for name, args in PAGES] + options['path']
+        codings = ['gzip'] + (['br'] if brotli is not None else [])
+        self.stdout.write(
+            f"  {'path':<28} {'status':>6} {'rendered':>9} {'minified':>9}"
+            + ''.join(f" {coding:>9}" for coding in codings) + f" {'saved':>6}"
+        )
+        totals = [0] * (2 + len(codings))
+        for path in paths:
+            with override_settings(RESPONSE_MINIFY_HTML=False):
+                rendered = client.get(path)
+            sizes = [self._size(rendered), self._size(client.get(path))]
+            for coding in codings:
+                response = client.get(path, HTTP_ACCEPT_ENCODING=coding)
+                sizes.append(self._size(response))
+            totals = [total + size for total, size in zip(totals, sizes)]
+            self.stdout.write(
+                f"  {path:<28} {rendered.status_code:>6}" + ''.join(f" {size:>9,}" for size in sizes)
+                + f" {self._saved(sizes):>6}"
+            )
+        self.stdout.write(
+            f"  {'total':<28} {'':>6}" + ''.join(f" {size:>9,}" for size in totals) + f" {self._saved(totals):>6}"
+        )
+        if settings.RESPONSE_COMPRESSION_MIN_BYTES:
+            self.stdout.write(f"Bodies under {settings.RESPONSE_COMPRESSION_MIN_BYTES} bytes are sent uncompressed.")
+
+    def _size(self, response):
+        if response.streaming:
+            return len(b''.join(response.streaming_content))
+        return len(response.content)
+
+    def _saved(self, sizes):
+        return f"{1 - min(sizes) / sizes[0]:.0%}" if sizes[0] else '-'
@@ -1,3 +1,60 @@
 from django.db import models
+from django.utils import timezone
 
-# Create your models here.
+
+class PendingWrite(models.Model):
+    """
+    A product mutation accepted locally and waiting to be applied to the
+    Platzi API by the write-behind worker (see writebehind.py).
+    """
+    CREATE = 'create'
+    UPDATE = 'update'
+    DELETE = 'delete'
+    OPERATION_CHOICES = [(CREATE, 'Create'), (UPDATE, 'Update'), (DELETE, 'Delete')]
+
+    PENDING = 'pending'
+    APPLYING = 'applying'
+    APPLIED = 'applied'
+    FAILED = 'failed'
+    STATUS_CHOICES = [(PENDING, 'Pending'), (APPLYING, 'Applying'), (APPLIED, 'Applied'), (FAILED, 'Failed')]
+
+    operation = models.CharField(max_length=10, choices=OPERATION_CHOICES)
+    # Empty for creates until the API assigns an id.
+    product_id = models.IntegerField(null=True, blank=True, db_index=True)
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['id']
+        indexes = [models.Index(fields=['status', 'id'])]
+
+    def __str__(self):
+        return f"{self.get_operation_display()} product {self.product_id or '(new)'} [{self.status}]"
+
+
+class ProductEvent(models.Model):
+    """
+    A product change made through this site, as sent on the change feed
+    (see events.py). The id is the cursor clients resume from.
+    """
+    CREATED = 'created'
+    UPDATED = 'updated'
+    DELETED = 'deleted'
+    KIND_CHOICES = [(CREATED, 'Created'), (UPDATED, 'Updated'), (DELETED, 'Deleted')]
+
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    product_id = models.IntegerField(null=True, blank=True)
+    # Only the fields that changed, with the API's names (title, price, categoryId...).
+    fields = models.JSONField(default=dict, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['id']
+
+    def __str__(self):
+        return f"{self.get_kind_display()} product {self.product_id}"
@@ -0,0 +1,101 @@
+import sqlite3
+import threading
+import time
+
+from django.conf import settings
+
+_local = threading.local()
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS token_bucket (
+    name TEXT PRIMARY KEY,
+    tokens REAL NOT NULL,
+    updated REAL NOT NULL
+)
+"""
+
+
+def _connection():
+    """
+    Returns this thread's connection to the shared rate-limit store.
+    """
+    path = str(settings.UPSTREAM_RATELIMIT_DB)
+    conn = getattr(_local, 'conn', None)
+    if conn is None or getattr(_local, 'path', None) != path:
+        conn = sqlite3.connect(path, timeout=5, isolation_level=None)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute(_SCHEMA)
+        _local.conn, _local.path = conn, path
+    return conn
+
+
+class TokenBucket:
+    """
+    A token bucket whose state lives in a SQLite file, so every worker
+    process on the host draws from the same budget.
+
+    `rate` is the number of tokens added per second and `burst` the
+    bucket capacity; both must be positive.
+    """
+
+    def __init__(self, name, rate, burst):
+        self.name = name
+        self.rate = float(rate)
+        self.burst = float(burst)
+        if self.rate <= 0 or self.burst <= 0:
+            raise ValueError(f"Rate limit '{name}' needs a positive rate and burst, got {rate} and {burst}")
+
+    def try_acquire(self):
+        """
+        Takes one token if available. Returns 0 on success, otherwise the
+        number of seconds until a token will be available.
+        """
+        conn = _connection()
+        now = time.time()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute(
+                'SELECT tokens, updated FROM token_bucket WHERE name = ?', (self.name,)
+            ).fetchone()
+            tokens, updated = row if row else (self.burst, now)
+            tokens = min(self.burst, tokens + max(0.0, now - updated) * self.rate)
+            wait = 0.0
+            if tokens >= 1:
+                tokens -= 1
+            else:
+                wait = (1 - tokens) / self.rate
+            conn.execute(
+                'INSERT OR REPLACE INTO token_bucket (name, tokens, updated) VALUES (?, ?, ?)',
+                (self.name, tokens, now),
+            )
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return wait
+
+    def acquire(self, deadline):
+        """
+        Waits for a token for at most `deadline` seconds. Returns True if a
+        token was taken, False if the deadline passed first.
+        """
+        give_up_at = time.monotonic() + deadline
+        while True:
+            wait = self.try_acquire()
+            if not wait:
+                return True
+            remaining = give_up_at - time.monotonic()
+            if remaining <= 0 or wait > remaining:
+                return False
+            time.sleep(wait)
+
+
+def get_bucket(endpoint):
+    """
+    Returns the bucket configured for `endpoint` in UPSTREAM_RATE_LIMITS,
+    falling back to the 'default' entry.
+    """
+    limits = settings.UPSTREAM_RATE_LIMITS
+    config = limits.get(endpoint, limits['default'])
+    return TokenBucket(endpoint, config['rate'], config['burst']), config['deadline']
@@ -0,0 +1,55 @@
+from rest_framework import serializers
+
+
+def _first_image(product):
+    images = product.get('images') or []
+    return images[0] if images else None
+
+
+class CompactProductSerializer:
+    """
+    Compact representation of the Platzi API products.
+
+    Products arrive as plain dicts already validated by the API, so instead
+    of a `serializers.Serializer` (which builds bound fields per object)
+    this maps each output field to a getter. `fields` selects a subset
+    (sparse fieldsets).
+    """
+    FIELDS = {
+        'id': lambda p: p.get('id'),
+        'title': lambda p: p.get('title'),
+        'price': lambda p: p.get('price'),
+        'description': lambda p: p.get('description'),
+        'category_id': lambda p: (p.get('category') or {}).get('id'),
+        'category': lambda p: (p.get('category') or {}).get('name'),
+        'image': _first_image,
+        'images': lambda p: p.get('images') or [],
+    }
+    DEFAULT_FIELDS = ('id', 'title', 'price', 'category_id', 'image')
+
+    def __init__(self, fields=None):
+        self.fields = tuple(fields) if fields else self.DEFAULT_FIELDS
+        self._getters = [(name, self.FIELDS[name]) for name in self.fields]
+
+    @classmethod
+    def parse_fields(cls, value):
+        """
+        Parses a `fields=a,b,c` query parameter into a tuple of known fields.
+        """
+        if not value:
+            return None
+        fields = tuple(dict.fromkeys(f.strip() for f in value.split(',') if f.strip()))
+        unknown = [f for f in fields if f not in cls.FIELDS]
+        if unknown:
+            raise serializers.ValidationError({
+                'fields': f"Unknown fields: {', '.join(unknown)}. "
+                          f"Available: {', '.join(cls.FIELDS)}"
+            })
+        return fields
+
+    def to_representation(self, product):
+        return {name: getter(product) for name, getter in self._getters}
+
+    def many(self, products):
+        getters = self._getters
+        return [{name: getter(p) for name, getter in getters} for p in products]
@@ -0,0 +1,136 @@
+/**
+ * Catalog filters without full page reloads.
+ *
+ * Submitting the filter form (or changing the category) fetches only the
+ * product grid from the fragment endpoint and swaps it in place. The URL is
+ * updated with pushState so back/forward and reloads keep working, and
+ * grids already seen in this page view are kept in memory and reused.
+ *
+ * The grid also listens to the product change feed (server-sent events) and
+ * reloads itself when products are created, edited or deleted.
+ */
+(function() {
+    const form = document.querySelector('form.filter-controls');
+    const grid = document.querySelector('.product-grid[data-fragment-url]');
+    if (!form || !grid || !window.fetch || !window.history.pushState) {
+        return;
+    }
+
+    const fragmentUrl = grid.dataset.fragmentUrl;
+    const cache = new Map();
+    let pending = null;
+
+    function queryFromForm() {
+        const params = new URLSearchParams();
+        new FormData(form).forEach(function(value, name) {
+            if (value !== '') {
+                params.append(name, value);
+            }
+        });
+        params.sort();
+        return params.toString();
+    }
+
+    function syncForm(query) {
+        const params = new URLSearchParams(query);
+        Array.from(form.elements).forEach(function(field) {
+            if (field.name) {
+                field.value = params.get(field.name) || '';
+            }
+        });
+    }
+
+    function show(query, html) {
+        grid.innerHTML = html;
+        grid.classList.remove('is-loading');
+        syncForm(query);
+    }
+
+    function currentQuery() {
+        const params = new URLSearchParams(window.location.search);
+        params.delete('stream');
+        params.sort();
+        return params.toString();
+    }
+
+    function load(query, push, fresh) {
+        if (push) {
+            history.pushState({ catalogQuery: query }, '', form.action + (query ? '?' + query : ''));
+        }
+        if (!fresh && cache.has(query)) {
+            show(query, cache.get(query));
+            return;
+        }
+        if (pending) {
+            pending.abort();
+        }
+        pending = new AbortController();
+        grid.classList.add('is-loading');
+        fetch(fragmentUrl + (query ? '?' + query : ''), {
+            signal: pending.signal,
+            credentials: 'same-origin',
+            // Tells the service worker not to answer with its cached copy.
+            cache: fresh ? 'no-cache' : 'default',
+        })
+            .then(function(response) {
+                if (!response.ok) {
+                    throw new Error('HTTP ' + response.status);
+                }
+                return response.text();
+            })
+            .then(function(html) {
+                cache.set(query, html);
+                show(query, html);
+            })
+            .catch(function(error) {
+                if (error.name !== 'AbortError') {
+                    // Fall back to a normal page load.
+                    window.location.href = form.action + (query ? '?' + query : '');
+                }
+            });
+    }
+
+    // The page as rendered by the server is the first cache entry.
+    cache.set(currentQuery(), grid.innerHTML);
+    history.replaceState({ catalogQuery: currentQuery() }, '');
+
+    // Registered before base.html's submit handler, so the button spinner
+    // of full page submissions is not shown.
+    form.addEventListener('submit', function(event) {
+        event.preventDefault();
+        event.stopImmediatePropagation();
+        load(queryFromForm(), true);
+    });
+
+    const categorySelect = form.querySelector('select[name="category"]');
+    if (categorySelect) {
+        categorySelect.addEventListener('change', function() {
+            load(queryFromForm(), true);
+        });
+    }
+
+    window.addEventListener('popstate', function(event) {
+        if (event.state && 'catalogQuery' in event.state) {
+            load(event.state.catalogQuery, false);
+        }
+    });
+
+    if (window.EventSource && grid.dataset.eventsUrl) {
+        const source = new EventSource(grid.dataset.eventsUrl);
+        let timer = null;
+        // Bursts (a bulk import) are coalesced into one reload.
+        const refresh = function() {
+            cache.clear();
+            clearTimeout(timer);
+            timer = setTimeout(function() {
+                load(currentQuery(), false, true);
+            }, 500);
+        };
+        ['created', 'updated', 'deleted', 'reset'].forEach(function(type) {
+            source.addEventListener(type, refresh);
+        });
+        window.addEventListener('pagehide', function() {
+            source.close();
+        });
+    }
+})();
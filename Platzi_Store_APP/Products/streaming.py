@@ -0,0 +1,79 @@
+import codecs
+import json
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = ' \t\n\r'
+
+
+def iter_json_array(chunks):
+    """
+    Yields the elements of a top-level JSON array read from an iterable of
+    byte chunks, keeping only the element being parsed in memory.
+    """
+    utf8 = codecs.getincrementaldecoder('utf-8')()
+    buffer = ''
+    pos = 0
+    started = False
+
+    def fill():
+        nonlocal buffer, pos
+        for chunk in chunks:
+            text = utf8.decode(chunk)
+            if text:
+                buffer = buffer[pos:] + text
+                pos = 0
+                return True
+        return False
+
+    chunks = iter(chunks)
+    while True:
+        while pos < len(buffer) and buffer[pos] in _WHITESPACE:
+            pos += 1
+        if pos >= len(buffer):
+            if not fill():
+                raise ValueError('Unexpected end of JSON array')
+            continue
+
+        char = buffer[pos]
+        if not started:
+            if char != '[':
+                raise ValueError('Expected a JSON array')
+            started = True
+            pos += 1
+        elif char == ']':
+            return
+        elif char == ',':
+            pos += 1
+        else:
+            try:
+                item, end = _decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                # The element is not complete yet; read more.
+                if not fill():
+                    raise
+                continue
+            after = end
+            while after < len(buffer) and buffer[after] in _WHITESPACE:
+                after += 1
+            if after == len(buffer) or buffer[after] not in ',]':
+                # A number can decode from a prefix ("2" of "2.5"), so an
+                # element only counts once its delimiter has been read.
+                if fill():
+                    continue
+                raise ValueError('Malformed JSON array')
+            pos = after
+            yield item
+
+
+def chunked(iterable, size):
+    """
+    Groups `iterable` into lists of at most `size` items.
+    """
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
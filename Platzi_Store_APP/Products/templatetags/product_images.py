@@ -0,0 +1,23 @@
+from django import template
+
+from ..images import proxy_url
+
+register = template.Library()
+
+
+@register.simple_tag
+def image_url(src, width, fmt='jpeg'):
+    """
+    Returns the proxy URL of `src` resized to `width`.
+    """
+    return proxy_url(src, int(width), fmt)
+
+
+@register.simple_tag
+def image_srcset(src, widths, fmt='jpeg'):
+    """
+    Returns a `srcset` value for `src` at each of the comma-separated `widths`.
+    """
+    return ', '.join(
+        f"{proxy_url(src, int(width), fmt)} {int(width)}w" for width in str(widths).split(',')
+    )
@@ -1,3 +1,719 @@
-from django.test import TestCase
+import io
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+import requests
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from Platzi_Store_APP.testing import PRODUCTS, PerformanceBudgetTestCase, fake_getaddrinfo
+
+from . import bulk, images, index, ratelimit, streaming, warmup, writebehind
+from .models import PendingWrite, ProductEvent
+
+PRODUCT_FORM = {
+    'title': 'New product',
+    'price': '25',
+    'description': 'A product',
+    'category_id': '1',
+    'images': 'https://i.imgur.com/new.jpeg',
+}
+
+
+class ProductsBudgetTests(PerformanceBudgetTestCase):
+    """
+    Query, upstream-call and time budgets for every URL in Products.urls.
+    """
+    urlconf = 'Products.urls'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('budget', 'budget@example.com', 'budget-pass')
+        cls.staff = User.objects.create_user('budget-staff', 'staff@example.com', 'budget-pass', is_staff=True)
+
+    def test_home(self):
+        # Anonymous visitors have no session, so pages without API data run no queries.
+        self.assertWithinBudget('get', reverse('Products:home'), queries=0, upstream_calls=0)
+
+    def test_catalog(self):
+        url = reverse('Products:catalog')
+        # The latest event id, which the change feed resumes from, then the products
+        # and the categories for the filter menu.
+        response = self.assertWithinBudget('get', url, queries=1, upstream_calls=2)
+        self.assertContains(response, PRODUCTS[0]['title'])
+        self.assertContains(response, '?last_event_id=0"')
+        self.assertNotIn('private', response.get('Cache-Control', ''))
+        # A second visit is served from the cache.
+        self.assertWithinBudget('get', url, queries=1, upstream_calls=0)
+        # Pages rendered for a user are kept out of the service worker cache.
+        self.client.force_login(self.user)
+        self.assertIn('private', self.client.get(url)['Cache-Control'])
+
+    def test_catalog_by_category(self):
+        # A category alone is filtered by the API, so it is a cache entry of its own.
+        self.assertWithinBudget('get', reverse('Products:catalog') + '?category=1', queries=1, upstream_calls=2)
+
+    def test_catalog_streaming(self):
+        # The latest event id is read before the head is sent.
+        response = self.assertWithinBudget('get', reverse('Products:catalog') + '?stream=1', queries=1, upstream_calls=2)
+        body = response.getvalue()
+        self.assertIn(PRODUCTS[0]['title'].encode(), body)
+        self.assertIn(b'?last_event_id=0"', body)
+
+    def test_catalog_filtered_by_price(self):
+        url = reverse('Products:catalog') + '?min_price=20&max_price=60&sort=-price'
+        # The latest event id; the full catalog, which the local index is built from,
+        # and the categories.
+        self.assertWithinBudget('get', url, queries=1, upstream_calls=2)
+        # Other filters reuse the cached catalog and the local index.
+        self.assertWithinBudget('get', reverse('Products:catalog') + '?sort=title', queries=1, upstream_calls=0)
+
+    def test_catalog_fragment(self):
+        # Only the products: the grid has no category menu.
+        response = self.assertWithinBudget(
+            'get', reverse('Products:catalog_fragment') + '?category=2', queries=0, upstream_calls=1
+        )
+        self.assertNotContains(response, '<html')
+
+    def test_catalog_fragment_invalid_filters(self):
+        url = reverse('Products:catalog_fragment')
+        # Non-finite prices are ignored like any other unparsable price.
+        response = self.client.get(url + '?min_price=inf&max_price=nan&sort=price')
+        self.assertContains(response, PRODUCTS[0]['title'])
+        response = self.assertWithinBudget('get', url + '?category=abc', queries=0, upstream_calls=0)
+        self.assertEqual(response.status_code, 400)
+
+    def test_product_events(self):
+        url = reverse('Products:product_events')
+        # A new client only reads the latest event id to start from.
+        response = self.assertWithinBudget('get', url, queries=1, upstream_calls=0)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        self.client.force_login(self.user)
+        self.client.post(reverse('Products:product_edit', args=[1]), PRODUCT_FORM)
+        self.client.post(reverse('Products:product_delete', args=[2]))
+        # A reconnecting client gets what it missed, with the changed fields only: the
+        # missed events, the latest id and the oldest id kept (to detect a gap).
+        response = self.assertWithinBudget('get', url, queries=3, upstream_calls=0, HTTP_LAST_EVENT_ID='0')
+        body = response.content.decode()
+        self.assertIn('event: updated', body)
+        self.assertIn('"fields":{"title":"New product"', body)
+        self.assertIn('event: deleted', body)
+
+    def test_product_detail(self):
+        url = reverse('Products:product_detail', args=[1])
+        # Viewing needs no login, so no session or user is loaded.
+        response = self.assertWithinBudget('get', url, queries=0, upstream_calls=1)
+        # The delete form carries a CSRF token.
+        self.assertIn('private', response['Cache-Control'])
+        self.assertWithinBudget('get', url, queries=0, upstream_calls=0)
+
+    def test_product_add(self):
+        self.client.force_login(self.user)
+        url = reverse('Products:product_add')
+        # login_required loads the session and the user; the call is the categories.
+        self.assertWithinBudget('get', url, queries=2, upstream_calls=1)
+        # Plus the change-feed event. The categories are cached by the GET, so the call is the POST.
+        response = self.assertWithinBudget('post', url, queries=3, upstream_calls=1, data=PRODUCT_FORM)
+        self.assertRedirects(response, reverse('Products:catalog'), fetch_redirect_response=False)
+
+    def test_product_add_unreadable_response(self):
+        self.client.force_login(self.user)
+        for body in (b'<html>OK</html>', b'[]'):
+            with self.subTest(body=body):
+                created = requests.Response()
+                created.status_code = 201
+                created._content = body
+                with mock.patch('Products.views.upstream.send', return_value=created):
+                    response = self.client.post(reverse('Products:product_add'), PRODUCT_FORM)
+                self.assertRedirects(response, reverse('Products:catalog'), fetch_redirect_response=False)
+        self.assertEqual(ProductEvent.objects.filter(kind=ProductEvent.CREATED, product_id=None).count(), 2)
+
+    @override_settings(PRODUCT_IMAGE_VERIFY=True)
+    def test_product_add_verifies_images(self):
+        self.client.force_login(self.user)
+        url = reverse('Products:product_add')
+        self.client.get(url)
+        urls = [f"https://i.imgur.com/image{i}.jpeg" for i in range(10)]
+        internal = ['http://127.0.0.1/a.png', 'http://169.254.169.254/latest/', 'https://intranet.example/b.png']
+        data = dict(PRODUCT_FORM, images=', '.join(urls + ['https://example.com/missing.jpeg'] + internal))
+        # One HEAD per public image; the form is rejected, so nothing is sent or recorded.
+        response = self.assertWithinBudget('post', url, queries=2, upstream_calls=11, data=data)
+        self.assertContains(response, 'https://example.com/missing.jpeg did not answer with an image.')
+        self.assertNotContains(response, '404')
+        for address in internal:
+            self.assertContains(response, f"{address} did not answer with an image.")
+        # The verdicts are cached, so only the product itself is sent now.
+        data['images'] = ', '.join(urls)
+        response = self.assertWithinBudget('post', url, queries=3, upstream_calls=1, data=data)
+        self.assertRedirects(response, reverse('Products:catalog'), fetch_redirect_response=False)
+
+    def test_product_edit(self):
+        url = reverse('Products:product_edit', args=[1])
+        # The product and the categories. product_edit has no login, so there is no session query.
+        response = self.assertWithinBudget('get', url, queries=0, upstream_calls=2)
+        version = response.context['form']['version'].value()
+        # A save is only the PUT, even once the product and the categories have left the cache;
+        # the one query is the change-feed event.
+        cache.clear()
+        data = dict(PRODUCT_FORM, version=version)
+        response = self.assertWithinBudget('post', url, queries=1, upstream_calls=1, data=data)
+        self.assertRedirects(response, reverse('Products:product_detail', args=[1]), fetch_redirect_response=False)
+
+    def test_product_edit_unreadable_response(self):
+        url = reverse('Products:product_edit', args=[1])
+        saved = requests.Response()
+        saved.status_code = 200
+        saved._content = b'<html>OK</html>'
+        with mock.patch('Products.views.upstream.send', return_value=saved):
+            response = self.client.post(url, PRODUCT_FORM)
+        self.assertRedirects(response, reverse('Products:product_detail', args=[1]), fetch_redirect_response=False)
+        self.assertTrue(ProductEvent.objects.filter(kind=ProductEvent.UPDATED, product_id=1).exists())
+
+    def test_product_edit_conflict(self):
+        url = reverse('Products:product_edit', args=[1])
+        version = self.client.get(url).context['form']['version'].value()
+        self.client.post(url, dict(PRODUCT_FORM, version=version, title='Saved first'))
+        # The second save is refused from the copy the first PUT returned; the only call
+        # loads the categories to show the form again.
+        response = self.assertWithinBudget(
+            'post', url, queries=0, upstream_calls=1, data=dict(PRODUCT_FORM, version=version)
+        )
+        self.assertContains(response, 'changed while you were editing it', status_code=409)
+        self.assertEqual([method for method, _, _ in self.upstream.calls], ['GET'])
+        # Submitting the refreshed form overwrites it.
+        refreshed = response.context['form']['version'].value()
+        self.assertNotEqual(refreshed, version)
+        response = self.client.post(url, dict(PRODUCT_FORM, version=refreshed))
+        self.assertEqual(response.status_code, 302)
+
+    def test_product_delete(self):
+        url = reverse('Products:product_delete', args=[1])
+        # The DELETE and its change-feed event; the view has no login, so no session query.
+        response = self.assertWithinBudget('post', url, queries=1, upstream_calls=1)
+        self.assertRedirects(response, reverse('Products:catalog'), fetch_redirect_response=False)
+
+    def test_product_image(self):
+        url = images.proxy_url(PRODUCTS[0]['images'][0], 320, 'webp')
+        # Decoding a 1200x900 original and encoding WebP is CPU work, hence two seconds.
+        response = self.assertWithinBudget('get', url, queries=0, upstream_calls=1, seconds=2.0)
+        self.assertEqual(response['Content-Type'], 'image/webp')
+        # Another width of the same image reuses the cached original.
+        url = images.proxy_url(PRODUCTS[0]['images'][0], 640, 'jpeg')
+        self.assertWithinBudget('get', url, queries=0, upstream_calls=0, seconds=2.0)
+
+    def test_product_image_evicted_before_open(self):
+        src = PRODUCTS[0]['images'][0]
+        with mock.patch.object(images, 'get_variant', return_value=('/nonexistent/variant.webp', 'image/webp')):
+            response = self.client.get(images.proxy_url(src, 320, 'webp'))
+        self.assertRedirects(response, src, fetch_redirect_response=False)
+
+    def test_product_image_refuses_internal_sources(self):
+        for src in ('http://127.0.0.1/a.png', 'http://169.254.169.254/latest/meta-data/', 'http://intranet.example/a.png'):
+            with self.subTest(src=src):
+                # Nothing is fetched; the browser is sent to the source instead.
+                response = self.assertWithinBudget('get', images.proxy_url(src, 320), queries=0, upstream_calls=0)
+                self.assertRedirects(response, src, fetch_redirect_response=False)
+
+    def test_service_worker(self):
+        self.assertWithinBudget('get', reverse('Products:service_worker'), queries=0, upstream_calls=0)
+
+    def test_api_products(self):
+        url = reverse('Products:api_products') + '?limit=5'
+        # The full catalog, which every page and category is cut from.
+        response = self.assertWithinBudget('get', url, queries=0, upstream_calls=1)
+        self.assertEqual(len(response.json()['results']), 5)
+        etag = response['ETag']
+        for if_none_match in (etag, f'W/{etag}', f'"other", {etag}', '*'):
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=if_none_match).status_code, 304)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH='"other"').status_code, 200)
+        self.assertEqual(self.client.get(url + '&category=abc').status_code, 400)
+
+    def test_api_products_multi(self):
+        url = reverse('Products:api_products_multi') + '?ids=1,2,3'
+        # One GET per id that is not cached.
+        self.assertWithinBudget('get', url, queries=0, upstream_calls=3)
+        # Once the catalog is cached every id is served from it.
+        self.client.get(reverse('Products:api_products'))
+        self.assertWithinBudget('get', reverse('Products:api_products_multi') + '?ids=4,5,6',
+                                queries=0, upstream_calls=0)
+
+    def test_api_products_multi_beyond_the_burst(self):
+        # More misses than PRODUCTS_MULTI_GET_CONCURRENCY (10) are served from one catalog fetch.
+        url = reverse('Products:api_products_multi') + '?ids=' + ','.join(map(str, range(1, 14)))
+        response = self.assertWithinBudget('get', url, queries=0, upstream_calls=1)
+        results = response.json()['results']
+        self.assertTrue(all('product' in r for r in results[:12]))
+        self.assertEqual(results[12], {'id': 13, 'error': 'not_found'})
+
+    def test_api_products_import(self):
+        self.client.force_login(self.staff)
+        upload = io.BytesIO(
+            b'title,price,description,category_id,images\n'
+            b'A,10,First,1,https://i.imgur.com/a.jpeg\n'
+            b'B,20,Second,2,https://i.imgur.com/b.jpeg\n'
+        )
+        upload.name = 'products.csv'
+        # Session, staff user and one bulk insert of the events, however many rows;
+        # the categories to validate the rows, then one POST per row.
+        response = self.assertWithinBudget(
+            'post', reverse('Products:api_products_import'), queries=3, upstream_calls=3, data={'file': upload}
+        )
+        self.assertEqual(response.json()['summary']['created'], 2)
+
+    def test_api_products_import_rejects_bad_ids(self):
+        self.client.force_login(self.staff)
+        upload = io.BytesIO(
+            b'id,title,price,description,category_id,images\n'
+            b'abc,A,10,First,1,https://i.imgur.com/a.jpeg\n'
+            b'../x,B,20,Second,2,https://i.imgur.com/b.jpeg\n'
+            b'0,C,30,Third,1,https://i.imgur.com/c.jpeg\n'
+            b'3,D,40,Fourth,2,https://i.imgur.com/d.jpeg\n'
+        )
+        upload.name = 'products.csv'
+        # Only the row with a valid id is written: the categories, then one PUT.
+        response = self.assertWithinBudget(
+            'post', reverse('Products:api_products_import'), queries=3, upstream_calls=2, data={'file': upload}
+        )
+        self.assertEqual([r['status'] for r in response.json()['results']], ['invalid'] * 3 + ['updated'])
+        self.assertIn('id', response.json()['results'][0]['errors'])
+        self.assertEqual(self.upstream.calls[-1][:2], ('PUT', f"{bulk.BASE_API_URL}/3"))
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class ImageCacheEvictionTests(SimpleTestCase):
+    """
+    images.evict and the running size total that triggers it.
+    """
+
+    def setUp(self):
+        tmp = tempfile.mkdtemp(prefix='image-cache-tests-')
+        self.addCleanup(shutil.rmtree, tmp, ignore_errors=True)
+        settings = override_settings(PRODUCT_IMAGE_CACHE_DIR=tmp, PRODUCT_IMAGE_CACHE_MAX_BYTES=1000)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        cache.clear()
+        self.root = Path(tmp)
+
+    def write(self, name, size, age):
+        path = self.root / 'variants' / name
+        images._write_atomic(path, b'x' * size)
+        os.utime(path, (time.time() - age, time.time() - age))
+        return path
+
+    def test_walks_only_when_the_total_passes_the_bound(self):
+        self.write('a', 300, age=30)
+        with mock.patch.object(images, 'evict', wraps=images.evict) as evict:
+            self.write('b', 300, age=20)
+            self.write('c', 300, age=10)
+        evict.assert_not_called()
+        self.assertEqual(cache.get(images._SIZE_KEY), 900)
+
+    def test_trims_least_recently_used_below_the_bound(self):
+        oldest, older = self.write('a', 300, age=30), self.write('b', 300, age=20)
+        self.write('c', 300, age=10)
+        self.write('d', 400, age=0)
+        # 1300 bytes: down to EVICT_TO (900) of the bound, oldest first.
+        self.assertFalse(oldest.exists())
+        self.assertFalse(older.exists())
+        self.assertEqual(cache.get(images._SIZE_KEY), 700)
+
+    def test_untracked_total_is_measured(self):
+        self.write('a', 300, age=0)
+        cache.clear()
+        self.write('b', 300, age=0)
+        self.assertEqual(cache.get(images._SIZE_KEY), 600)
+
+
+@override_settings(
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+    UPSTREAM_RATE_LIMITS={'default': {'rate': 1000, 'burst': 1000, 'deadline': 1.0}},
+)
+@mock.patch('socket.getaddrinfo', side_effect=fake_getaddrinfo)
+class ImageCheckTests(SimpleTestCase):
+    """
+    images.check_urls, upstream.probe and upstream.fetch_bytes on
+    user-supplied URLs.
+    """
+
+    def setUp(self):
+        cache.clear()
+        tmp = tempfile.mkdtemp(prefix='image-check-tests-')
+        self.addCleanup(shutil.rmtree, tmp, ignore_errors=True)
+        settings = override_settings(UPSTREAM_RATELIMIT_DB=f"{tmp}/ratelimit.sqlite3")
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def response(self, status_code, content_type='image/png'):
+        response = requests.Response()
+        response.status_code = status_code
+        response.headers['Content-Type'] = content_type
+        return response
+
+    def test_redirects_are_not_followed(self, getaddrinfo):
+        with mock.patch.object(images.upstream._session, 'head', return_value=self.response(302)) as head:
+            errors = images.check_urls(['https://example.com/moved.png'])
+        self.assertEqual(errors, {'https://example.com/moved.png': images.CHECK_FAILED})
+        self.assertIs(head.call_args.kwargs['allow_redirects'], False)
+
+    def test_private_addresses_are_never_contacted(self, getaddrinfo):
+        urls = ['http://localhost/a.png', 'http://[::1]/a.png', 'http://10.1.2.3/a.png', 'file:///etc/passwd']
+        with mock.patch.object(images.upstream._session, 'head') as head:
+            errors = images.check_urls(urls)
+        self.assertEqual(errors, dict.fromkeys(urls, images.CHECK_FAILED))
+        head.assert_not_called()
+
+    def test_errors_do_not_echo_the_answer(self, getaddrinfo):
+        with mock.patch.object(images.upstream._session, 'head', return_value=self.response(200, 'text/html')):
+            self.assertEqual(images.check_urls(['https://example.com/page']),
+                             {'https://example.com/page': images.CHECK_FAILED})
+        with mock.patch.object(images.upstream._session, 'head', return_value=self.response(200)):
+            self.assertEqual(images.check_urls(['https://example.com/ok.png']), {})
+
+    def test_fetch_bytes_checks_every_redirect(self, getaddrinfo):
+        moved = self.response(302)
+        moved.raw = io.BytesIO()
+        moved.headers['Location'] = 'http://169.254.169.254/latest/meta-data/'
+        with mock.patch.object(images.upstream._session, 'get', return_value=moved) as get:
+            with self.assertRaises(images.upstream.UnsafeURL):
+                images.upstream.fetch_bytes('https://example.com/moved.png')
+        get.assert_called_once()
+        self.assertIs(get.call_args.kwargs['allow_redirects'], False)
+
+
+class TokenBucketTests(SimpleTestCase):
+    """
+    ratelimit.TokenBucket on a temporary store, with a controlled clock.
+    """
+
+    def setUp(self):
+        tmp = tempfile.mkdtemp(prefix='ratelimit-tests-')
+        self.addCleanup(shutil.rmtree, tmp, ignore_errors=True)
+        settings = override_settings(
+            UPSTREAM_RATELIMIT_DB=f"{tmp}/ratelimit.sqlite3",
+            UPSTREAM_RATE_LIMITS={
+                'default': {'rate': 1, 'burst': 1, 'deadline': 0.5},
+                'products': {'rate': 2, 'burst': 3, 'deadline': 1.0},
+            },
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.now = 1000.0
+        clock = mock.patch('Products.ratelimit.time.time', side_effect=lambda: self.now)
+        clock.start()
+        self.addCleanup(clock.stop)
+
+    def test_burst_then_wait(self):
+        bucket = ratelimit.TokenBucket('test', rate=2, burst=3)
+        self.assertEqual([bucket.try_acquire() for _ in range(3)], [0, 0, 0])
+        self.assertAlmostEqual(bucket.try_acquire(), 0.5)
+
+    def test_refills_at_rate_up_to_burst(self):
+        bucket = ratelimit.TokenBucket('test', rate=2, burst=3)
+        for _ in range(3):
+            bucket.try_acquire()
+        self.now += 1
+        self.assertEqual([bucket.try_acquire() for _ in range(2)], [0, 0])
+        self.assertGreater(bucket.try_acquire(), 0)
+        # An idle hour does not bank more than `burst` tokens.
+        self.now += 3600
+        self.assertEqual([bucket.try_acquire() for _ in range(3)], [0, 0, 0])
+        self.assertGreater(bucket.try_acquire(), 0)
+
+    def test_state_is_shared_between_connections(self):
+        # Another worker is another connection to the same file.
+        ratelimit.TokenBucket('shared', rate=1, burst=1).try_acquire()
+        waits = []
+        thread = threading.Thread(
+            target=lambda: waits.append(ratelimit.TokenBucket('shared', rate=1, burst=1).try_acquire())
+        )
+        thread.start()
+        thread.join()
+        self.assertGreater(waits[0], 0)
+
+    def test_acquire_gives_up_when_the_wait_exceeds_the_deadline(self):
+        bucket = ratelimit.TokenBucket('test', rate=1, burst=1)
+        self.assertTrue(bucket.acquire(0.1))
+        with mock.patch('Products.ratelimit.time.sleep') as sleep:
+            self.assertFalse(bucket.acquire(0.5))
+        sleep.assert_not_called()
+
+    def test_rejects_non_positive_rate_and_burst(self):
+        for rate, burst in ((0, 1), (-1, 1), (1, 0)):
+            with self.subTest(rate=rate, burst=burst), self.assertRaises(ValueError):
+                ratelimit.TokenBucket('test', rate=rate, burst=burst)
+
+    def test_get_bucket_falls_back_to_default(self):
+        bucket, deadline = ratelimit.get_bucket('unknown')
+        self.assertEqual((bucket.rate, bucket.burst, deadline), (1, 1, 0.5))
+        bucket, deadline = ratelimit.get_bucket('products')
+        self.assertEqual((bucket.name, bucket.burst, deadline), ('products', 3, 1.0))
+
+
+class StreamingParserTests(SimpleTestCase):
+    """
+    streaming.iter_json_array, fed the way requests' iter_content does.
+    """
+    items = [{'id': 1, 'title': 'Camiseta ñandú €'}, 2.5, 'a,]"b', [], None, 10]
+
+    def chunks(self, size):
+        body = json.dumps(self.items, ensure_ascii=False).encode()
+        return [body[i:i + size] for i in range(0, len(body), size)]
+
+    def test_any_chunk_size(self):
+        # One byte at a time splits multi-byte characters and numbers ("2" of "2.5").
+        for size in (1, 2, 7, 4096):
+            with self.subTest(size=size):
+                self.assertEqual(list(streaming.iter_json_array(self.chunks(size))), self.items)
+
+    def test_yields_before_the_body_is_read(self):
+        read = []
+
+        def chunks():
+            for chunk in self.chunks(8):
+                read.append(chunk)
+                yield chunk
+
+        first = next(streaming.iter_json_array(chunks()))
+        self.assertEqual(first, self.items[0])
+        self.assertLess(len(read), len(self.chunks(8)))
+
+    def test_empty_array(self):
+        self.assertEqual(list(streaming.iter_json_array([b' [ ', b'] '])), [])
+
+    def test_errors(self):
+        for body in (b'{"a": 1}', b'[1, 2', b'[1 2]', b'[{"a": '):
+            with self.subTest(body=body), self.assertRaises(ValueError):
+                list(streaming.iter_json_array([body]))
+
+    def test_chunked(self):
+        self.assertEqual(list(streaming.chunked(range(5), 2)), [[0, 1], [2, 3], [4]])
+        self.assertEqual(list(streaming.chunked([], 2)), [])
+
+
+class ProductIndexTests(SimpleTestCase):
+    """
+    index.ProductIndex on malformed upstream rows.
+    """
+
+    def test_malformed_numbers_default(self):
+        products = [
+            {'id': 1, 'price': 'abc', 'category': {'id': 'x'}},
+            {'id': 'two', 'price': '12.5', 'category': 'shoes'},
+            {'id': 3, 'price': None},
+            {'id': 4, 'price': 'nan', 'category': {'id': 2}},
+            {'id': 5, 'price': 7, 'category': {'id': 2}},
+        ]
+        catalog = index.ProductIndex(products)
+        self.assertEqual(list(catalog.ids), [1, 0, 3, 4, 5])
+        self.assertEqual(list(catalog.prices), [0, 12.5, 0, 0, 7])
+        self.assertEqual(list(catalog.category_ids), [-1, -1, -1, 2, 2])
+        self.assertEqual(catalog.query(min_price=1, sort='-price'), [products[1], products[4]])
+
+
+class BulkRetryTests(SimpleTestCase):
+    """
+    Which failed writes BulkImporter._write sends again.
+    """
+
+    def setUp(self):
+        self.importer = bulk.BulkImporter(concurrency=1, retries=2, backoff=0)
+        self.importer._written = []
+
+    def response(self, status_code=201, body=b'{"id": 7}'):
+        response = requests.Response()
+        response.status_code = status_code
+        response._content = body
+        return response
+
+    def http_error(self, status_code):
+        return requests.exceptions.HTTPError(response=self.response(status_code))
+
+    def write(self, product_id, *outcomes):
+        with mock.patch.object(bulk.upstream, 'send', side_effect=outcomes) as send:
+            result = self.importer._write(1, product_id, {'title': 'A'})
+        return result, send.call_count
+
+    def test_post_retries_when_nothing_was_created(self):
+        for error in (requests.exceptions.ConnectionError(), self.http_error(503), self.http_error(429)):
+            with self.subTest(error=error):
+                result, calls = self.write(None, error, self.response())
+                self.assertEqual((result.status, result.product_id, calls), ('created', 7, 2))
+
+    def test_post_does_not_retry_when_it_may_have_created(self):
+        for error in (requests.exceptions.ReadTimeout(), self.http_error(400)):
+            with self.subTest(error=error):
+                result, calls = self.write(None, error, self.response())
+                self.assertEqual((result.status, calls), ('failed', 1))
+
+    def test_put_retries_timeouts(self):
+        result, calls = self.write(3, requests.exceptions.ReadTimeout(), self.response(200, b'{"id": 3}'))
+        self.assertEqual((result.status, result.product_id, calls), ('updated', 3, 2))
+
+    def test_gives_up_after_retries(self):
+        result, calls = self.write(3, *[requests.exceptions.ConnectionError()] * 3)
+        self.assertEqual((result.status, result.attempts, calls), ('failed', 3, 3))
+
+    def test_unreadable_body_is_not_a_failure(self):
+        for body in (b'<html>', b'[]', b'null'):
+            with self.subTest(body=body):
+                result, calls = self.write(None, self.response(201, body))
+                self.assertEqual((result.status, result.product_id, calls), ('created', None, 1))
+        result, _ = self.write(3, self.response(200, b'[]'))
+        self.assertEqual(result.product_id, 3)
+
+
+@override_settings(PRODUCTS_WRITE_BEHIND_MAX_ATTEMPTS=3, PRODUCTS_WRITE_BEHIND_BACKOFF=60)
+class WriteBehindBatchTests(TestCase):
+    """
+    writebehind.process_batch against a mocked API.
+    """
+
+    def setUp(self):
+        send = mock.patch.object(writebehind.upstream, 'send', side_effect=self.send)
+        self.send = send.start()
+        self.addCleanup(send.stop)
+        self.failures = {}
+
+    def send(self, method, url, endpoint, json=None):
+        error = self.failures.get(url)
+        if error is not None:
+            raise error
+        response = requests.Response()
+        response.status_code = 200
+        response._content = b'{"id": 99}' if method == 'POST' else b'true'
+        return response
+
+    def queue(self, operation, product_id=None, **payload):
+        return PendingWrite.objects.create(operation=operation, product_id=product_id, payload=payload)
+
+    def reject(self, product_id, status_code=None):
+        response = None
+        if status_code is not None:
+            response = requests.Response()
+            response.status_code = status_code
+        self.failures[f"{writebehind.BASE_API_URL}/{product_id}"] = requests.exceptions.HTTPError(response=response)
+
+    def test_applies_in_order_and_publishes(self):
+        create = self.queue(PendingWrite.CREATE, title='New')
+        update = self.queue(PendingWrite.UPDATE, 1, price=5)
+        delete = self.queue(PendingWrite.DELETE, 2)
+        self.assertEqual(writebehind.process_batch(), 3)
+        self.assertEqual([c.args[0] for c in self.send.call_args_list], ['POST', 'PUT', 'DELETE'])
+        for write in (create, update, delete):
+            write.refresh_from_db()
+            self.assertEqual(write.status, PendingWrite.APPLIED)
+        self.assertEqual(create.product_id, 99)
+        self.assertEqual(
+            list(ProductEvent.objects.order_by('id').values_list('kind', 'product_id')),
+            [(ProductEvent.CREATED, 99), (ProductEvent.UPDATED, 1), (ProductEvent.DELETED, 2)],
+        )
+
+    def test_retry_blocks_later_writes_of_the_same_product(self):
+        self.reject(1, 503)
+        first = self.queue(PendingWrite.UPDATE, 1, price=5)
+        second = self.queue(PendingWrite.UPDATE, 1, price=6)
+        other = self.queue(PendingWrite.UPDATE, 2, price=7)
+        self.assertEqual(writebehind.process_batch(), 2)
+        first.refresh_from_db()
+        self.assertEqual((first.status, first.attempts), (PendingWrite.PENDING, 1))
+        self.assertGreater(first.next_attempt_at, timezone.now())
+        self.assertEqual(PendingWrite.objects.get(pk=second.pk).status, PendingWrite.PENDING)
+        self.assertEqual(PendingWrite.objects.get(pk=other.pk).status, PendingWrite.APPLIED)
+        # Not due yet: nothing is attempted.
+        self.assertEqual(writebehind.process_batch(), 0)
+
+    def test_gives_up_on_client_errors_and_after_max_attempts(self):
+        self.reject(1, 400)
+        rejected = self.queue(PendingWrite.UPDATE, 1, price=5)
+        writebehind.process_batch()
+        rejected.refresh_from_db()
+        self.assertEqual((rejected.status, rejected.attempts), (PendingWrite.FAILED, 1))
+
+        self.reject(2)
+        flaky = self.queue(PendingWrite.DELETE, 2)
+        for _ in range(3):
+            PendingWrite.objects.filter(pk=flaky.pk).update(next_attempt_at=timezone.now())
+            writebehind.process_batch()
+        flaky.refresh_from_db()
+        self.assertEqual((flaky.status, flaky.attempts), (PendingWrite.FAILED, 3))
+        self.assertFalse(ProductEvent.objects.exists())
+
+    def test_skips_products_claimed_by_another_worker(self):
+        claimed = self.queue(PendingWrite.UPDATE, 1, price=5)
+        PendingWrite.objects.filter(pk=claimed.pk).update(status=PendingWrite.APPLYING)
+        later = self.queue(PendingWrite.UPDATE, 1, price=6)
+        self.assertEqual(writebehind.process_batch(), 0)
+        self.assertEqual(PendingWrite.objects.get(pk=later.pk).status, PendingWrite.PENDING)
+
+    def test_limit(self):
+        for product_id in range(1, 6):
+            self.queue(PendingWrite.DELETE, product_id)
+        self.assertEqual(writebehind.process_batch(limit=2), 2)
+        self.assertEqual(PendingWrite.objects.filter(status=PendingWrite.PENDING).count(), 3)
+
+    def test_unreadable_create_response_is_applied_once(self):
+        self.send.side_effect = lambda *args, **kwargs: requests.Response()
+        create = self.queue(PendingWrite.CREATE, title='New')
+        writebehind.process_batch()
+        create.refresh_from_db()
+        self.assertEqual((create.status, create.product_id, self.send.call_count), (PendingWrite.APPLIED, None, 1))
+
+
+@override_settings(
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+    PRODUCTS_WARMUP_DETAILS=3,
+)
+class WarmupTests(SimpleTestCase):
+    """
+    Hot product counting and when the refresher starts.
+    """
+
+    def setUp(self):
+        cache.clear()
+        warmup._hits.clear()
+        self.addCleanup(warmup._hits.clear)
+
+    def test_hits_are_merged_in_batches(self):
+        for _ in range(warmup.FLUSH_EVERY - 1):
+            warmup.record_hit(1)
+        self.assertIsNone(cache.get(warmup.HOT_KEY))
+        warmup.record_hit(2)
+        self.assertEqual(cache.get(warmup.HOT_KEY), {1: warmup.FLUSH_EVERY - 1, 2: 1})
+
+    def test_concurrent_merge_keeps_hits_buffered(self):
+        warmup.record_hit(1)
+        cache.add(warmup.HOT_LOCK_KEY, 'other worker')
+        self.assertFalse(warmup.flush_hits())
+        cache.set(warmup.HOT_KEY, {1: 5}, None)
+        cache.delete(warmup.HOT_LOCK_KEY)
+        self.assertTrue(warmup.flush_hits())
+        self.assertEqual(cache.get(warmup.HOT_KEY), {1: 6})
+
+    def test_hot_product_ids_include_buffered_hits(self):
+        warmup.record_hit(7)
+        catalog = [{'id': 1}, {'id': 7}, {'id': 2}]
+        self.assertEqual(warmup.hot_product_ids(catalog), [7, 1, 2])
+
+    def test_refresher_skips_commands_and_the_autoreloader(self):
+        cases = [
+            (['manage.py', 'migrate'], {}, True),
+            (['manage.py', 'runserver'], {}, True),
+            (['manage.py', 'runserver'], {'RUN_MAIN': 'true'}, False),
+            (['manage.py', 'runserver', '--noreload'], {}, False),
+            (['gunicorn', 'Platzi_Store_APP.wsgi'], {}, False),
+        ]
+        for argv, environ, skipped in cases:
+            with self.subTest(argv=argv, environ=environ), mock.patch('sys.argv', argv), \
+                    mock.patch.dict(os.environ, environ):
+                if 'RUN_MAIN' not in environ:
+                    os.environ.pop('RUN_MAIN', None)
+                self.assertIs(warmup._running_management_command(), skipped)
@@ -0,0 +1,241 @@
+"""
+Client for the Platzi Fake Store API.
+
+Every outbound call draws a token from the bucket configured for its
+endpoint (see ratelimit.py). Successful GETs are cached: a copy younger
+than UPSTREAM_CACHE_TTL is served without calling the API, and an older
+copy is kept for UPSTREAM_STALE_TTL so it can be served when the budget
+is exhausted or the API is throttling us.
+"""
+import ipaddress
+import socket
+import time
+from urllib.parse import urljoin, urlsplit
+
+import requests
+from django.conf import settings
+from django.core.cache import cache
+
+from . import streaming
+from .ratelimit import get_bucket
+
+BASE_API_URL = f"{settings.PLATZI_API_BASE_URL.rstrip('/')}/products"
+CATEGORY_API_URL = f"{settings.PLATZI_API_BASE_URL.rstrip('/')}/categories"
+
+_GENERATION_KEY = 'upstream:generation'
+
+# Redirects fetch_bytes follows, each one checked like the first URL.
+MAX_REDIRECTS = 5
+
+_session = requests.Session()
+
+
+class UpstreamThrottled(requests.exceptions.RequestException):
+    """
+    Raised when the rate budget is exhausted and there is no cached copy to
+    fall back on.
+    """
+
+
+class UnsafeURL(requests.exceptions.InvalidURL):
+    """
+    Raised by probe() for URLs that are not http(s) or whose host resolves
+    to a private, loopback, link-local or otherwise non-public address.
+    """
+
+
+def _require_public(url):
+    parts = urlsplit(url)
+    if parts.scheme not in ('http', 'https') or not parts.hostname:
+        raise UnsafeURL(f"Unsupported URL: {url}")
+    try:
+        infos = socket.getaddrinfo(parts.hostname, parts.port or 443, proto=socket.IPPROTO_TCP)
+    except (socket.gaierror, UnicodeError) as e:
+        raise requests.exceptions.ConnectionError(e)
+    for info in infos:
+        address = ipaddress.ip_address(info[4][0].split('%', 1)[0])
+        if not address.is_global:
+            raise UnsafeURL(f"{parts.hostname} is not a public address")
+
+
+def _generation():
+    return cache.get_or_set(_GENERATION_KEY, 1, None)
+
+
+def _cache_key(url, params):
+    query = '&'.join(f"{k}={v}" for k, v in sorted((params or {}).items()))
+    return f"upstream:{_generation()}:{url}?{query}"
+
+
+def _acquire(endpoint):
+    bucket, deadline = get_bucket(endpoint)
+    return bucket.acquire(deadline)
+
+
+def _should_serve_stale(exc):
+    response = getattr(exc, 'response', None)
+    if response is None:
+        return True
+    return response.status_code == 429 or response.status_code >= 500
+
+
+def peek(url, params=None, stale=False):
+    """
+    Returns the fresh cached body for `url`, or None. Never calls the API.
+    With stale=True a copy older than UPSTREAM_CACHE_TTL is returned too.
+    """
+    entry = cache.get(_cache_key(url, params))
+    if entry and (stale or time.time() - entry['fetched_at'] < settings.UPSTREAM_CACHE_TTL):
+        return entry['data']
+    return None
+
+
+def store(url, data, params=None):
+    """
+    Caches `data` as the body of `url`, as if it had just been fetched.
+    Used to keep the copy returned by a write.
+    """
+    cache.set(_cache_key(url, params), {'data': data, 'fetched_at': time.time()}, settings.UPSTREAM_STALE_TTL)
+
+
+def get_entry(url, endpoint='default', params=None, ttl=None):
+    """
+    Like get_json, but returns the cache entry: a dict with the decoded
+    `data` and the `fetched_at` timestamp of that copy.
+    """
+    ttl = settings.UPSTREAM_CACHE_TTL if ttl is None else ttl
+    key = _cache_key(url, params)
+    entry = cache.get(key)
+    if entry and time.time() - entry['fetched_at'] < ttl:
+        return entry
+
+    if not _acquire(endpoint):
+        if entry:
+            return entry
+        raise UpstreamThrottled(f"Rate budget for '{endpoint}' exhausted")
+
+    try:
+        response = _session.get(url, params=params, timeout=settings.UPSTREAM_TIMEOUT)
+        response.raise_for_status()
+        data = response.json()
+    except requests.exceptions.RequestException as e:
+        if entry and _should_serve_stale(e):
+            return entry
+        raise
+
+    entry = {'data': data, 'fetched_at': time.time()}
+    cache.set(key, entry, settings.UPSTREAM_STALE_TTL)
+    return entry
+
+
+def get_json(url, endpoint='default', params=None, ttl=None):
+    """
+    GETs `url` and returns the decoded JSON body, going through the cache
+    and the rate limiter for `endpoint`.
+    """
+    return get_entry(url, endpoint, params, ttl)['data']
+
+
+def stream_json_array(url, endpoint='default', params=None, chunk_size=16 * 1024):
+    """
+    Returns an iterator over the elements of the JSON array at `url`.
+
+    A fresh cached copy is used when available; otherwise the body is
+    parsed incrementally as it arrives and is not cached, so memory stays
+    flat regardless of the array length. Connection and HTTP errors are
+    raised here, before iteration starts.
+    """
+    entry = cache.get(_cache_key(url, params))
+    if entry and time.time() - entry['fetched_at'] < settings.UPSTREAM_CACHE_TTL:
+        return iter(entry['data'])
+    if not _acquire(endpoint):
+        if entry:
+            return iter(entry['data'])
+        raise UpstreamThrottled(f"Rate budget for '{endpoint}' exhausted")
+
+    response = _session.get(url, params=params, stream=True, timeout=settings.UPSTREAM_TIMEOUT)
+    try:
+        response.raise_for_status()
+    except requests.exceptions.RequestException:
+        response.close()
+        raise
+
+    def items():
+        with response:
+            yield from streaming.iter_json_array(response.iter_content(chunk_size))
+
+    return items()
+
+
+def send(method, url, endpoint='default', json=None, invalidate_cache=True):
+    """
+    Sends a write (POST/PUT/DELETE) to the API and returns the response.
+    Writes are never served from cache, so an exhausted budget raises
+    UpstreamThrottled once the endpoint deadline passes. Batch writers pass
+    invalidate_cache=False and call invalidate() once at the end.
+    """
+    if not _acquire(endpoint):
+        raise UpstreamThrottled(f"Rate budget for '{endpoint}' exhausted")
+    response = _session.request(method, url, json=json, timeout=settings.UPSTREAM_TIMEOUT)
+    response.raise_for_status()
+    if invalidate_cache:
+        invalidate()
+    return response
+
+
+def fetch_bytes(url, endpoint='default', max_bytes=None):
+    """
+    GETs `url` and returns the raw body, refusing bodies larger than
+    `max_bytes`. Used for binary assets such as product images, which are
+    cached by the caller. Product image URLs come from users, so every hop,
+    redirects included, must be a public host (UnsafeURL otherwise).
+    """
+    if not _acquire(endpoint):
+        raise UpstreamThrottled(f"Rate budget for '{endpoint}' exhausted")
+    for _ in range(MAX_REDIRECTS + 1):
+        _require_public(url)
+        response = _session.get(url, stream=True, timeout=settings.UPSTREAM_TIMEOUT, allow_redirects=False)
+        if not response.is_redirect:
+            break
+        response.close()
+        url = urljoin(url, response.headers['Location'])
+    else:
+        raise requests.exceptions.TooManyRedirects(f"More than {MAX_REDIRECTS} redirects")
+    with response:
+        response.raise_for_status()
+        chunks = []
+        size = 0
+        for chunk in response.iter_content(64 * 1024):
+            size += len(chunk)
+            if max_bytes and size > max_bytes:
+                raise requests.exceptions.ContentDecodingError(f"Body of {url} exceeds {max_bytes} bytes")
+            chunks.append(chunk)
+    return b''.join(chunks)
+
+
+def probe(url, endpoint='default', timeout=None):
+    """
+    Returns (status code, Content-Type) of `url` without downloading the
+    body: a HEAD request, or a streamed GET for servers that refuse HEAD.
+    `url` comes from users, so only public hosts are contacted (UnsafeURL
+    otherwise) and redirects are returned, not followed.
+    """
+    _require_public(url)
+    if not _acquire(endpoint):
+        raise UpstreamThrottled(f"Rate budget for '{endpoint}' exhausted")
+    timeout = timeout or settings.UPSTREAM_TIMEOUT
+    response = _session.head(url, timeout=timeout, allow_redirects=False)
+    if response.status_code in (405, 501):
+        with _session.get(url, stream=True, timeout=timeout, allow_redirects=False) as response:
+            return response.status_code, response.headers.get('Content-Type', '')
+    return response.status_code, response.headers.get('Content-Type', '')
+
+
+def invalidate():
+    """
+    Drops every cached GET by moving to a new cache generation.
+    """
+    try:
+        cache.incr(_GENERATION_KEY)
+    except ValueError:
+        cache.set(_GENERATION_KEY, 2, None)
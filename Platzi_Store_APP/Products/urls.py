@@ -1,4 +1,7 @@
 from django.urls import path
+
+from Platzi_Store_APP.lazyurls import lazy_path
+
 from . import views
 
 
@@ -8,8 +11,16 @@ app_name = 'Products'
 urlpatterns = [
     path('', views.home, name='home'),
     path('catalog/', views.catalog, name='catalog'),
+    path('catalog/fragment/', views.catalog_fragment, name='catalog_fragment'),
+    path('catalog/events/', views.product_events, name='product_events'),
     path('catalog/<int:product_id>/', views.product_detail, name='product_detail'),
     path('catalog/add/', views.product_add, name='product_add'),
     path('catalog/<int:product_id>/edit/', views.product_edit, name='product_edit'),
     path('catalog/<int:product_id>/delete/', views.product_delete, name='product_delete'),
+    path('images/', views.product_image, name='product_image'),
+    path('sw.js', views.service_worker, name='service_worker'),
+    # La API (REST Framework) se importa con la primera petición que la usa
+    lazy_path('api/products/', 'Products.api.products_api', name='api_products'),
+    lazy_path('api/products/multi/', 'Products.api.products_multi_get_api', name='api_products_multi'),
+    lazy_path('api/products/import/', 'Products.api.products_import_api', name='api_products_import'),
 ]
\ No newline at end of file
@@ -1,12 +1,71 @@
+import functools
+import hashlib
+import json
+import math
+
 import requests
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib import messages
+from django.contrib.staticfiles import finders
+from django.contrib.staticfiles.storage import staticfiles_storage
 from django.contrib.auth.decorators import login_required
+from django.core.handlers.asgi import ASGIRequest
 from django.shortcuts import render, redirect
 from django.urls import reverse
-from django.http import HttpResponse, HttpResponseRedirect
-from .forms import ProductForm
+from django.http import (
+    FileResponse, Http404, HttpResponse, HttpResponseBadRequest, HttpResponseRedirect, StreamingHttpResponse,
+)
+from django.template.loader import get_template, render_to_string
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import require_GET
+from . import events, images, index, streaming, upstream, warmup, writebehind
+from .forms import ProductEditForm, ProductForm
+from .models import PendingWrite, ProductEvent
+from .upstream import BASE_API_URL, CATEGORY_API_URL
+
+STREAM_MARKER = '__PRODUCT_GRID_STREAM__'
+
+# Static files precached by the service worker (the app shell).
+SHELL_STATIC = (
+    'products/base.css',
+    'products/home.css',
+    'products/catalog.css',
+    'products/catalog.js',
+    'products/detail.css',
+    'products/form.css',
+    'accounts/js/auth.js',
+)
+SHELL_EXTERNAL = (
+    'https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.4.0/css/all.min.css',
+    'https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/css/bootstrap.min.css',
+    'https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/js/bootstrap.bundle.min.js',
+)
+
+
+def _personalized(request):
+    storage = getattr(request, '_messages', None)
+    return (
+        request.user.is_authenticated
+        or request.META.get('CSRF_COOKIE_NEEDS_UPDATE', False)
+        or (storage is not None and storage.used)
+    )
+
+
+def private_when_personalized(view):
+    """
+    Marks the response `Cache-Control: private` when it was rendered for
+    this visitor: a logged-in user, flash messages or a CSRF-protected form.
+    The service worker only keeps pages without it (see sw.js).
+    """
+    @functools.wraps(view)
+    def wrapper(request, *args, **kwargs):
+        response = view(request, *args, **kwargs)
+        if _personalized(request):
+            patch_cache_control(response, private=True)
+        return response
+    return wrapper
 
-BASE_API_URL = "https://api.escuelajs.co/api/v1/products"
-CATEGORY_API_URL = "https://api.escuelajs.co/api/v1/categories"
 
 def home(request):
     """
@@ -15,41 +74,250 @@ def home(request):
     return render(request, 'home.html')
 
 
+def _float_param(request, name):
+    try:
+        value = float(request.GET[name])
+    except (KeyError, ValueError):
+        return None
+    # float() also accepts 'nan' and 'inf', which no price compares sensibly to.
+    return value if math.isfinite(value) else None
+
+
+def _invalid_category(category_id):
+    return bool(category_id) and not category_id.isdigit()
+
+
+def _catalog_filters(request):
+    min_price = _float_param(request, 'min_price')
+    max_price = _float_param(request, 'max_price')
+    sort = request.GET.get('sort') if request.GET.get('sort') in index.SORTS else None
+    return min_price, max_price, sort
+
+
+def _catalog_products(category_id, min_price, max_price, sort):
+    """
+    Returns the catalog products for the given filters, with pending
+    writes applied. A category alone is filtered by the API; price ranges
+    and sorting are answered from the local product index.
+    """
+    if min_price is not None or max_price is not None or sort is not None:
+        products = index.get_index().query(
+            category_id=int(category_id) if category_id else None,
+            min_price=min_price, max_price=max_price, sort=sort,
+        )
+    else:
+        params = {'categoryId': category_id} if category_id else None
+        products = upstream.get_json(BASE_API_URL, 'products', params=params)
+    return writebehind.overlay_products(products, category_id)
+
+
+@private_when_personalized
 def catalog(request):
     """
-    Renders the product catalog, with optional filtering.
+    Renders the product catalog, with optional filtering by category
+    (category), price range (min_price, max_price) and sorting (sort).
     """
     category_id = request.GET.get('category')
-    api_url = f"{BASE_API_URL}?categoryId={category_id}" if category_id else BASE_API_URL
+    if _invalid_category(category_id):
+        return HttpResponseBadRequest("Invalid category.")
+    min_price, max_price, sort = _catalog_filters(request)
+    filtered = min_price is not None or max_price is not None or sort is not None
+
+    if not filtered and request.GET.get('stream', '1' if settings.CATALOG_STREAMING else '0') == '1':
+        params = {'categoryId': category_id} if category_id else None
+        return _stream_catalog(request, category_id, params)
 
+    # Read before the products, so a change made while they are fetched is
+    # still sent to the page.
+    last_event_id = events.latest_id()
     try:
-        products_response = requests.get(api_url)
-        products_response.raise_for_status() # Raise an exception for bad status codes
-        products = products_response.json()
-        
-        categories_response = requests.get(CATEGORY_API_URL)
-        categories_response.raise_for_status()
-        categories = categories_response.json()
+        products = _catalog_products(category_id, min_price, max_price, sort)
+        categories = upstream.get_json(CATEGORY_API_URL, 'categories')
 
         return render(request, 'catalog.html', {
             'products': products,
             'categories': categories,
-            'selected_category': category_id
+            'selected_category': category_id,
+            'min_price': request.GET.get('min_price', ''),
+            'max_price': request.GET.get('max_price', ''),
+            'selected_sort': sort or '',
+            'last_event_id': last_event_id,
         })
     except requests.exceptions.RequestException as e:
         return HttpResponse(f"Error fetching data from API: {e}", status=500)
 
+
+@require_GET
+@private_when_personalized
+def catalog_fragment(request):
+    """
+    Renders only the product grid of the catalog for the same query
+    parameters as `catalog`. Used by catalog.js to switch categories and
+    filters without reloading the page, so the categories are not fetched.
+    """
+    category_id = request.GET.get('category')
+    if _invalid_category(category_id):
+        return HttpResponseBadRequest("Invalid category.")
+    try:
+        products = _catalog_products(category_id, *_catalog_filters(request))
+    except requests.exceptions.RequestException as e:
+        return HttpResponse(f"Error fetching data from API: {e}", status=502)
+    return render(request, 'product_cards.html', {'products': products})
+
+
+def _stream_catalog(request, category_id, params):
+    """
+    Streaming variant of the catalog: sends the page head and filter
+    controls right away, then the product cards in chunks as the upstream
+    array is parsed, so memory does not grow with the catalog size.
+    """
+    last_event_id = events.latest_id()
+    try:
+        categories = upstream.get_json(CATEGORY_API_URL, 'categories')
+        products = upstream.stream_json_array(BASE_API_URL, 'products', params=params)
+    except requests.exceptions.RequestException as e:
+        return HttpResponse(f"Error fetching data from API: {e}", status=500)
+    products = writebehind.overlay_stream(products, category_id, writebehind.pending_writes())
+
+    page = render_to_string('catalog.html', {
+        'categories': categories,
+        'selected_category': category_id,
+        'streaming': True,
+        'stream_marker': STREAM_MARKER,
+        'last_event_id': last_event_id,
+    }, request)
+    head, tail = page.split(STREAM_MARKER, 1)
+    cards = get_template('product_cards.html')
+    user = request.user
+
+    def content():
+        yield head
+        count = 0
+        try:
+            for batch in streaming.chunked(products, settings.CATALOG_STREAM_CHUNK_SIZE):
+                count += len(batch)
+                yield cards.render({'products': batch, 'user': user})
+        except (requests.exceptions.RequestException, ValueError):
+            yield '<p class="stream-error">Error cargando más productos.</p>'
+        if not count:
+            yield cards.render({'products': [], 'user': user})
+        yield tail
+
+    return StreamingHttpResponse(content(), content_type='text/html; charset=utf-8')
+
+
+def _event_cursor(request):
+    # EventSource sends Last-Event-ID when reconnecting; ?last_event_id= lets
+    # a page resume from the id it was rendered with.
+    value = request.headers.get('Last-Event-ID') or request.GET.get('last_event_id')
+    try:
+        return max(0, int(value))
+    except (TypeError, ValueError):
+        return None
+
+
+@require_GET
+async def product_events(request):
+    """
+    Server-sent events feed of product changes: `created`, `updated` and
+    `deleted` events with the product id and the changed fields, and a
+    `reset` event when the client missed too much and should reload.
+
+    Under ASGI the connection stays open and events are pushed as they
+    happen (see events.py). Under WSGI, where an open connection would hold
+    a worker, only the missed events are sent and the browser reconnects
+    after PRODUCT_EVENTS_RETRY_MS.
+    """
+    cursor = _event_cursor(request)
+    if isinstance(request, ASGIRequest):
+        response = StreamingHttpResponse(events.stream(cursor), content_type='text/event-stream')
+        response['X-Accel-Buffering'] = 'no'
+    else:
+        chunks = await sync_to_async(events.missed)(cursor, await sync_to_async(events.latest_id)())
+        response = HttpResponse(
+            f"retry: {settings.PRODUCT_EVENTS_RETRY_MS}\n\n" + ''.join(chunks), content_type='text/event-stream'
+        )
+    patch_cache_control(response, no_cache=True)
+    return response
+
+
+@private_when_personalized
 def product_detail(request, product_id):
     """
     Renders the details of a single product.
     """
     try:
-        product_response = requests.get(f"{BASE_API_URL}/{product_id}")
-        product_response.raise_for_status()
-        product = product_response.json()
+        product = upstream.get_json(f"{BASE_API_URL}/{product_id}", 'products')
+        warmup.record_hit(product_id)
+        product = writebehind.overlay_product(product_id, product)
+        if product is None:
+            raise Http404("This product is pending deletion.")
         return render(request, 'product_detail.html', {'product': product})
     except requests.exceptions.RequestException as e:
         return HttpResponse(f"Error fetching product: {e}", status=500)
+
+def _service_worker_version():
+    """
+    Hash of the static manifest written by build_static. Without a manifest
+    (development), a hash of the shell files' contents.
+    """
+    if staticfiles_storage.hashed_files and staticfiles_storage.manifest_hash:
+        return staticfiles_storage.manifest_hash
+    digest = hashlib.sha256()
+    for name in SHELL_STATIC:
+        path = finders.find(name)
+        if path:
+            with open(path, 'rb') as f:
+                digest.update(f.read())
+    return digest.hexdigest()[:12]
+
+
+@require_GET
+def service_worker(request):
+    """
+    Serves the service worker from the site root so its scope covers every
+    page. Its cache names change with the static manifest, so browsers pick
+    up a new worker (and drop the old caches) after each static build.
+    """
+    response = render(request, 'sw.js', {
+        'version_json': json.dumps(_service_worker_version()),
+        'shell_json': json.dumps([staticfiles_storage.url(name) for name in SHELL_STATIC]),
+        'shell_external_json': json.dumps(SHELL_EXTERNAL),
+        'images_prefix_json': json.dumps(reverse('Products:product_image')),
+        'auth_paths_json': json.dumps([
+            reverse('accounts:login'), reverse('accounts:logout'), reverse('accounts:register'),
+        ]),
+    }, content_type='application/javascript; charset=utf-8')
+    response['Service-Worker-Allowed'] = '/'
+    patch_cache_control(response, no_cache=True)
+    return response
+
+
+@require_GET
+def product_image(request):
+    """
+    Serves a resized variant of an upstream product image. Falls back to
+    redirecting to the original when it cannot be fetched or decoded.
+    """
+    try:
+        src, width, fmt = images.verify(
+            request.GET.get('src'), request.GET.get('w'), request.GET.get('fmt'), request.GET.get('sig')
+        )
+    except images.InvalidImageRequest as e:
+        return HttpResponseBadRequest(str(e))
+
+    try:
+        path, content_type = images.get_variant(src, width, fmt)
+        # Another worker may evict the variant before it is opened.
+        body = open(path, 'rb')
+    except (requests.exceptions.RequestException, OSError):
+        return HttpResponseRedirect(src)
+
+    response = FileResponse(body, content_type=content_type)
+    patch_cache_control(response, public=True, max_age=settings.PRODUCT_IMAGE_MAX_AGE, immutable=True)
+    return response
+
+
 @login_required
 def product_add(request):
     """
@@ -58,23 +326,24 @@ def product_add(request):
     if request.method == 'POST':
         form = ProductForm(request.POST)
         if form.is_valid():
+            payload = form.to_payload()
+            if writebehind.enabled():
+                writebehind.enqueue(PendingWrite.CREATE, payload=payload)
+                messages.info(request, 'Producto guardado. Se publicará en unos instantes.')
+                return redirect('Products:catalog')
             try:
-                # The API expects a list of image URLs.
-                images_list = [img.strip() for img in form.cleaned_data['images'].split(',')]
-                
-                payload = {
-                    'title': form.cleaned_data['title'],
-                    'price': form.cleaned_data['price'],
-                    'description': form.cleaned_data['description'],
-                    'categoryId': form.cleaned_data['category_id'],
-                    'images': images_list,
-                }
-                
-                response = requests.post(BASE_API_URL, json=payload)
-                response.raise_for_status()
-                return redirect('catalog')
+                response = upstream.send('POST', BASE_API_URL, 'products', json=payload)
             except requests.exceptions.RequestException as e:
                 form.add_error(None, f"Error creating product: {e}")
+            else:
+                # The product was created even if its body cannot be read.
+                try:
+                    created = response.json()
+                except ValueError:
+                    created = None
+                product_id = created.get('id') if isinstance(created, dict) else None
+                events.record(ProductEvent.CREATED, product_id, payload)
+                return redirect('Products:catalog')
     else:
         form = ProductForm()
     
@@ -83,35 +352,59 @@ def product_add(request):
 def product_edit(request, product_id):
     """
     Handles the editing of an existing product.
-    """
-    try:
-        # Fetch the current product data
-        response = requests.get(f"{BASE_API_URL}/{product_id}")
-        response.raise_for_status()
-        product_data = response.json()
-    except requests.exceptions.RequestException as e:
-        return HttpResponse(f"Error fetching product data for edit: {e}", status=500)
 
+    The form carries the version of the product it was filled from. A save
+    sends the update without fetching the product or the categories again,
+    and is refused if the cached copy of the product (the last one fetched,
+    or the one returned by the last save) has another version, so changes
+    made in the meantime are not silently overwritten.
+    """
+    url = f"{BASE_API_URL}/{product_id}"
+    status = 200
     if request.method == 'POST':
-        form = ProductForm(request.POST)
+        form = ProductEditForm(request.POST)
         if form.is_valid():
-            try:
-                images_list = [img.strip() for img in form.cleaned_data['images'].split(',')]
-                
-                payload = {
-                    'title': form.cleaned_data['title'],
-                    'price': form.cleaned_data['price'],
-                    'description': form.cleaned_data['description'],
-                    'categoryId': form.cleaned_data['category_id'],
-                    'images': images_list,
-                }
-                
-                response = requests.put(f"{BASE_API_URL}/{product_id}", json=payload)
-                response.raise_for_status()
-                return redirect('product_detail', product_id=product_id)
-            except requests.exceptions.RequestException as e:
-                form.add_error(None, f"Error updating product: {e}")
+            payload = form.to_payload()
+            current = upstream.peek(url, stale=True)
+            version = form.cleaned_data['version']
+            if version and current is not None and events.product_version(current) != version:
+                # Saving again overwrites the newer copy.
+                data = request.POST.copy()
+                data['version'] = events.product_version(current)
+                form = ProductEditForm(data)
+                form.is_valid()
+                form.add_error(None, "This product was changed while you were editing it. "
+                                     "Check the current product and save again to overwrite it.")
+                status = 409
+            elif writebehind.enabled():
+                writebehind.enqueue(PendingWrite.UPDATE, product_id, payload)
+                messages.info(request, 'Cambios guardados. Se publicarán en unos instantes.')
+                return redirect('Products:product_detail', product_id=product_id)
+            else:
+                try:
+                    response = upstream.send('PUT', url, 'products', json=payload)
+                except requests.exceptions.RequestException as e:
+                    form.add_error(None, f"Error updating product: {e}")
+                else:
+                    # The update went through even if its body cannot be read.
+                    try:
+                        updated = response.json()
+                    except ValueError:
+                        updated = None
+                    # Keep the returned copy so the next save is checked against it.
+                    if isinstance(updated, dict) and isinstance(updated.get('category'), dict):
+                        upstream.store(url, updated)
+                    changed = payload if current is None else events.changed_fields(current, payload)
+                    if changed:
+                        events.record(ProductEvent.UPDATED, product_id, changed)
+                    return redirect('Products:product_detail', product_id=product_id)
+        form.ensure_categories()
     else:
+        try:
+            # Fetch the current product data
+            product_data = upstream.get_json(url, 'products')
+        except requests.exceptions.RequestException as e:
+            return HttpResponse(f"Error fetching product data for edit: {e}", status=500)
         # Populate the form with current product data
         initial_data = {
             'title': product_data.get('title'),
@@ -119,10 +412,11 @@ def product_edit(request, product_id):
             'description': product_data.get('description'),
             'category_id': product_data.get('category', {}).get('id'),
             'images': ', '.join(product_data.get('images', [])),
+            'version': events.product_version(product_data),
         }
-        form = ProductForm(initial=initial_data)
+        form = ProductEditForm(initial=initial_data)
     
-    return render(request, 'product_form.html', {'form': form, 'page_title': 'Edit Product'})
+    return render(request, 'product_form.html', {'form': form, 'page_title': 'Edit Product'}, status=status)
 
 
 def product_delete(request, product_id):
@@ -130,11 +424,15 @@ def product_delete(request, product_id):
     Handles the deletion of a product.
     """
     if request.method == 'POST':
+        if writebehind.enabled():
+            writebehind.enqueue(PendingWrite.DELETE, product_id)
+            messages.info(request, 'Producto eliminado. El cambio se publicará en unos instantes.')
+            return redirect('Products:catalog')
         try:
-            response = requests.delete(f"{BASE_API_URL}/{product_id}")
-            response.raise_for_status()
-            return redirect('catalog')
+            upstream.send('DELETE', f"{BASE_API_URL}/{product_id}", 'products')
+            events.record(ProductEvent.DELETED, product_id)
+            return redirect('Products:catalog')
         except requests.exceptions.RequestException as e:
             return HttpResponse(f"Error deleting product: {e}", status=500)
     
-    return HttpResponseRedirect(reverse('product_detail', args=[product_id]))
+    return HttpResponseRedirect(reverse('Products:product_detail', args=[product_id]))
@@ -0,0 +1,166 @@
+"""
+Cache warm-up and periodic refresh for the pages users hit most.
+
+`warm()` fetches the categories, the full catalog, the catalog of each
+category and the hottest product details, bypassing the fresh-cache check
+so every entry gets a new expiry. `start_refresher()` runs it in a daemon
+thread every PRODUCTS_REFRESH_INTERVAL seconds, shorter than
+UPSTREAM_CACHE_TTL, so popular entries are renewed before they expire.
+When several workers share the cache only the one holding the refresh
+lock does the work.
+
+Detail views are counted in memory and merged into the shared hot-product
+counts in batches, under a short cache lock, so concurrent workers do not
+overwrite each other's counts.
+"""
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+import requests
+from django.conf import settings
+from django.core.cache import cache
+
+from . import upstream
+from .upstream import BASE_API_URL, CATEGORY_API_URL
+
+logger = logging.getLogger(__name__)
+
+HOT_KEY = 'products:hot'
+LOCK_KEY = 'products:refresh-lock'
+HOT_LOCK_KEY = 'products:hot-lock'
+
+# Buffered hits are merged into HOT_KEY after this many views or seconds.
+FLUSH_EVERY = 20
+FLUSH_INTERVAL = 30
+
+_refresher = None
+_refresher_lock = threading.Lock()
+
+_hits = Counter()
+_hits_lock = threading.Lock()
+_last_flush = time.monotonic()
+
+
+def record_hit(product_id):
+    """
+    Counts a product detail view so hot products are kept warm.
+    """
+    with _hits_lock:
+        _hits[product_id] += 1
+        due = _hits.total() >= FLUSH_EVERY or time.monotonic() - _last_flush >= FLUSH_INTERVAL
+    if due:
+        flush_hits()
+
+
+def flush_hits():
+    """
+    Adds the hits buffered by this process to the shared counts. If another
+    worker is merging at the same time they stay buffered for the next flush.
+    """
+    global _last_flush
+    if not _hits or not cache.add(HOT_LOCK_KEY, os.getpid(), timeout=5):
+        return False
+    try:
+        with _hits_lock:
+            hits = dict(_hits)
+            _hits.clear()
+            _last_flush = time.monotonic()
+        hot = cache.get(HOT_KEY) or {}
+        for product_id, count in hits.items():
+            hot[product_id] = hot.get(product_id, 0) + count
+        if len(hot) > settings.PRODUCTS_WARMUP_DETAILS * 5:
+            hot = dict(sorted(hot.items(), key=lambda item: -item[1])[:settings.PRODUCTS_WARMUP_DETAILS * 2])
+        cache.set(HOT_KEY, hot, None)
+    finally:
+        cache.delete(HOT_LOCK_KEY)
+    return True
+
+
+def hot_product_ids(catalog):
+    """
+    Returns the most viewed product ids, topped up with the first catalog
+    entries when there are not enough views yet.
+    """
+    limit = settings.PRODUCTS_WARMUP_DETAILS
+    flush_hits()
+    hot = cache.get(HOT_KEY) or {}
+    ids = [pid for pid, _ in sorted(hot.items(), key=lambda item: -item[1])][:limit]
+    for product in catalog:
+        if len(ids) >= limit:
+            break
+        if product.get('id') not in ids:
+            ids.append(product.get('id'))
+    return ids
+
+
+def warm():
+    """
+    Refreshes every warm-up target. Returns (refreshed, failed) counts.
+    """
+    refreshed = failed = 0
+
+    def fetch(url, params=None):
+        nonlocal refreshed, failed
+        try:
+            data = upstream.get_json(url, 'warmup', params=params, ttl=0)
+        except requests.exceptions.RequestException as e:
+            logger.warning('Warm-up of %s %s failed: %s', url, params or '', e)
+            failed += 1
+            return None
+        refreshed += 1
+        return data
+
+    categories = fetch(CATEGORY_API_URL) or []
+    catalog = fetch(BASE_API_URL) or []
+    for category in categories[:settings.PRODUCTS_WARMUP_CATEGORIES]:
+        fetch(BASE_API_URL, {'categoryId': str(category['id'])})
+    for product_id in hot_product_ids(catalog):
+        fetch(f"{BASE_API_URL}/{product_id}")
+    return refreshed, failed
+
+
+def refresh_forever(interval=None, stop_event=None):
+    """
+    Calls warm() every `interval` seconds while this process holds the
+    shared refresh lock.
+    """
+    interval = interval or settings.PRODUCTS_REFRESH_INTERVAL
+    stop_event = stop_event or threading.Event()
+    while not stop_event.is_set():
+        started = time.monotonic()
+        # cache.add is atomic, so with a shared cache a single worker refreshes per interval.
+        if cache.add(LOCK_KEY, os.getpid(), timeout=max(1, int(interval * 0.9))):
+            try:
+                warm()
+            except Exception:
+                logger.exception('Cache refresh failed')
+        stop_event.wait(max(0.0, interval - (time.monotonic() - started)))
+
+
+def _running_management_command():
+    program = os.path.basename(sys.argv[0]) if sys.argv else ''
+    if program not in ('manage.py', 'django-admin') or len(sys.argv) < 2:
+        return False
+    if sys.argv[1] != 'runserver':
+        return True
+    # With the autoreloader, runserver's first process only watches files and
+    # restarts the child that serves requests (the one with RUN_MAIN set).
+    return '--noreload' not in sys.argv and os.environ.get('RUN_MAIN') != 'true'
+
+
+def start_refresher():
+    """
+    Starts the refresh thread once per process. Management commands other
+    than runserver, and runserver's autoreloader process, do not start it.
+    """
+    global _refresher
+    if _running_management_command():
+        return
+    with _refresher_lock:
+        if _refresher is None or not _refresher.is_alive():
+            _refresher = threading.Thread(target=refresh_forever, name='cache-refresher', daemon=True)
+            _refresher.start()
@@ -0,0 +1,237 @@
+"""
+Write-behind mode for product mutations.
+
+With PRODUCTS_WRITE_BEHIND enabled, product_add/product_edit/product_delete
+store the mutation as a PendingWrite row and answer immediately. A worker
+(an in-process thread, or `manage.py process_write_queue`) applies the rows
+to the API in id order, and each applied row is published on the product
+change feed (events.py). Mutations of the same product are applied strictly
+in order: while one is waiting for a retry, later ones for that product
+wait too. Pages overlay pending rows on the API data so users see their
+change right away.
+"""
+import logging
+import threading
+from datetime import timedelta
+
+import requests
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils import timezone
+
+from . import events, upstream
+from .models import PendingWrite
+from .upstream import BASE_API_URL
+
+logger = logging.getLogger(__name__)
+
+_ACTIVE = (PendingWrite.PENDING, PendingWrite.APPLYING)
+
+_worker = None
+_worker_lock = threading.Lock()
+_wakeup = threading.Event()
+
+
+def enabled():
+    return settings.PRODUCTS_WRITE_BEHIND
+
+
+def enqueue(operation, product_id=None, payload=None):
+    """
+    Records a mutation and wakes the in-process worker.
+    """
+    write = PendingWrite.objects.create(operation=operation, product_id=product_id, payload=payload or {})
+    ensure_worker()
+    _wakeup.set()
+    return write
+
+
+def _retryable(exc):
+    response = getattr(exc, 'response', None)
+    if response is None:
+        return True
+    return response.status_code == 429 or response.status_code >= 500
+
+
+def _apply(write):
+    if write.operation == PendingWrite.CREATE:
+        response = upstream.send('POST', BASE_API_URL, 'products', json=write.payload)
+        # The product exists now: an unreadable body must not queue a second POST.
+        try:
+            body = response.json()
+        except ValueError:
+            body = None
+        write.product_id = body.get('id') if isinstance(body, dict) else None
+    elif write.operation == PendingWrite.UPDATE:
+        upstream.send('PUT', f"{BASE_API_URL}/{write.product_id}", 'products', json=write.payload)
+    else:
+        upstream.send('DELETE', f"{BASE_API_URL}/{write.product_id}", 'products')
+
+
+def recover_stale():
+    """
+    Returns rows left in 'applying' by a worker that died to the queue.
+    """
+    cutoff = timezone.now() - timedelta(seconds=settings.PRODUCTS_WRITE_BEHIND_CLAIM_TIMEOUT)
+    return PendingWrite.objects.filter(status=PendingWrite.APPLYING, updated_at__lt=cutoff).update(
+        status=PendingWrite.PENDING
+    )
+
+
+def process_batch(limit=50):
+    """
+    Applies up to `limit` due mutations. Returns how many were attempted.
+    """
+    now = timezone.now()
+    blocked = set()
+    attempted = 0
+    for write in PendingWrite.objects.filter(status__in=_ACTIVE).order_by('id')[:limit * 4]:
+        key = write.product_id if write.product_id is not None else f"new-{write.pk}"
+        if key in blocked:
+            continue
+        if write.status == PendingWrite.APPLYING or write.next_attempt_at > now:
+            blocked.add(key)
+            continue
+        # Claiming through a conditional UPDATE keeps concurrent workers apart.
+        claimed = PendingWrite.objects.filter(pk=write.pk, status=PendingWrite.PENDING).update(
+            status=PendingWrite.APPLYING, updated_at=timezone.now()
+        )
+        if not claimed:
+            blocked.add(key)
+            continue
+
+        attempted += 1
+        write.attempts += 1
+        try:
+            _apply(write)
+        except requests.exceptions.RequestException as e:
+            write.last_error = str(e)
+            if _retryable(e) and write.attempts < settings.PRODUCTS_WRITE_BEHIND_MAX_ATTEMPTS:
+                write.status = PendingWrite.PENDING
+                backoff = settings.PRODUCTS_WRITE_BEHIND_BACKOFF * 2 ** (write.attempts - 1)
+                write.next_attempt_at = timezone.now() + timedelta(seconds=backoff)
+            else:
+                write.status = PendingWrite.FAILED
+            blocked.add(key)
+        else:
+            write.status = PendingWrite.APPLIED
+            write.last_error = ''
+        write.save(update_fields=['status', 'attempts', 'last_error', 'next_attempt_at', 'product_id', 'updated_at'])
+        if write.status == PendingWrite.APPLIED:
+            events.record(events.OPERATION_KINDS[write.operation], write.product_id, write.payload)
+
+        if attempted >= limit:
+            break
+    return attempted
+
+
+def run_worker(poll_interval=None, stop_event=None):
+    """
+    Processes the queue until `stop_event` is set.
+    """
+    poll_interval = poll_interval or settings.PRODUCTS_WRITE_BEHIND_POLL_INTERVAL
+    stop_event = stop_event or threading.Event()
+    while not stop_event.is_set():
+        try:
+            recover_stale()
+            attempted = process_batch()
+        except Exception:
+            logger.exception('Write-behind worker failed to process the queue')
+            attempted = 0
+        finally:
+            close_old_connections()
+        if not attempted:
+            _wakeup.wait(poll_interval)
+            _wakeup.clear()
+
+
+def ensure_worker():
+    """
+    Starts the in-process worker thread once, if configured to use one.
+    """
+    global _worker
+    if not enabled() or settings.PRODUCTS_WRITE_BEHIND_WORKER != 'thread':
+        return
+    with _worker_lock:
+        if _worker is None or not _worker.is_alive():
+            _worker = threading.Thread(target=run_worker, name='write-behind', daemon=True)
+            _worker.start()
+
+
+def pending_writes(product_id=None):
+    """
+    Returns the mutations not yet applied, oldest first, optionally only
+    those for `product_id`.
+    """
+    if not enabled():
+        return []
+    ensure_worker()
+    writes = PendingWrite.objects.filter(status__in=_ACTIVE)
+    if product_id is not None:
+        writes = writes.filter(product_id=product_id)
+    return list(writes.order_by('id'))
+
+
+def _merge(product, payload):
+    merged = dict(product, pending=True)
+    for key in ('title', 'price', 'description', 'images'):
+        if key in payload:
+            merged[key] = payload[key]
+    if 'categoryId' in payload:
+        category = product.get('category') or {}
+        if str(category.get('id')) != str(payload['categoryId']):
+            merged['category'] = {'id': payload['categoryId'], 'name': category.get('name', '')}
+    return merged
+
+
+def overlay_products(products, category_id=None, writes=None):
+    """
+    Applies pending mutations to a product list: edits are merged, deleted
+    products are dropped and new products (of `category_id`, when the list
+    is filtered) are appended without an id.
+    """
+    writes = pending_writes() if writes is None else writes
+    if not writes:
+        return products
+    by_id = {p.get('id'): p for p in products}
+    deleted = set()
+    created = []
+    for write in writes:
+        if write.operation == PendingWrite.DELETE:
+            deleted.add(write.product_id)
+        elif write.operation == PendingWrite.UPDATE and write.product_id in by_id:
+            by_id[write.product_id] = _merge(by_id[write.product_id], write.payload)
+        elif write.operation == PendingWrite.CREATE and (
+            category_id is None or str(write.payload.get('categoryId')) == str(category_id)
+        ):
+            created.append(_merge({'id': None}, write.payload))
+    return [by_id[p.get('id')] for p in products if p.get('id') not in deleted] + created
+
+
+def overlay_stream(products, category_id=None, writes=None):
+    """
+    Same as overlay_products for an iterator of products, without
+    materializing it.
+    """
+    writes = pending_writes() if writes is None else writes
+    if not writes:
+        yield from products
+        return
+    changes = [w for w in writes if w.operation != PendingWrite.CREATE]
+    creates = [w for w in writes if w.operation == PendingWrite.CREATE]
+    for product in products:
+        yield from overlay_products([product], writes=changes)
+    yield from overlay_products([], category_id, creates)
+
+
+def overlay_product(product_id, product):
+    """
+    Applies pending mutations to a single product. Returns None if the
+    product has a pending deletion.
+    """
+    for write in pending_writes(product_id):
+        if write.operation == PendingWrite.DELETE:
+            return None
+        if write.operation == PendingWrite.UPDATE:
+            product = _merge(product, write.payload)
+    return product
@@ -0,0 +1,246 @@
+"""
+Vistas de la API de autenticación (Django REST Framework).
+
+Están separadas de views.py para que REST Framework solo se importe cuando
+se pide por primera vez una URL de la API (ver Platzi_Store_APP.lazyurls).
+"""
+from django.contrib.auth import login, logout
+from django.contrib.auth.models import User
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import AllowAny, IsAdminUser, IsAuthenticated
+from rest_framework.response import Response
+
+from .pagination import KeysetPagination, prefix_range
+from .serializers import (
+    UserRegistrationSerializer,
+    UserLoginSerializer,
+    UserSerializer
+)
+
+
+@api_view(['POST'])
+@permission_classes([AllowAny])
+def register_api(request):
+    """
+    Vista API para el registro de nuevos usuarios.
+    
+    Endpoint: POST /api/register/
+    
+    Parámetros esperados:
+    - username: nombre de usuario único
+    - email: correo electrónico válido
+    - password: contraseña (mínimo 8 caracteres)
+    - password2: confirmación de contraseña
+    - first_name: nombre (opcional)
+    - last_name: apellido (opcional)
+    
+    Respuestas:
+    - 201: Usuario creado exitosamente
+    - 400: Error en validación de datos
+    """
+    if request.method == 'POST':
+        # Creamos el serializer con los datos recibidos
+        serializer = UserRegistrationSerializer(data=request.data)
+        
+        if serializer.is_valid():
+            try:
+                # Usuario y token se crean en una sola transacción
+                user = serializer.save()
+            except ValidationError as e:
+                # Username o email ya registrados (lo detecta el índice único)
+                return Response({
+                    'success': False,
+                    'message': 'Error en el registro',
+                    'errors': e.detail
+                }, status=status.HTTP_400_BAD_REQUEST)
+            
+            # Preparamos la respuesta con los datos del usuario y su token
+            response_data = {
+                'success': True,
+                'message': 'Usuario registrado satisfactoriamente',
+                'user': UserSerializer(user).data,
+                'token': user.auth_token.key
+            }
+            
+            return Response(response_data, status=status.HTTP_201_CREATED)
+        
+        # Si hay errores de validación, los devolvemos
+        return Response({
+            'success': False,
+            'message': 'Error en el registro',
+            'errors': serializer.errors
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+
+@api_view(['POST'])
+@permission_classes([AllowAny])
+def login_api(request):
+    """
+    Vista API para el inicio de sesión de usuarios.
+    
+    Endpoint: POST /api/login/
+    
+    Parámetros esperados:
+    - username: nombre de usuario
+    - password: contraseña
+    
+    Respuestas:
+    - 200: Autenticación exitosa
+    - 400: Error en credenciales
+    """
+    if request.method == 'POST':
+        # Creamos el serializer con los datos de login
+        serializer = UserLoginSerializer(
+            data=request.data,
+            context={'request': request}
+        )
+        
+        if serializer.is_valid():
+            # Obtenemos el usuario validado
+            user = serializer.validated_data['user']
+            
+            # Iniciamos sesión en Django (opcional, para mantener sesión)
+            login(request, user)
+            
+            # Creamos o obtenemos el token de autenticación
+            token, created = Token.objects.get_or_create(user=user)
+            
+            # Preparamos la respuesta exitosa
+            response_data = {
+                'success': True,
+                'message': 'Autenticación satisfactoria',
+                'user': UserSerializer(user).data,
+                'token': token.key
+            }
+            
+            return Response(response_data, status=status.HTTP_200_OK)
+        
+        # Si hay errores de autenticación
+        return Response({
+            'success': False,
+            'message': 'Error en la autenticación',
+            'errors': serializer.errors
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def logout_api(request):
+    """
+    Vista API para cerrar sesión.
+    
+    Endpoint: POST /api/logout/
+    Requiere: Token de autenticación en headers
+    
+    Respuestas:
+    - 200: Sesión cerrada exitosamente
+    - 401: No autorizado (sin token válido)
+    """
+    if request.method == 'POST':
+        try:
+            # Eliminamos el token del usuario
+            request.user.auth_token.delete()
+            
+            # Cerramos la sesión de Django
+            logout(request)
+            
+            return Response({
+                'success': True,
+                'message': 'Sesión cerrada exitosamente'
+            }, status=status.HTTP_200_OK)
+            
+        except Exception as e:
+            return Response({
+                'success': False,
+                'message': 'Error al cerrar sesión',
+                'error': str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def user_profile_api(request):
+    """
+    Vista API para obtener el perfil del usuario actual.
+    
+    Endpoint: GET /api/profile/
+    Requiere: Token de autenticación en headers
+    
+    Respuestas:
+    - 200: Datos del usuario
+    - 401: No autorizado (sin token válido)
+    """
+    if request.method == 'GET':
+        # Devolvemos los datos del usuario autenticado
+        serializer = UserSerializer(request.user)
+        
+        return Response({
+            'success': True,
+            'user': serializer.data
+        }, status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def check_username_api(request):
+    """
+    Vista API para verificar disponibilidad de nombre de usuario.
+    
+    Endpoint: GET /api/check-username/?username=nombreusuario
+    
+    Parámetros de query:
+    - username: nombre de usuario a verificar
+    
+    Respuestas:
+    - 200: Información sobre disponibilidad
+    """
+    username = request.GET.get('username', '')
+    
+    if not username:
+        return Response({
+            'success': False,
+            'message': 'Debe proporcionar un nombre de usuario'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    # Verificamos si el username existe
+    exists = User.objects.filter(username=username).exists()
+    
+    return Response({
+        'success': True,
+        'available': not exists,
+        'message': 'Nombre de usuario no disponible' if exists else 'Nombre de usuario disponible'
+    }, status=status.HTTP_200_OK)
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def users_api(request):
+    """
+    Vista API con el directorio de usuarios (solo staff).
+
+    Endpoint: GET /api/users/
+
+    Parámetros de query:
+    - username: prefijo del nombre de usuario (distingue mayúsculas)
+    - limit: usuarios por página (por defecto PAGE_SIZE, máximo 100)
+    - cursor: valor tomado de `next` de la página anterior
+
+    Paginación por cursor sobre (date_joined, id), del más reciente al más
+    antiguo: cualquier página cuesta una consulta, igual que la primera.
+
+    Respuestas:
+    - 200: Página de usuarios
+    - 400: Cursor o limit inválidos
+    - 403: El usuario no es staff
+    """
+    # Solo las columnas que muestra UserSerializer
+    users = User.objects.only(*UserSerializer.Meta.fields)
+    prefix = request.query_params.get('username')
+    if prefix:
+        users = users.filter(**prefix_range('username', prefix))
+
+    paginator = KeysetPagination()
+    page = paginator.paginate_queryset(users, request)
+    return paginator.get_paginated_response(UserSerializer(page, many=True).data)
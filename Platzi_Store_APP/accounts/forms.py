@@ -1,5 +1,4 @@
 from django import forms
-from django.contrib.auth.models import User
 
 class UserRegistrationForm(forms.Form):
     username = forms.CharField(
@@ -73,12 +72,6 @@ class UserRegistrationForm(forms.Form):
             raise forms.ValidationError("Las contraseñas no coinciden.")
         return password2
 
-    def clean_email(self):
-        email = self.cleaned_data.get("email")
-        if User.objects.filter(email=email).exists():
-            raise forms.ValidationError("Ya existe un usuario con este email.")
-        return email
-
 
 class UserLoginForm(forms.Form):
     username = forms.CharField(
@@ -0,0 +1,84 @@
+import contextlib
+import time
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import override_settings
+from rest_framework.authtoken.models import Token
+
+from accounts.services import RegistrationError, register_user
+
+BATCH = 5000
+
+
+def _registro_anterior(username, email, password):
+    # Lo que hacían el serializer y la vista antes de register_user:
+    # dos consultas de existencia, el usuario y luego el token.
+    if User.objects.filter(username=username).exists():
+        return None
+    if User.objects.filter(email__iexact=email).exists():
+        return None
+    user = User.objects.create_user(username=username, email=email, password=password)
+    Token.objects.create(user=user)
+    return user
+
+
+def _registro_nuevo(username, email, password):
+    try:
+        return register_user(username, email, password)[0]
+    except RegistrationError:
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide registros por segundo con una tabla de usuarios grande: consultas de "
+        "existencia previas contra register_user (índices únicos y una transacción). "
+        "Todo se revierte al terminar."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100000, help='Usuarios existentes en la tabla.')
+        parser.add_argument('--registrations', type=int, default=500, help='Registros medidos por variante.')
+        parser.add_argument('--real-hasher', action='store_true',
+                            help='Usa PASSWORD_HASHERS del proyecto en vez de MD5 (mide también el hash).')
+
+    def handle(self, *args, **options):
+        hashers = contextlib.nullcontext()
+        if not options['real_hasher']:
+            hashers = override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+        with hashers, transaction.atomic():
+            self._seed(options['users'])
+            count = options['registrations']
+            self.stdout.write(f"{'variante':<16} {'registros/s':>12} {'duplicados/s':>13}")
+            for name, register in (('anterior', _registro_anterior), ('register_user', _registro_nuevo)):
+                created = self._timed(register, name, count, duplicate=False)
+                duplicates = self._timed(register, name, count, duplicate=True)
+                self.stdout.write(f"{name:<16} {created:>12.0f} {duplicates:>13.0f}")
+            transaction.set_rollback(True)
+
+    def _seed(self, users):
+        started = time.perf_counter()
+        password = make_password('bench-password')
+        existing = User.objects.filter(username__startswith='bench-').count()
+        for start in range(existing, users, BATCH):
+            User.objects.bulk_create([
+                User(username=f"bench-{i}", email=f"bench-{i}@example.com", password=password)
+                for i in range(start, min(users, start + BATCH))
+            ])
+        self.stdout.write(f"{users} usuarios en la tabla ({time.perf_counter() - started:.1f}s)\n")
+
+    def _timed(self, register, name, count, duplicate):
+        started = time.perf_counter()
+        for i in range(count):
+            if duplicate:
+                # El email ya existe (con otras mayúsculas); el registro debe rechazarse.
+                username, email = f"dup-{name}-{i}", f"BENCH-{i}@example.com"
+            else:
+                username, email = f"new-{name}-{i}", f"new-{name}-{i}@example.com"
+            user = register(username, email, 'bench-password')
+            if (user is None) != duplicate:
+                raise RuntimeError(f"{name}: resultado inesperado para {email}")
+        return count / (time.perf_counter() - started)
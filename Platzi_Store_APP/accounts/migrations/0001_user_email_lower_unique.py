@@ -0,0 +1,20 @@
+from django.db import migrations
+
+# Índice único sobre el email en minúsculas: la unicidad la garantiza la base
+# de datos (sin consultas previas) y también sirve para buscar por email.
+# Los usuarios sin email ('') no cuentan.
+INDEX_NAME = 'accounts_user_email_lower_uniq'
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql=f"CREATE UNIQUE INDEX {INDEX_NAME} ON auth_user (LOWER(email)) WHERE email <> ''",
+            reverse_sql=f"DROP INDEX {INDEX_NAME}",
+        ),
+    ]
@@ -0,0 +1,19 @@
+from django.db import migrations
+
+# Índice para paginar usuarios por (date_joined, id) sin OFFSET (ver
+# accounts/pagination.py): cada página empieza donde terminó la anterior.
+INDEX_NAME = 'accounts_user_joined_id_idx'
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_user_email_lower_unique'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql=f"CREATE INDEX {INDEX_NAME} ON auth_user (date_joined, id)",
+            reverse_sql=f"DROP INDEX {INDEX_NAME}",
+        ),
+    ]
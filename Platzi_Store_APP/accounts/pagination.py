@@ -0,0 +1,86 @@
+"""
+Paginación por cursor (keyset) para listados de usuarios.
+
+En vez de OFFSET, cada página filtra por la posición (date_joined, id) del
+último usuario de la anterior, así que la página N cuesta lo mismo que la
+primera: la consulta recorre el índice accounts_user_joined_id_idx
+(migración 0002) desde ese punto y lee solo `page_size + 1` filas. No se
+hace COUNT; la fila extra indica si hay página siguiente.
+"""
+import base64
+from datetime import datetime
+
+from django.db.models import Q
+from rest_framework import serializers
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+def _encode_cursor(user):
+    value = f"{user.date_joined.isoformat()}|{user.pk}"
+    return base64.urlsafe_b64encode(value.encode()).decode().rstrip('=')
+
+
+def _decode_cursor(cursor):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        joined, pk = base64.urlsafe_b64decode(padded.encode()).decode().split('|')
+        return datetime.fromisoformat(joined), int(pk)
+    except (ValueError, UnicodeDecodeError):
+        raise serializers.ValidationError({'cursor': 'Cursor inválido.'})
+
+
+class KeysetPagination(BasePagination):
+    """
+    Usuarios del más reciente al más antiguo, `page_size` por página
+    (PAGE_SIZE de REST_FRAMEWORK, o ?limit= hasta `max_page_size`).
+    La respuesta tiene `results` y `next` (None en la última página).
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'limit'
+    max_page_size = 100
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, api_settings.PAGE_SIZE))
+        except ValueError:
+            raise serializers.ValidationError({self.page_size_query_param: 'Debe ser un número entero.'})
+        return max(1, min(size, self.max_page_size))
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        page_size = self.get_page_size(request)
+        cursor = request.query_params.get(self.cursor_query_param)
+        if cursor:
+            joined, pk = _decode_cursor(cursor)
+            # date_joined <= x acota el recorrido del índice; el OR solo
+            # desempata usuarios registrados en el mismo instante.
+            queryset = queryset.filter(Q(date_joined__lt=joined) | Q(pk__lt=pk), date_joined__lte=joined)
+        rows = list(queryset.order_by('-date_joined', '-pk')[:page_size + 1])
+        self.has_next = len(rows) > page_size
+        page = rows[:page_size]
+        self.next_cursor = _encode_cursor(page[-1]) if self.has_next else None
+        return page
+
+    def get_next_link(self):
+        if self.next_cursor is None:
+            return None
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, self.next_cursor)
+
+    def get_paginated_response(self, data):
+        return Response({'next': self.get_next_link(), 'results': data})
+
+
+def prefix_range(field, prefix):
+    """
+    Filtro equivalente a `field__startswith=prefix` como rango
+    (prefix <= field < siguiente prefijo), que sí puede usar el índice del
+    campo. Distingue mayúsculas, como los usernames.
+    """
+    upper = prefix[:-1] + chr(ord(prefix[-1]) + 1) if ord(prefix[-1]) < 0x10FFFF else None
+    lookups = {f"{field}__gte": prefix}
+    if upper is not None:
+        lookups[f"{field}__lt"] = upper
+    return lookups
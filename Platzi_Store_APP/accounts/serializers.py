@@ -1,6 +1,9 @@
 from rest_framework import serializers
 from django.contrib.auth.models import User
 from django.contrib.auth import authenticate
+from django.contrib.auth.validators import UnicodeUsernameValidator
+
+from .services import RegistrationError, register_user
 
 
 class UserRegistrationSerializer(serializers.ModelSerializer):
@@ -23,7 +26,9 @@ class UserRegistrationSerializer(serializers.ModelSerializer):
                 'write_only': True,
                 'style': {'input_type': 'password'}
             },
-            'email': {'required': True}
+            'email': {'required': True},
+            # Sin UniqueValidator: la unicidad la comprueba el índice al insertar
+            'username': {'validators': [UnicodeUsernameValidator()]},
         }
     
     def validate(self, attrs):
@@ -43,32 +48,21 @@ class UserRegistrationSerializer(serializers.ModelSerializer):
         
         return attrs
     
-    def validate_email(self, value):
-        """
-        Valida que el email no esté ya registrado en el sistema.
-        """
-        if User.objects.filter(email=value).exists():
-            raise serializers.ValidationError(
-                'Ya existe un usuario con este correo electrónico'
-            )
-        return value
-    
     def create(self, validated_data):
         """
-        Crea un nuevo usuario con los datos validados.
+        Crea el usuario y su token en una sola transacción (ver
+        services.register_user). El token queda en `user.auth_token`.
         """
-        # Removemos password2 ya que no es parte del modelo User
-        validated_data.pop('password2')
-        
-        # Creamos el usuario usando el método create_user para hashear la contraseña
-        user = User.objects.create_user(
-            username=validated_data['username'],
-            email=validated_data['email'],
-            password=validated_data['password'],
-            first_name=validated_data.get('first_name', ''),
-            last_name=validated_data.get('last_name', '')
-        )
-        
+        try:
+            user, token = register_user(
+                username=validated_data['username'],
+                email=validated_data['email'],
+                password=validated_data['password'],
+                first_name=validated_data.get('first_name', ''),
+                last_name=validated_data.get('last_name', '')
+            )
+        except RegistrationError as e:
+            raise serializers.ValidationError({e.field: [e.message]})
         return user
 
 
@@ -0,0 +1,48 @@
+"""
+Registro de usuarios en un solo paso.
+
+`register_user` crea el usuario y su token en una única transacción, sin
+consultas previas de existencia: la unicidad del username la garantiza su
+índice único y la del email (sin distinguir mayúsculas) el índice
+`accounts_user_email_lower_uniq` (migración 0001). Si alguno se viola, la
+transacción se revierte y se lanza RegistrationError con el campo afectado.
+"""
+from django.contrib.auth.models import User
+from django.db import IntegrityError, transaction
+from rest_framework.authtoken.models import Token
+
+EMAIL_INDEX = 'accounts_user_email_lower_uniq'
+
+
+class RegistrationError(Exception):
+    """
+    El username o el email ya están registrados.
+    """
+
+    def __init__(self, field, message):
+        super().__init__(message)
+        self.field = field
+        self.message = message
+
+
+def register_user(username, email, password, first_name='', last_name=''):
+    """
+    Crea el usuario y su token de autenticación. Devuelve (user, token).
+    """
+    try:
+        with transaction.atomic():
+            user = User.objects.create_user(
+                username=username,
+                email=User.objects.normalize_email(email),
+                password=password,
+                first_name=first_name,
+                last_name=last_name,
+            )
+            token = Token.objects.create(user=user)
+    except IntegrityError as e:
+        if EMAIL_INDEX in str(e):
+            raise RegistrationError('email', 'Ya existe un usuario con este correo electrónico.')
+        if 'username' in str(e):
+            raise RegistrationError('username', 'Ya existe un usuario con este nombre de usuario.')
+        raise
+    return user, token
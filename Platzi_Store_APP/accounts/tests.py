@@ -1,3 +1,138 @@
-from django.test import TestCase
+from datetime import timedelta
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from Platzi_Store_APP.testing import PerformanceBudgetTestCase
+
+REGISTRATION = {
+    'username': 'nuevo',
+    'email': 'nuevo@example.com',
+    'password': 'clave-segura-123',
+    'password2': 'clave-segura-123',
+    'first_name': 'Nuevo',
+    'last_name': 'Usuario',
+}
+
+
+class AccountsBudgetTests(PerformanceBudgetTestCase):
+    """
+    Presupuestos de consultas, llamadas a la API y tiempo para cada URL
+    de accounts.urls.
+    """
+    urlconf = 'accounts.urls'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('existente', 'existente@example.com', 'clave-segura-123')
+        cls.token = Token.objects.create(user=cls.user)
+
+    def test_api_register(self):
+        # Usuario y token en una transacción: SAVEPOINT, dos INSERT y RELEASE
+        response = self.assertWithinBudget(
+            'post', reverse('accounts:api_register'), queries=4, upstream_calls=0,
+            data=REGISTRATION, content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 201)
+
+    def test_api_register_duplicate_email(self):
+        # El índice único sobre LOWER(email) no distingue mayúsculas. El INSERT
+        # falla y se revierte el savepoint: sin SELECT previos de comprobación
+        data = dict(REGISTRATION, email=self.user.email.upper())
+        response = self.assertWithinBudget(
+            'post', reverse('accounts:api_register'), queries=4, upstream_calls=0,
+            data=data, content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('email', response.json()['errors'])
+        self.assertFalse(User.objects.filter(username=REGISTRATION['username']).exists())
+
+    def test_api_register_duplicate_username(self):
+        data = dict(REGISTRATION, username=self.user.username)
+        response = self.assertWithinBudget(
+            'post', reverse('accounts:api_register'), queries=4, upstream_calls=0,
+            data=data, content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('username', response.json()['errors'])
+
+    def test_api_login(self):
+        # Usuario, sesión nueva (existe, SAVEPOINT, INSERT, RELEASE), last_login,
+        # token y guardado de la sesión (SAVEPOINT, UPDATE, RELEASE)
+        response = self.assertWithinBudget(
+            'post', reverse('accounts:api_login'), queries=10, upstream_calls=0,
+            data={'username': 'existente', 'password': 'clave-segura-123'}, content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_api_logout(self):
+        # Token con su usuario en una consulta y el DELETE del token
+        response = self.assertWithinBudget(
+            'post', reverse('accounts:api_logout'), queries=2, upstream_calls=0,
+            HTTP_AUTHORIZATION=f"Token {self.token.key}",
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_api_profile(self):
+        # Token y usuario en una sola consulta (select_related)
+        response = self.assertWithinBudget(
+            'get', reverse('accounts:api_profile'), queries=1, upstream_calls=0,
+            HTTP_AUTHORIZATION=f"Token {self.token.key}",
+        )
+        self.assertEqual(response.json()['user']['username'], 'existente')
+
+    def test_api_check_username(self):
+        # Un EXISTS sobre el índice de username
+        response = self.assertWithinBudget(
+            'get', reverse('accounts:api_check_username') + '?username=existente', queries=1, upstream_calls=0,
+        )
+        self.assertFalse(response.json()['available'])
+
+    def test_api_users(self):
+        staff = User.objects.create_user('staff', 'staff@example.com', 'clave-segura-123', is_staff=True)
+        joined = timezone.now() - timedelta(days=1)
+        # Varios usuarios en el mismo instante: el id desempata
+        User.objects.bulk_create([
+            User(username=f"cliente{i:02d}", email=f"cliente{i:02d}@example.com", date_joined=joined)
+            for i in range(25)
+        ])
+        headers = {'HTTP_AUTHORIZATION': f"Token {Token.objects.create(user=staff).key}"}
+        url = reverse('accounts:api_users') + '?username=cliente&limit=10'
+        seen = []
+        # Cada página cuesta lo mismo: el token y la página, sin COUNT ni OFFSET
+        while url:
+            page = self.assertWithinBudget('get', url, queries=2, upstream_calls=0, **headers).json()
+            seen += [user['username'] for user in page['results']]
+            url = page['next']
+        self.assertEqual(seen, [f"cliente{i:02d}" for i in reversed(range(25))])
+
+        response = self.client.get(reverse('accounts:api_users'), HTTP_AUTHORIZATION=f"Token {self.token.key}")
+        self.assertEqual(response.status_code, 403)
+
+    def test_login(self):
+        url = reverse('accounts:login')
+        # El formulario vacío no toca la sesión
+        self.assertWithinBudget('get', url, queries=0, upstream_calls=0)
+        # Como api_login sin el token, que se pide con la llamada a /api/login/
+        response = self.assertWithinBudget(
+            'post', url, queries=9, upstream_calls=1,
+            data={'username': 'existente', 'password': 'clave-segura-123'},
+        )
+        self.assertRedirects(response, reverse('Products:catalog'), fetch_redirect_response=False)
+
+    def test_register(self):
+        url = reverse('accounts:register')
+        self.assertWithinBudget('get', url, queries=0, upstream_calls=0)
+        data = dict(REGISTRATION, password1=REGISTRATION['password'])
+        # La misma transacción que api_register
+        response = self.assertWithinBudget('post', url, queries=4, upstream_calls=0, data=data)
+        self.assertRedirects(response, reverse('accounts:login'), fetch_redirect_response=False)
+        self.assertTrue(Token.objects.filter(user__username=REGISTRATION['username']).exists())
+
+    def test_logout(self):
+        self.client.force_login(self.user)
+        # Sesión y usuario, y flush(): se vuelve a leer la sesión y se borra
+        response = self.assertWithinBudget('get', reverse('accounts:logout'), queries=4, upstream_calls=0)
+        self.assertRedirects(response, reverse('accounts:login'), fetch_redirect_response=False)
@@ -1,16 +1,20 @@
 # accounts/urls.py
 from django.urls import path
+
+from Platzi_Store_APP.lazyurls import lazy_path
+
 from . import views
 
 app_name = 'accounts'
 
 urlpatterns = [
-    # URLs de la API de autenticación
-    path('api/register/', views.register_api, name='api_register'),
-    path('api/login/', views.login_api, name='api_login'),
-    path('api/logout/', views.logout_api, name='api_logout'),
-    path('api/profile/', views.user_profile_api, name='api_profile'),
-    path('api/check-username/', views.check_username_api, name='api_check_username'),
+    # URLs de la API de autenticación (se importan con la primera petición)
+    lazy_path('api/register/', 'accounts.api.register_api', name='api_register'),
+    lazy_path('api/login/', 'accounts.api.login_api', name='api_login'),
+    lazy_path('api/logout/', 'accounts.api.logout_api', name='api_logout'),
+    lazy_path('api/profile/', 'accounts.api.user_profile_api', name='api_profile'),
+    lazy_path('api/check-username/', 'accounts.api.check_username_api', name='api_check_username'),
+    lazy_path('api/users/', 'accounts.api.users_api', name='api_users'),
     path('login/', views.login_view, name='login'),
     path('register/', views.register_view, name='register'),
     path('logout/', views.logout_view, name='logout'),